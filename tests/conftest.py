@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+ANCHORS = (
+    np.array(
+        [
+            (10, 13),
+            (16, 30),
+            (33, 23),
+            (30, 61),
+            (62, 45),
+            (59, 119),
+            (116, 90),
+            (156, 198),
+            (373, 326),
+        ],
+        np.float32,
+    )
+    / 416
+)
+MASKS = np.array([[6, 7, 8], [3, 4, 5], [0, 1, 2]])
+
+
+def create_padded_boxes(batch_size=4, max_boxes=20, seed=0):
+    """
+    Create random zero padded boxes (x1, y1, x2, y2, label) including an
+    image without boxes and boxes sharing grid cells.
+    """
+    rng = np.random.default_rng(seed)
+    boxes = np.zeros((batch_size, max_boxes, 5), np.float32)
+    for i, count in enumerate([0, 1, max_boxes // 2, max_boxes - 3][:batch_size]):
+        xy = rng.uniform(0, 0.8, (count, 2))
+        wh = rng.uniform(0.01, 0.2, (count, 2))
+        boxes[i, :count, :2] = xy
+        boxes[i, :count, 2:4] = xy + wh
+        boxes[i, :count, 4] = rng.integers(0, 80, count)
+    boxes[3, 1] = boxes[3, 0]
+    boxes[3, 1, 4] = (boxes[3, 0, 4] + 1) % 80
+    boxes[3, 2, :4] = boxes[3, 0, :4] + [0.001, 0.001, 0.003, 0.003]
+    return boxes
+
+
+@pytest.fixture
+def anchors():
+    return ANCHORS
+
+
+@pytest.fixture
+def masks():
+    return MASKS
+
+
+@pytest.fixture
+def padded_boxes():
+    return create_padded_boxes
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+tf = pytest.importorskip('tensorflow')
+cv2 = pytest.importorskip('cv2')
+
+from yolo_tf2.core.detector import Detector
+
+
+def create_detector(input_size=64):
+    """
+    Create a detector predicting one box per image scored by its batch index.
+    """
+    detector = Detector.__new__(Detector)
+    detector.input_shape = (input_size, input_size, 3)
+    detector.dynamic_input = False
+    detector.class_names = ['car']
+    detector.box_colors = {'car': (0, 255, 0)}
+    detector.batches = []
+
+    def predict_batch(images):
+        detector.batches.append(tuple(images.shape))
+        size = images.shape[0]
+        return [
+            np.tile([[[0.1, 0.2, 0.5, 0.6]]], (size, 1, 1)),
+            np.arange(1, size + 1, dtype=np.float32)[:, np.newaxis] / 10,
+            np.zeros((size, 1)),
+            np.ones(size, np.int32),
+        ]
+
+    detector.predict_batch = predict_batch
+    return detector
+
+
+def test_detect_images_numpy_arrays():
+    detector = create_detector()
+    images = [
+        np.random.randint(0, 255, (120, 200, 3), np.uint8),
+        np.random.randint(0, 255, (64, 64, 3), np.uint8),
+    ]
+    results = detector.detect_images(images, ['a.jpg', 'b.jpg'])
+    assert detector.batches == [(2, 64, 64, 3)]
+    assert [detections['image'].tolist() for detections, _ in results] == [
+        ['a.jpg'],
+        ['b.jpg'],
+    ]
+    assert results[0][0][['x1', 'y1', 'x2', 'y2']].values.tolist() == [
+        [20, 24, 100, 72]
+    ]
+
+
+def write_video(path, frames=13):
+    """
+    Write a synthetic video.
+    """
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), 10, (96, 80))
+    for i in range(frames):
+        writer.write(np.full((80, 96, 3), i * 10, np.uint8))
+    writer.release()
+
+
+@pytest.mark.parametrize('draw', [False, True])
+def test_detect_video_keeps_frame_order(tmp_path, draw):
+    video = tmp_path / 'video.avi'
+    write_video(video)
+    detections_file = tmp_path / 'detections.jsonl'
+    detector = create_detector()
+    detector.load_inference_model = lambda trained_weights: None
+    detector.detect_video(
+        str(video),
+        'weights',
+        output_dir=str(tmp_path),
+        batch_size=4,
+        queue_size=2,
+        detections_file=str(detections_file),
+        draw=draw,
+    )
+    detections = pd.read_json(detections_file, lines=True)
+    assert detections['image'].tolist() == [f'frame_{i}' for i in range(1, 14)]
+    assert [shape[0] for shape in detector.batches] == [4, 4, 4, 1]
+    if draw:
+        output = cv2.VideoCapture(str(tmp_path / 'predicted_vid.mp4'))
+        assert int(output.get(cv2.CAP_PROP_FRAME_COUNT)) == 13
+        output.release()
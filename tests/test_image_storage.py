@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+tf = pytest.importorskip('tensorflow')
+cv2 = pytest.importorskip('cv2')
+
+from yolo_tf2.core.evaluator import Evaluator
+from yolo_tf2.utils.dataset_handlers import (encode_image, get_feature_map,
+                                            read_tfr, write_tf_record_shard)
+
+COLUMNS = [
+    'image_path',
+    'object_name',
+    'img_width',
+    'img_height',
+    'x_min',
+    'y_min',
+    'x_max',
+    'y_max',
+    'relative_width',
+    'relative_height',
+    'object_id',
+]
+
+
+def write_dataset(tmp_path, image_format):
+    """
+    Write a single image TFRecord with original or resized image storage.
+    """
+    image_path = str(tmp_path / 'image.png')
+    cv2.imwrite(image_path, np.random.randint(0, 255, (120, 200, 3), np.uint8))
+    data = pd.DataFrame(
+        [[image_path, b'car', 200, 120, 20, 30, 100, 90, 0.4, 0.5, 0]],
+        columns=COLUMNS,
+    )
+    output_path = str(tmp_path / f'{image_format or "original"}.tfrecord')
+    write_tf_record_shard(
+        output_path,
+        [tuple(item) for item in data.groupby('image_path')],
+        data.columns,
+        (64, 64) if image_format else None,
+        image_format,
+    )
+    return output_path
+
+
+def predict_records(tmp_path, tf_record):
+    """
+    Predict every example using fixed relative detections.
+    """
+    classes_file = tmp_path / 'classes.txt'
+    classes_file.write_text('car\n')
+    evaluator = Evaluator.__new__(Evaluator)
+    evaluator.input_shape = (64, 64, 3)
+    evaluator.class_names = ['car']
+    evaluator.predict_batch = lambda images: [
+        np.array([[[0.1, 0.25, 0.5, 0.75]]]),
+        np.array([[0.9]]),
+        np.array([[0]]),
+        np.array([1]),
+    ]
+    dataset = read_tfr(
+        tf_record, str(classes_file), get_feature_map(), 100, get_features=True
+    )
+    return pd.concat(
+        [
+            evaluator.predict_image(image, features)[0]
+            for image, _, features in dataset
+        ]
+    )
+
+
+@pytest.mark.parametrize('image_format', ['jpeg', 'raw'])
+def test_resized_storage_predictions_match_original(tmp_path, image_format):
+    expected = predict_records(tmp_path, write_dataset(tmp_path, None))
+    actual = predict_records(tmp_path, write_dataset(tmp_path, image_format))
+    pd.testing.assert_frame_equal(expected, actual)
+    assert expected[['x1', 'y1', 'x2', 'y2']].values.tolist() == [[20, 30, 100, 90]]
+
+
+def test_encode_image_unreadable_file(tmp_path):
+    image_path = tmp_path / 'broken.jpg'
+    image_path.write_bytes(b'not an image')
+    with pytest.raises(ValueError, match='broken.jpg'):
+        encode_image(str(image_path), (64, 64), 'jpeg')
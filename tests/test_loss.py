@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+tf = pytest.importorskip('tensorflow')
+
+from tensorflow.keras.losses import (binary_crossentropy,
+                                     sparse_categorical_crossentropy)
+from yolo_tf2.utils.common import (broadcast_iou, calculate_loss, get_boxes,
+                                   transform_targets)
+
+
+def legacy_calculate_loss(anchors, classes=80, ignore_thresh=0.5):
+    """
+    Per image map_fn ignore mask implementation of calculate_loss()
+    used as reference.
+    """
+
+    def yolo_loss(y_true, y_pred):
+        pred_box, pred_obj, pred_class, pred_xywh = get_boxes(y_pred, anchors, classes)
+        pred_xy = pred_xywh[..., 0:2]
+        pred_wh = pred_xywh[..., 2:4]
+        true_box, true_obj, true_class_idx = tf.split(y_true, (4, 1, 1), axis=-1)
+        true_xy = (true_box[..., 0:2] + true_box[..., 2:4]) / 2
+        true_wh = true_box[..., 2:4] - true_box[..., 0:2]
+        box_loss_scale = 2 - true_wh[..., 0] * true_wh[..., 1]
+        grid_size = tf.shape(y_true)[1]
+        grid = tf.meshgrid(tf.range(grid_size), tf.range(grid_size))
+        grid = tf.expand_dims(tf.stack(grid, axis=-1), axis=2)
+        true_xy = true_xy * tf.cast(grid_size, tf.float32) - tf.cast(grid, tf.float32)
+        true_wh = tf.math.log(true_wh / anchors)
+        true_wh = tf.where(tf.math.is_inf(true_wh), tf.zeros_like(true_wh), true_wh)
+        obj_mask = tf.squeeze(true_obj, -1)
+        best_iou = tf.map_fn(
+            lambda x: tf.reduce_max(
+                broadcast_iou(x[0], tf.boolean_mask(x[1], tf.cast(x[2], tf.bool))),
+                axis=-1,
+            ),
+            (pred_box, true_box, obj_mask),
+            fn_output_signature=tf.float32,
+        )
+        ignore_mask = tf.cast(best_iou < ignore_thresh, tf.float32)
+        xy_loss = (
+            obj_mask
+            * box_loss_scale
+            * tf.reduce_sum(tf.square(true_xy - pred_xy), axis=-1)
+        )
+        wh_loss = (
+            obj_mask
+            * box_loss_scale
+            * tf.reduce_sum(tf.square(true_wh - pred_wh), axis=-1)
+        )
+        obj_loss = binary_crossentropy(true_obj, pred_obj)
+        obj_loss = obj_mask * obj_loss + (1 - obj_mask) * ignore_mask * obj_loss
+        class_loss = obj_mask * sparse_categorical_crossentropy(
+            true_class_idx, pred_class
+        )
+        xy_loss = tf.reduce_sum(xy_loss, axis=(1, 2, 3))
+        wh_loss = tf.reduce_sum(wh_loss, axis=(1, 2, 3))
+        obj_loss = tf.reduce_sum(obj_loss, axis=(1, 2, 3))
+        class_loss = tf.reduce_sum(class_loss, axis=(1, 2, 3))
+        return xy_loss + wh_loss + obj_loss + class_loss
+
+    return yolo_loss
+
+
+@pytest.mark.parametrize('ignore_thresh', [0.1, 0.5])
+@pytest.mark.parametrize('max_boxes', [20, 100])
+def test_loss_matches_map_fn_implementation(
+    ignore_thresh, max_boxes, anchors, masks, padded_boxes
+):
+    y_train = tf.constant(padded_boxes(max_boxes=max_boxes))
+    targets = transform_targets(y_train, anchors, masks, 416)
+    rng = np.random.default_rng(0)
+    for y_true, mask in zip(targets, masks):
+        y_pred = tf.constant(
+            rng.normal(0, 0.5, (*y_true.shape[:4], 85)), tf.float32
+        )
+        expected = legacy_calculate_loss(anchors[mask], 80, ignore_thresh)(
+            y_true, y_pred
+        )
+        actual = calculate_loss(anchors[mask], 80, ignore_thresh, max_boxes)(
+            y_true, y_pred
+        )
+        np.testing.assert_allclose(actual.numpy(), expected.numpy(), rtol=1e-5)
@@ -0,0 +1,26 @@
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip('tensorflow')
+
+from yolo_tf2.core.profiler import ModelProfiler
+
+CFG = Path(__file__).parents[1] / 'yolo_tf2' / 'config' / 'yolo3-tiny.cfg'
+
+
+@pytest.mark.parametrize('fold_batch_norm', [False, True])
+def test_profile_reports_section_times(tmp_path, fold_batch_norm):
+    classes_file = tmp_path / 'classes.txt'
+    classes_file.write_text('car\nperson\n')
+    profiler = ModelProfiler(
+        (64, 64, 3), str(CFG), str(classes_file)
+    )
+    report = profiler.profile(
+        iterations=2,
+        fold_batch_norm=fold_batch_norm,
+        output_file=str(tmp_path / 'profile.json'),
+    )
+    assert (report['time ms'] > 0).all()
+    assert report['time %'].sum() == pytest.approx(100)
+    assert report['time ms'].is_monotonic_decreasing
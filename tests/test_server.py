@@ -0,0 +1,87 @@
+import asyncio
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+tf = pytest.importorskip('tensorflow')
+
+from yolo_tf2.core.server import DetectionServer
+
+
+class StubDetector:
+    """
+    Detector returning one detection per image and recording batches.
+    """
+
+    def __init__(self):
+        self.batches = []
+
+    def load_inference_model(self, trained_weights):
+        pass
+
+    @staticmethod
+    def get_input_size(input_size=None):
+        assert input_size in (None, 320, 416), f'Invalid input size {input_size}'
+        return input_size or 416
+
+    def decode_image(self, image_bytes, resize=True, input_size=None):
+        size = self.get_input_size(input_size)
+        return np.zeros((10, 10, 3), np.uint8), tf.zeros((size, size, 3))
+
+    def detect_images(self, images, image_names, resized=None, input_size=None):
+        self.batches.append((list(image_names), resized.shape[1]))
+        return [
+            (pd.DataFrame({'image': [image_name], 'size': [resized.shape[1]]}), None)
+            for image_name in image_names
+        ]
+
+
+async def request(port, method, target, body=b''):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(
+        f'{method} {target} HTTP/1.1\r\nHost: 127.0.0.1\r\n'
+        f'Content-Length: {len(body)}\r\n\r\n'.encode('latin-1')
+        + body
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(body)
+
+
+async def run_requests(server):
+    serving = asyncio.create_task(server.serve())
+    while server.port == 0:
+        await asyncio.sleep(0.01)
+    try:
+        health = await request(server.port, 'GET', '/health')
+        sizes = [320, 416, 320, 320, 416, 320]
+        detections = await asyncio.gather(
+            *[
+                request(server.port, 'POST', f'/detect?name=image_{i}&size={size}', b'x')
+                for i, size in enumerate(sizes)
+            ]
+        )
+        invalid = await request(server.port, 'POST', '/detect?size=100', b'x')
+        return health, sizes, detections, invalid
+    finally:
+        serving.cancel()
+
+
+def test_server_batches_concurrent_requests_per_input_size():
+    detector = StubDetector()
+    server = DetectionServer(detector, 'weights', port=0, max_wait_ms=500)
+    health, sizes, detections, invalid = asyncio.run(run_requests(server))
+    assert health == (200, {'status': 'ok'})
+    assert invalid[0] == 400
+    for i, (size, (status, body)) in enumerate(zip(sizes, detections)):
+        assert status == 200
+        assert body['data'] == [[f'image_{i}', size]]
+    assert len(detector.batches) == 2
+    assert sorted((len(names), size) for names, size in detector.batches) == [
+        (2, 416),
+        (4, 320),
+    ]
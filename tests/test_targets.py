@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+tf = pytest.importorskip('tensorflow')
+
+from yolo_tf2.utils.common import transform_targets
+
+
+def legacy_transform_targets_for_output(y_true, grid_size, anchor_idxs):
+    """
+    Loop implementation of transform_targets_for_output() used as reference,
+    boxes sharing a cell and anchor are written in order so the last one wins.
+    """
+    n = tf.shape(y_true)[0]
+    y_true_out = tf.zeros((n, grid_size, grid_size, tf.shape(anchor_idxs)[0], 6))
+    anchor_idxs = tf.cast(anchor_idxs, tf.int32)
+    written = {}
+    for i in tf.range(n):
+        for j in tf.range(tf.shape(y_true)[1]):
+            if tf.equal(y_true[i][j][2], 0):
+                continue
+            anchor_eq = tf.equal(anchor_idxs, tf.cast(y_true[i][j][5], tf.int32))
+            if tf.reduce_any(anchor_eq):
+                box = y_true[i][j][0:4]
+                box_xy = (y_true[i][j][0:2] + y_true[i][j][2:4]) / 2
+                anchor_idx = tf.cast(tf.where(anchor_eq), tf.int32)
+                grid_xy = tf.cast(box_xy // (1 / grid_size), tf.int32)
+                index = (int(i), int(grid_xy[1]), int(grid_xy[0]), int(anchor_idx[0][0]))
+                written[index] = [box[0], box[1], box[2], box[3], 1, y_true[i][j][4]]
+    if not written:
+        return y_true_out
+    return tf.tensor_scatter_nd_update(
+        y_true_out, list(written), tf.convert_to_tensor(list(written.values()))
+    )
+
+
+def legacy_transform_targets(y_train, anchors, anchor_masks, size):
+    """
+    Loop implementation of transform_targets() used as reference.
+    """
+    y_outs = []
+    grid_size = size // 32
+    anchors = tf.cast(anchors, tf.float32)
+    anchor_area = anchors[..., 0] * anchors[..., 1]
+    box_wh = y_train[..., 2:4] - y_train[..., 0:2]
+    box_wh = tf.tile(tf.expand_dims(box_wh, -2), (1, 1, tf.shape(anchors)[0], 1))
+    box_area = box_wh[..., 0] * box_wh[..., 1]
+    intersection = tf.minimum(box_wh[..., 0], anchors[..., 0]) * tf.minimum(
+        box_wh[..., 1], anchors[..., 1]
+    )
+    iou = intersection / (box_area + anchor_area - intersection)
+    anchor_idx = tf.cast(tf.argmax(iou, axis=-1), tf.float32)
+    anchor_idx = tf.expand_dims(anchor_idx, axis=-1)
+    y_train = tf.concat([y_train, anchor_idx], axis=-1)
+    for anchor_idxs in anchor_masks:
+        y_outs.append(
+            legacy_transform_targets_for_output(y_train, grid_size, anchor_idxs)
+        )
+        grid_size *= 2
+    return tuple(y_outs)
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_transform_targets_matches_loop_implementation(
+    seed, anchors, masks, padded_boxes
+):
+    y_train = tf.constant(padded_boxes(seed=seed))
+    expected = legacy_transform_targets(y_train, anchors, masks, 416)
+    batched = transform_targets(y_train, anchors, masks, 416)
+    per_example = [
+        transform_targets(y_train[i], anchors, masks, 416)
+        for i in range(y_train.shape[0])
+    ]
+    for i, output in enumerate(expected):
+        np.testing.assert_array_equal(output.numpy(), batched[i].numpy())
+        np.testing.assert_array_equal(
+            output.numpy(), np.stack([item[i].numpy() for item in per_example])
+        )
+
+
+def test_transform_targets_keeps_last_box_of_a_cell(anchors, masks):
+    boxes = np.zeros((1, 4, 5), np.float32)
+    boxes[0, :3, :4] = [0.4, 0.4, 0.6, 0.6]
+    boxes[0, :3, 4] = [1, 2, 3]
+    targets = transform_targets(tf.constant(boxes), anchors, masks, 416)
+    labels = np.concatenate([target[..., 5][target[..., 4] == 1] for target in targets])
+    np.testing.assert_array_equal(labels, [3])
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+tf = pytest.importorskip('tensorflow')
+
+from yolo_tf2.core.detector import Detector
+
+
+def create_detector(nms_mode='combined'):
+    detector = Detector.__new__(Detector)
+    detector.max_boxes = 100
+    detector.iou_threshold = 0.5
+    detector.nms_mode = nms_mode
+    return detector
+
+
+def test_merge_tile_detections_drops_boxes_without_area():
+    detector = create_detector()
+    boxes = np.array(
+        [
+            [0.1, 0.1, 0.3, 0.3],
+            [0.11, 0.1, 0.31, 0.3],
+            [1, 0.2, 1, 0.4],
+            [0.5, 1, 0.7, 1],
+            [0.5, 0.5, 0.6, 0.6],
+        ],
+        np.float32,
+    )
+    scores = np.array([0.9, 0.8, 0.95, 0.95, 0.7], np.float32)
+    classes = np.array([0, 0, 0, 1, 1], np.float32)
+    merged_boxes, merged_scores, merged_classes, valid = (
+        detector.merge_tile_detections(boxes, scores, classes)
+    )
+    np.testing.assert_array_equal(valid, [2])
+    np.testing.assert_array_equal(merged_boxes[0], boxes[[0, 4]])
+    np.testing.assert_array_equal(merged_scores[0], scores[[0, 4]])
+    np.testing.assert_array_equal(merged_classes[0], [0, 1])
+
+
+@pytest.mark.parametrize(
+    'nms_mode, expected', [('per_class', [0, 1]), ('agnostic', [0])]
+)
+def test_merge_tile_detections_nms_mode(nms_mode, expected):
+    boxes = np.array([[0.1, 0.1, 0.3, 0.3], [0.11, 0.1, 0.31, 0.3]], np.float32)
+    scores = np.array([0.9, 0.8], np.float32)
+    classes = np.array([0, 1], np.float32)
+    _, _, merged_classes, valid = create_detector(
+        nms_mode
+    ).merge_tile_detections(boxes, scores, classes)
+    np.testing.assert_array_equal(valid, [len(expected)])
+    np.testing.assert_array_equal(merged_classes[0], expected)
@@ -1,9 +1,15 @@
 import argparse
 import sys
 
-from yolo_tf2.config.cli_args import DETECTION, EVALUATION, GENERAL, TRAINING
-from yolo_tf2.utils.cli_utils import (add_args, detect, display_commands,
-                                      display_section, evaluate, train)
+from yolo_tf2.config.cli_args import (BENCHMARK_NMS, BENCHMARK_PRECISION,
+                                      CLEAR_CACHE, DETECTION, EVALUATION,
+                                      EXPORT, GENERAL, PROFILE_MODEL, PRUNE,
+                                      SERVE, TRAINING)
+from yolo_tf2.utils.cli_utils import (add_args, benchmark_nms,
+                                      benchmark_precision, clear_cache, detect,
+                                      display_commands, display_section,
+                                      evaluate, export, profile_model, prune,
+                                      serve, train)
 
 
 def execute():
@@ -16,6 +22,17 @@ def execute():
         'train': ('TRAINING', TRAINING, train),
         'evaluate': ('EVALUATION', EVALUATION, evaluate),
         'detect': ('DETECTION', DETECTION, detect),
+        'export': ('EXPORT', EXPORT, export),
+        'serve': ('SERVE', SERVE, serve),
+        'prune': ('PRUNE', PRUNE, prune),
+        'profile-model': ('PROFILE_MODEL', PROFILE_MODEL, profile_model),
+        'benchmark-nms': ('BENCHMARK_NMS', BENCHMARK_NMS, benchmark_nms),
+        'benchmark-precision': (
+            'BENCHMARK_PRECISION',
+            BENCHMARK_PRECISION,
+            benchmark_precision,
+        ),
+        'clear-cache': ('CLEAR_CACHE', CLEAR_CACHE, clear_cache),
     }
     if len(sys.argv) == 1:
         display_commands()
@@ -26,7 +43,7 @@ def execute():
     command = cli_args[1]
     help_flags = any(('-h' in cli_args, '--help' in cli_args))
 
-    if command in valid_commands and total == 2:
+    if command in valid_commands and total == 2 and command != 'clear-cache':
         display_section(valid_commands[command][0])
         return
     if help_flags and total == 2:
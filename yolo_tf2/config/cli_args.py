@@ -6,8 +6,11 @@ GENERAL = {
         'default': (416, 416, 3),
         'type': ast.literal_eval,
     },
-    'classes': {'help': 'Path to classes .txt file', 'required': True},
-    'model-cfg': {'help': 'Yolo DarkNet configuration .cfg file', 'required': True},
+    'classes': {'help': 'Path to classes .txt file'},
+    'model-cfg': {
+        'help': 'Yolo DarkNet configuration .cfg file '
+        '(not required for detection using exported SavedModel)'
+    },
     'max-boxes': {'help': 'Maximum boxes per image', 'default': 100, 'type': int},
     'iou-threshold': {
         'help': 'IOU(intersection over union threshold)',
@@ -42,6 +45,25 @@ TRAINING = {
         'type': float,
         'default': 0.1,
     },
+    'tfrecord-shards': {
+        'help': 'Number of training / test TFRecord files of a new dataset',
+        'type': int,
+        'default': 1,
+    },
+    'tfrecord-workers': {
+        'help': 'Number of processes writing TFRecord shards',
+        'type': int,
+        'default': 1,
+    },
+    'image-storage': {
+        'help': 'If specified, new dataset images are stored resized to '
+        '--input-shape as "jpeg" or "raw" uint8 bytes',
+    },
+    'jpeg-quality': {
+        'help': 'JPEG quality of resized images if --image-storage is jpeg',
+        'type': int,
+        'default': 95,
+    },
     'evaluate': {
         'help': 'If True, evaluation will be conducted after training',
         'action': 'store_true',
@@ -75,10 +97,35 @@ TRAINING = {
     },
     'train-tfrecord': {'help': 'Path to training .tfrecord file'},
     'valid-tfrecord': {'help': 'Path to validation .tfrecord file'},
+    'precision': {
+        'help': 'Keras precision policy: float32, mixed_float16 or mixed_bfloat16',
+        'default': 'float32',
+    },
+    'parallel-reads': {
+        'help': 'Number of TFRecord files read in parallel, defaults to autotune',
+        'type': int,
+    },
+    'dataset-cache': {
+        'help': 'Cache decoded and resized examples in "memory" or to a folder',
+    },
+    'deterministic': {
+        'help': 'Produce training examples in order(slower input pipeline)',
+        'action': 'store_true',
+    },
+    'private-threadpool-size': {
+        'help': 'Number of threads of a private input pipeline thread pool',
+        'type': int,
+    },
+    'max-intra-op-parallelism': {
+        'help': 'Maximum parallelism of a single input pipeline op',
+        'type': int,
+    },
 }
 
 EVALUATION = {
-    'predicted-data': {'help': 'csv file with predictions', 'required': True},
+    'predicted-data': {
+        'help': 'csv file with predictions(required if --weights is not specified)'
+    },
     'actual-data': {'help': 'csv file with actual data', 'required': True},
     'train-tfrecord': {
         'help': 'Path to training .tfrecord file',
@@ -88,6 +135,26 @@ EVALUATION = {
         'help': 'Path to validation .tfrecord file',
         'required': True,
     },
+    'weights': {
+        'help': 'If specified, predictions are made using these trained weights '
+        'instead of reading --predicted-data',
+    },
+    'precision': {
+        'help': 'Keras precision policy of predictions made using --weights: '
+        'float32, mixed_float16 or mixed_bfloat16',
+        'default': 'float32',
+    },
+    'min-overlaps': {
+        'help': 'a float value between 0 and 1',
+        'default': 0.5,
+        'type': float,
+    },
+    'display-stats': {
+        'help': 'If True, display evaluation statistics',
+        'action': 'store_true',
+    },
+    'plot-stats': {'help': 'If True, plot results', 'action': 'store_true'},
+    'save-figs': {'help': 'If True, save plots', 'action': 'store_true'},
 }
 
 DETECTION = {
@@ -102,8 +169,305 @@ DETECTION = {
     },
     'display-vid': {'help': 'Display video during prediction', 'action': 'store_true'},
     'weights': {
-        'help': 'Path to trained weights .tf or .weights file',
+        'help': 'Path to trained weights .tf or .weights file or exported '
+        'SavedModel folder',
         'required': True,
     },
     'output-dir': {'help': 'Path to directory for saving results'},
+    'tflite-threads': {
+        'help': 'Number of interpreter threads if --weights is a .tflite file',
+        'type': int,
+    },
+    'tile-size': {
+        'help': 'If specified, photos are detected in overlapping tiles of '
+        'tile-size x tile-size pixels',
+        'type': int,
+    },
+    'tile-overlap': {
+        'help': 'Overlap between adjacent tiles relative to tile size',
+        'default': 0.2,
+        'type': float,
+    },
+    'max-tiles': {
+        'help': 'Maximum tiles per forward pass',
+        'default': 16,
+        'type': int,
+    },
+    'xla-batch-sizes': {
+        'help': 'Batch sizes to XLA compile and warm up ex: "1, 8, 32"',
+        'type': ast.literal_eval,
+    },
+    'cache-file': {
+        'help': 'SQLite detection cache, unchanged photos are not predicted again'
+    },
+    'cache-size': {
+        'help': 'Maximum detection cache size in megabytes',
+        'default': 512,
+        'type': int,
+    },
+    'detections-file': {
+        'help': '.jsonl, .csv or .parquet file to which detections are appended'
+        '(.parquet files are replaced)'
+    },
+    'no-draw': {
+        'help': 'Skip drawing and saving images / video',
+        'action': 'store_true',
+    },
+    'processes': {
+        'help': 'Number of detection processes, photos are sharded across '
+        'processes each with its own model',
+        'default': 1,
+        'type': int,
+    },
+    'intra-op-threads': {
+        'help': 'Threads used within individual operations per process',
+        'type': int,
+    },
+    'inter-op-threads': {
+        'help': 'Threads used for independent operations per process',
+        'type': int,
+    },
+    'pin-cpus': {
+        'help': 'Pin every process to an equal share of available CPUs',
+        'action': 'store_true',
+    },
+    'converted-dtype': {
+        'help': 'float32 or float16, convert DarkNet .weights once to '
+        'models/converted and load the converted weights afterwards',
+    },
+    'fold-batch-norm': {
+        'help': 'Fold batch normalization layers into preceding convolutions',
+        'action': 'store_true',
+    },
+    'dynamic-input': {
+        'help': 'Create models with variable input size, images can be detected '
+        'at any multiple of 32 input size',
+        'action': 'store_true',
+    },
+    'nms-mode': {
+        'help': 'Non-max suppression mode: combined, per_class or agnostic',
+        'default': 'combined',
+    },
+    'pre-nms-top-k': {
+        'help': 'Number of candidates with the highest objectness passed to '
+        'non-max suppression',
+        'type': int,
+    },
+    'precision': {
+        'help': 'Keras precision policy: float32, mixed_float16 or mixed_bfloat16',
+        'default': 'float32',
+    },
+    'input-size': {
+        'help': 'Input size(multiple of 32) to which photos are resized, '
+        'defaults to --input-shape size, requires --dynamic-input if different',
+        'type': int,
+    },
+}
+
+EXPORT = {
+    'weights': {
+        'help': 'Path to trained weights .tf or .weights file',
+        'required': True,
+    },
+    'output-path': {
+        'help': 'Path to exported model, defaults to models/<cfg name>_saved_model '
+        'or models/<cfg name>.tflite'
+    },
+    'format': {
+        'help': 'Export format: saved_model or tflite',
+        'default': 'saved_model',
+    },
+    'representative-tfrecord': {
+        'help': 'TFRecord file used to calibrate int8 quantization(tflite only)'
+    },
+    'calibration-steps': {
+        'help': 'Number of calibration images',
+        'default': 100,
+        'type': int,
+    },
+    'train-tfrecord': {
+        'help': 'Path to training .tfrecord file, if specified with '
+        '--valid-tfrecord, exported model mAP is compared to the float model',
+    },
+    'valid-tfrecord': {'help': 'Path to validation .tfrecord file'},
+    'min-overlaps': {
+        'help': 'a float value between 0 and 1',
+        'default': 0.5,
+        'type': float,
+    },
+    'tflite-threads': {'help': 'Number of interpreter threads', 'type': int},
+    'fold-batch-norm': {
+        'help': 'Fold batch normalization layers into preceding convolutions',
+        'action': 'store_true',
+    },
+}
+
+SERVE = {
+    'weights': {
+        'help': 'Path to trained weights .tf or .weights file or exported '
+        'SavedModel folder or .tflite file',
+        'required': True,
+    },
+    'host': {'help': 'Server host address', 'default': '127.0.0.1'},
+    'port': {'help': 'Server port', 'default': 8080, 'type': int},
+    'max-batch': {
+        'help': 'Maximum images merged into a single forward pass',
+        'default': 8,
+        'type': int,
+    },
+    'max-wait-ms': {
+        'help': 'Maximum time(ms) a request waits for a batch to fill',
+        'default': 10,
+        'type': float,
+    },
+    'tflite-threads': {
+        'help': 'Number of interpreter threads if --weights is a .tflite file',
+        'type': int,
+    },
+    'xla-batch-sizes': {
+        'help': 'Batch sizes to XLA compile and warm up ex: "1, 8"',
+        'type': ast.literal_eval,
+    },
+    'fold-batch-norm': {
+        'help': 'Fold batch normalization layers into preceding convolutions',
+        'action': 'store_true',
+    },
+    'dynamic-input': {
+        'help': 'Create models with variable input size, images can be detected '
+        'at any multiple of 32 input size',
+        'action': 'store_true',
+    },
+    'nms-mode': {
+        'help': 'Non-max suppression mode: combined, per_class or agnostic',
+        'default': 'combined',
+    },
+    'pre-nms-top-k': {
+        'help': 'Number of candidates with the highest objectness passed to '
+        'non-max suppression',
+        'type': int,
+    },
+    'precision': {
+        'help': 'Keras precision policy: float32, mixed_float16 or mixed_bfloat16',
+        'default': 'float32',
+    },
+}
+
+PRUNE = {
+    'weights': {
+        'help': 'Path to trained weights .tf or .weights file',
+        'required': True,
+    },
+    'ratio': {
+        'help': 'Fraction of prunable convolution channels to remove',
+        'default': 0.5,
+        'type': float,
+    },
+    'min-channels': {
+        'help': 'Minimum channels kept per convolution',
+        'default': 8,
+        'type': int,
+    },
+    'output-cfg': {
+        'help': 'Path to pruned cfg file, defaults to models/<cfg name>-pruned.cfg'
+    },
+    'output-weights': {
+        'help': 'Path to pruned .tf weights, defaults to models/<cfg name>-pruned.tf'
+    },
+    'latency-iterations': {
+        'help': 'Forward passes used to measure CPU latency before / after pruning',
+        'default': 10,
+        'type': int,
+    },
+}
+
+PROFILE_MODEL = {
+    'batch-size': {
+        'help': 'Number of images per forward pass',
+        'default': 1,
+        'type': int,
+    },
+    'iterations': {
+        'help': 'Number of timed forward passes',
+        'default': 10,
+        'type': int,
+    },
+    'fold-batch-norm': {
+        'help': 'Fold batch normalization layers into preceding convolutions '
+        'before profiling',
+        'action': 'store_true',
+    },
+    'output-file': {
+        'help': 'Path to output JSON file, defaults to '
+        'output/profiling/<cfg name>-profile.json'
+    },
+}
+
+BENCHMARK_NMS = {
+    'modes': {
+        'help': 'Tuple of non-max suppression modes to measure',
+        'default': ('combined', 'per_class', 'agnostic'),
+        'type': ast.literal_eval,
+    },
+    'pre-nms-top-k': {
+        'help': 'Tuple of pre-NMS top-k values to measure, None disables top-k',
+        'default': (None, 1000),
+        'type': ast.literal_eval,
+    },
+    'batch-size': {'help': 'Number of images', 'default': 1, 'type': int},
+    'input-size': {
+        'help': 'Input size of synthetic outputs, defaults to --input-shape size',
+        'type': int,
+    },
+    'iterations': {
+        'help': 'Measured iterations per combination',
+        'default': 20,
+        'type': int,
+    },
+    'warmup': {
+        'help': 'Unmeasured iterations per combination',
+        'default': 3,
+        'type': int,
+    },
+    'output-file': {
+        'help': 'Path to output .csv file, defaults to output/benchmarks/nms.csv'
+    },
+}
+
+BENCHMARK_PRECISION = {
+    'weights': {
+        'help': 'Path to trained weights .tf or .weights file',
+        'required': True,
+    },
+    'precisions': {
+        'help': 'Tuple of precision policies to compare with float32',
+        'default': ('float32', 'mixed_bfloat16'),
+        'type': ast.literal_eval,
+    },
+    'image-dir': {
+        'help': 'A directory that contains images, defaults to random images',
+    },
+    'batch-size': {
+        'help': 'Number of images per forward pass',
+        'default': 8,
+        'type': int,
+    },
+    'iterations': {
+        'help': 'Measured forward passes per precision',
+        'default': 20,
+        'type': int,
+    },
+    'warmup': {
+        'help': 'Unmeasured forward passes per precision',
+        'default': 3,
+        'type': int,
+    },
+    'output-file': {
+        'help': 'Path to output .csv file, defaults to output/benchmarks/precision.csv'
+    },
+}
+
+CLEAR_CACHE = {
+    'cache-dir': {
+        'help': 'Converted DarkNet weights folder, defaults to models/converted'
+    },
 }
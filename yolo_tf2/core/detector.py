@@ -1,5 +1,9 @@
+import multiprocessing
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import (ProcessPoolExecutor, ThreadPoolExecutor,
+                                as_completed)
+from queue import Empty, Full, Queue
+from threading import Event
 
 import numpy as np
 import tensorflow as tf
@@ -7,6 +11,8 @@ from cv2 import cv2
 from yolo_tf2.core.models import BaseModel
 from yolo_tf2.utils.common import (LOGGER, activate_gpu, get_abs_path,
                                    get_detection_data, timer, transform_images)
+from yolo_tf2.utils.detection_cache import DetectionCache
+from yolo_tf2.utils.detection_sinks import get_detection_sink
 
 
 class Detector(BaseModel):
@@ -22,13 +28,22 @@ class Detector(BaseModel):
         max_boxes=100,
         iou_threshold=0.5,
         score_threshold=0.5,
+        tflite_threads=None,
+        xla_batch_sizes=None,
+        converted_dtype=None,
+        fold_batch_norm=False,
+        dynamic_input=False,
+        nms_mode='combined',
+        pre_nms_top_k=None,
+        precision='float32',
     ):
         """
         Initialize detection settings.
 
         Args:
             input_shape: tuple, (n, n, c)
-            model_configuration: Path to DarkNet cfg file.
+            model_configuration: Path to DarkNet cfg file, can be None if
+                trained weights are an exported SavedModel.
             classes_file: File containing class names \n delimited.
             anchors: numpy array of (w, h) pairs.
             masks: numpy array of masks.
@@ -36,7 +51,26 @@ class Detector(BaseModel):
                 maximum boxes setting.
             iou_threshold: float, values less than the threshold are ignored.
             score_threshold: float, values less than the threshold are ignored.
+            tflite_threads: Number of interpreter threads used if trained
+                weights are an exported .tflite file.
+            xla_batch_sizes: int or a list of batch sizes, if specified,
+                inference is XLA compiled and warmed up for every batch size
+                when weights are loaded, and batches are padded to the
+                nearest compiled size.
+            converted_dtype: float32 or float16, if specified, DarkNet .weights
+                are converted once and loaded from models/converted afterwards.
+            fold_batch_norm: If True, batch normalization layers are folded
+                into preceding convolutions once weights are loaded.
+            dynamic_input: If True, models are created with variable input
+                size, and images can be detected at any multiple of 32
+                input size without rebuilding.
+            nms_mode: combined, per_class or agnostic, see BaseModel.get_nms()
+            pre_nms_top_k: If specified, only top k candidates with the
+                highest objectness are passed to non-max suppression.
+            precision: float32, mixed_float16 or mixed_bfloat16 keras
+                precision policy of models created from cfg files.
         """
+        self.classes_file = classes_file
         self.class_names = [item.strip() for item in open(classes_file)]
         self.box_colors = {
             class_name: color
@@ -58,32 +92,211 @@ class Detector(BaseModel):
             iou_threshold=iou_threshold,
             score_threshold=score_threshold,
         )
+        self.tflite_threads = tflite_threads
+        self.xla_batch_sizes = xla_batch_sizes
+        self.converted_dtype = converted_dtype
+        self.fold_batch_norm = fold_batch_norm
+        self.dynamic_input = dynamic_input
+        self.nms_mode = nms_mode
+        self.pre_nms_top_k = pre_nms_top_k
+        self.precision = precision
         activate_gpu()
 
-    def detect_image(self, image_data, image_name):
+    def get_input_size(self, input_size=None):
+        """
+        Validate detection input size.
+        Args:
+            input_size: int, multiple of 32, defaults to input_shape[0]
+
+        Returns:
+            input size.
+        """
+        input_size = input_size or self.input_shape[0]
+        assert input_size % 32 == 0, f'Input size should be a multiple of 32'
+        assert (
+            input_size == self.input_shape[0] or self.dynamic_input
+        ), f'Input size {input_size} requires dynamic_input=True'
+        return input_size
+
+    def detect_images(self, images, image_names, resized=None, input_size=None):
+        """
+        Get detections for a batch of images in a single forward pass.
+        Args:
+            images: A list of images as numpy arrays/tf.Tensor(s)
+            image_names: A list of str, names of the images.
+            resized: Stacked batch of resized images, if not specified,
+                images will be resized and stacked.
+            input_size: int, size to which images are resized, defaults
+                to input_shape[0]
+
+        Returns:
+            A list of (pandas DataFrame with detections found, BGR image) pairs.
+        """
+        if resized is None:
+            input_size = self.get_input_size(input_size)
+            resized = tf.stack(
+                [transform_images(image, input_size) for image in images]
+            )
+        outputs = self.predict_batch(resized)
+        results = []
+        for i, (image_data, image_name) in enumerate(zip(images, image_names)):
+            adjusted = cv2.cvtColor(np.asarray(image_data), cv2.COLOR_RGB2BGR)
+            detections = get_detection_data(
+                adjusted,
+                image_name,
+                [item[i : i + 1] for item in outputs],
+                self.class_names,
+            )
+            results.append((detections, adjusted))
+        return results
+
+    def detect_image(self, image_data, image_name, input_size=None):
         """
         Given an image, get detections for the image.
         Args:
             image_data: image as numpy array/tf.Tensor
             image_name: str, name of the image
+            input_size: int, size to which the image is resized, defaults
+                to input_shape[0]
 
         Returns:
             pandas DataFrame with detections found.
         """
-        image = tf.expand_dims(image_data, 0)
-        resized = transform_images(image, self.input_shape[0])
-        out = self.inference_model.predict(resized)
-        if isinstance(image_data, np.ndarray):
-            adjusted = cv2.cvtColor(image_data, cv2.COLOR_RGB2BGR)
-        else:
-            adjusted = cv2.cvtColor(image_data.numpy(), cv2.COLOR_RGB2BGR)
-        detections = get_detection_data(
-            adjusted,
-            image_name,
-            out,
-            self.class_names,
-        )
-        return detections, adjusted
+        return self.detect_images([image_data], [image_name], input_size=input_size)[0]
+
+    @staticmethod
+    def get_tile_offsets(length, tile_size, overlap):
+        """
+        Get tile start offsets along a single image axis.
+        Args:
+            length: Image width or height.
+            tile_size: Tile width and height.
+            overlap: float, overlap between adjacent tiles relative to tile_size.
+
+        Returns:
+            A list of offsets.
+        """
+        if length <= tile_size:
+            return [0]
+        step = max(1, int(tile_size * (1 - overlap)))
+        return [*range(0, length - tile_size, step), length - tile_size]
+
+    def get_tiles(self, image, tile_size, overlap):
+        """
+        Cut an image into overlapping tiles resized to model input size.
+        Args:
+            image: image as numpy array.
+            tile_size: Tile width and height in original image pixels.
+            overlap: float, overlap between adjacent tiles relative to tile_size.
+
+        Returns:
+            A list of resized tiles, a list of (x, y) tile offsets.
+        """
+        height, width = image.shape[:2]
+        tiles, offsets = [], []
+        for y in self.get_tile_offsets(height, tile_size, overlap):
+            for x in self.get_tile_offsets(width, tile_size, overlap):
+                tile = tf.image.pad_to_bounding_box(
+                    image[y : y + tile_size, x : x + tile_size],
+                    0,
+                    0,
+                    tile_size,
+                    tile_size,
+                )
+                tiles.append(transform_images(tile, self.input_shape[0]))
+                offsets.append((x, y))
+        return tiles, offsets
+
+    def merge_tile_detections(self, boxes, scores, classes):
+        """
+        Merge duplicate detections at tile seams using non-max suppression
+        over the full image, per class unless nms_mode is agnostic, boxes left
+        without area after clipping(entirely in the padding of edge tiles)
+        are dropped.
+        Args:
+            boxes: numpy array of (n, 4) boxes relative to full image size.
+            scores: numpy array of (n,) scores.
+            classes: numpy array of (n,) class indices.
+
+        Returns:
+            boxes, scores, classes, valid_detections with a batch dimension of 1.
+        """
+        valid = (boxes[:, 2] > boxes[:, 0]) & (boxes[:, 3] > boxes[:, 1])
+        boxes, scores, classes = boxes[valid], scores[valid], classes[valid]
+        nms_boxes = boxes
+        if self.nms_mode != 'agnostic':
+            span = 2 * (np.abs(boxes).max(initial=0) + 1)
+            nms_boxes = boxes + classes[:, np.newaxis] * span
+        selected = tf.image.non_max_suppression(
+            nms_boxes,
+            scores,
+            self.max_boxes,
+            self.iou_threshold,
+        ).numpy()
+        return [
+            boxes[np.newaxis, selected],
+            scores[np.newaxis, selected],
+            classes[np.newaxis, selected],
+            np.array([len(selected)]),
+        ]
+
+    def detect_tiled(
+        self, images, image_names, tile_size, overlap=0.2, max_tiles=16
+    ):
+        """
+        Get detections for high resolution images by detecting overlapping
+        tiles at model resolution and merging results, boxes extending into
+        the padding of edge tiles are clipped to image size before merging.
+        Args:
+            images: A list of images as numpy arrays.
+            image_names: A list of str, names of the images.
+            tile_size: Tile width and height in original image pixels.
+            overlap: float, overlap between adjacent tiles relative to tile_size.
+            max_tiles: Maximum tiles(from one or more images) per forward pass.
+
+        Returns:
+            A list of (pandas DataFrame with detections found, BGR image) pairs.
+        """
+        tiles, tile_images, tile_offsets = [], [], []
+        for image_index, image in enumerate(images):
+            image_tiles, offsets = self.get_tiles(image, tile_size, overlap)
+            tiles.extend(image_tiles)
+            tile_images.extend(len(image_tiles) * [image_index])
+            tile_offsets.extend(offsets)
+        outputs = [
+            self.predict_batch(tf.stack(tiles[i : i + max_tiles]))
+            for i in range(0, len(tiles), max_tiles)
+        ]
+        boxes, scores, classes, valid_detections = [
+            np.concatenate([np.asarray(output[i]) for output in outputs])
+            for i in range(4)
+        ]
+        candidates = [([], [], []) for _ in images]
+        for tile_index, (image_index, (x, y)) in enumerate(
+            zip(tile_images, tile_offsets)
+        ):
+            count = int(valid_detections[tile_index])
+            height, width = images[image_index].shape[:2]
+            tile_boxes = boxes[tile_index, :count] * tile_size + [x, y, x, y]
+            image_boxes, image_scores, image_classes = candidates[image_index]
+            image_boxes.append(
+                np.clip(tile_boxes / [width, height, width, height], 0, 1)
+            )
+            image_scores.append(scores[tile_index, :count])
+            image_classes.append(classes[tile_index, :count])
+        results = []
+        for image, image_name, image_candidates in zip(
+            images, image_names, candidates
+        ):
+            merged = self.merge_tile_detections(
+                *[np.concatenate(item).astype(np.float32) for item in image_candidates]
+            )
+            adjusted = cv2.cvtColor(np.asarray(image), cv2.COLOR_RGB2BGR)
+            detections = get_detection_data(
+                adjusted, image_name, merged, self.class_names
+            )
+            results.append((detections, adjusted))
+        return results
 
     def draw_on_image(self, adjusted, detections):
         """
@@ -109,105 +322,580 @@ class Detector(BaseModel):
                 1,
             )
 
-    def predict_on_image(self, image_path, output_dir=None):
+    def decode_image(self, image_bytes, resize=True, input_size=None):
         """
-        Detect, draw detections and save result to output folder.
+        Decode and resize an encoded image.
+        Args:
+            image_bytes: Encoded image(png, jpeg, bmp, gif) bytes.
+            resize: If False, the image is not resized.
+            input_size: int, size to which the image is resized, defaults
+                to input_shape[0]
+
+        Returns:
+            image as numpy array, resized image tensor or None.
+        """
+        image_data = tf.image.decode_image(
+            image_bytes, channels=3, expand_animations=False
+        )
+        if not resize:
+            return image_data.numpy(), None
+        return image_data.numpy(), transform_images(
+            image_data, self.get_input_size(input_size)
+        )
+
+    def load_image(self, image_path, resize=True):
+        """
+        Read and resize an image.
         Args:
             image_path: Path to image.
-            output_dir: Path to output dir, defaults to output/detections
+            resize: If False, the image is not resized.
 
         Returns:
-            Output path.
+            image as numpy array, resized image tensor or None.
         """
         image_path = get_abs_path(image_path, verify=True)
-        image_name = os.path.basename(image_path)
-        image_data = tf.image.decode_image(open(image_path, 'rb').read(), channels=3)
-        detections, adjusted = self.detect_image(image_data, image_name)
-        self.draw_on_image(adjusted, detections)
-        if output_dir:
-            output_path = get_abs_path(
-                output_dir, f'predicted-{image_name}', create_parents=True
+        return self.decode_image(open(image_path, 'rb').read(), resize)
+
+    def load_photo(
+        self,
+        image_path,
+        resize=True,
+        cache=None,
+        model_key=None,
+        decode_cached=True,
+        input_size=None,
+    ):
+        """
+        Read an image and look up its cached detections, cached images
+        are not resized.
+        Args:
+            image_path: Path to image.
+            resize: If False, the image is not resized.
+            cache: utils.detection_cache.DetectionCache object or None.
+            model_key: Output of DetectionCache.get_model_key()
+            decode_cached: If False, images with cached detections
+                are not decoded.
+            input_size: int, size to which the image is resized, defaults
+                to input_shape[0]
+
+        Returns:
+            image as numpy array, resized image tensor or None,
+            cache key or None, cached detections or None.
+        """
+        image_path = get_abs_path(image_path, verify=True)
+        image_bytes = open(image_path, 'rb').read()
+        key = detections = None
+        if cache:
+            key = cache.get_key(image_bytes, model_key)
+            detections = cache.get(key)
+        if detections is not None and not decode_cached:
+            return None, None, key, detections
+        image_data, resized = self.decode_image(
+            image_bytes, resize and detections is None, input_size
+        )
+        return image_data, resized, key, detections
+
+    def detect_photos(
+        self, photos, image_names, tile_size, tile_overlap, max_tiles, cache=None
+    ):
+        """
+        Detect a batch of photos loaded by load_photo(), only photos without
+        cached detections are predicted.
+        Args:
+            photos: A list of load_photo() outputs.
+            image_names: A list of str, names of the images.
+            tile_size: If specified, images are detected in overlapping
+                tiles of tile_size x tile_size pixels.
+            tile_overlap: float, overlap between adjacent tiles relative
+                to tile_size.
+            max_tiles: Maximum tiles per forward pass.
+            cache: utils.detection_cache.DetectionCache object or None.
+
+        Returns:
+            A list of (pandas DataFrame with detections found, BGR image) pairs,
+            BGR image is None for cached photos that were not decoded.
+        """
+        results = [None] * len(photos)
+        missing = []
+        for i, (image_data, _, _, cached) in enumerate(photos):
+            if cached is None:
+                missing.append(i)
+                continue
+            adjusted = None
+            if image_data is not None:
+                adjusted = cv2.cvtColor(np.asarray(image_data), cv2.COLOR_RGB2BGR)
+            results[i] = cached.assign(image=image_names[i]), adjusted
+        if not missing:
+            return results
+        images = [photos[i][0] for i in missing]
+        missing_names = [image_names[i] for i in missing]
+        if tile_size:
+            detected = self.detect_tiled(
+                images, missing_names, tile_size, tile_overlap, max_tiles
             )
         else:
-            output_dir = get_abs_path('output', 'detections')
-            output_path = get_abs_path(
-                output_dir, f'predicted-{image_name}', create_parents=True
+            detected = self.detect_images(
+                images, missing_names, tf.stack([photos[i][1] for i in missing])
             )
+        for i, result in zip(missing, detected):
+            results[i] = result
+            if cache:
+                cache.put(photos[i][2], result[0])
+        return results
+
+    def save_detections(self, adjusted, detections, image_name, output_dir=None):
+        """
+        Draw detections and save result to output folder.
+        Args:
+            adjusted: BGR image.
+            detections: pandas DataFrame containing detections
+            image_name: str, name of the image.
+            output_dir: Path to output dir, defaults to output/detections
+
+        Returns:
+            Output path.
+        """
+        self.draw_on_image(adjusted, detections)
+        output_dir = output_dir or get_abs_path('output', 'detections')
+        output_path = get_abs_path(
+            output_dir, f'predicted-{image_name}', create_parents=True
+        )
         cv2.imwrite(output_path, adjusted)
         return output_path
 
+    def predict_on_image(self, image_path, output_dir=None):
+        """
+        Detect, draw detections and save result to output folder.
+        Args:
+            image_path: Path to image.
+            output_dir: Path to output dir, defaults to output/detections
+
+        Returns:
+            Output path.
+        """
+        image_name = os.path.basename(image_path)
+        image_data, resized = self.load_image(image_path)
+        [(detections, adjusted)] = self.detect_images(
+            [image_data], [image_name], tf.expand_dims(resized, 0)
+        )
+        return self.save_detections(adjusted, detections, image_name, output_dir)
+
     @timer(LOGGER)
     def predict_photos(
-        self, photos, trained_weights, batch_size=32, workers=16, output_dir=None
+        self,
+        photos,
+        trained_weights,
+        batch_size=32,
+        workers=16,
+        output_dir=None,
+        tile_size=None,
+        tile_overlap=0.2,
+        max_tiles=16,
+        cache_file=None,
+        cache_size_mb=512,
+        detections_file=None,
+        draw=True,
+        input_size=None,
+        results_queue=None,
     ):
         """
         Predict a list of image paths and save results to output folder.
+        Images are decoded and resized in parallel, every batch is predicted
+        using a single forward pass, and results are drawn and saved in parallel.
         Args:
             photos: A list of image paths.
-            trained_weights: .weights or .tf file
+            trained_weights: .weights or .tf file or exported SavedModel folder
+                or exported .tflite file.
             batch_size: Prediction batch size.
-            workers: Parallel predictions.
+            workers: Parallel image reading / saving.
             output_dir: Path to output dir, defaults to output/detections
+            tile_size: If specified, images are detected in overlapping
+                tiles of tile_size x tile_size pixels.
+            tile_overlap: float, overlap between adjacent tiles relative
+                to tile_size.
+            max_tiles: Maximum tiles per forward pass.
+            cache_file: Path to SQLite detection cache, if specified, photos
+                with unchanged content and detection settings are not
+                predicted again.
+            cache_size_mb: Maximum detection cache size in megabytes.
+            detections_file: .jsonl, .csv or .parquet file, if specified,
+                detections of every batch are appended as they are completed.
+            draw: If False, detections are not drawn and no images are saved.
+            input_size: int, multiple of 32 to which photos are resized,
+                defaults to input_shape[0], requires dynamic_input if different.
+            results_queue: Queue to which a list of (detections, image name)
+                pairs is added once every batch is completed instead of printing
+                progress.
 
         Returns:
             None
         """
-        self.create_models(reverse_v4=True if trained_weights.endswith('tf') else False)
-        self.load_weights(get_abs_path(trained_weights, verify=True))
-        to_predict = photos.copy()
-        saved_paths = set()
+        assert (
+            draw or detections_file or results_queue is not None
+        ), 'Expected draw=True or a detections file'
+        trained_weights = get_abs_path(trained_weights, verify=True)
+        self.load_inference_model(trained_weights)
+        input_size = self.get_input_size(input_size)
+        cache = model_key = None
+        if cache_file:
+            cache = DetectionCache(cache_file, cache_size_mb)
+            model_key = cache.get_model_key(
+                trained_weights,
+                self.model_configuration,
+                input_shape=tuple(self.input_shape),
+                input_size=input_size,
+                iou_threshold=self.iou_threshold,
+                score_threshold=self.score_threshold,
+                max_boxes=self.max_boxes,
+                class_names=self.class_names,
+                nms=(self.nms_mode, self.pre_nms_top_k),
+                tiles=(tile_size, tile_overlap) if tile_size else None,
+                precision=self.precision,
+                fold_batch_norm=self.fold_batch_norm,
+                converted_dtype=self.converted_dtype,
+                anchors=np.asarray(self.anchors, np.float64).tolist(),
+                masks=self.masks
+                if self.masks is None
+                else [np.asarray(mask, np.int64).tolist() for mask in self.masks],
+                dynamic_input=self.dynamic_input,
+            )
+        sink = get_detection_sink(detections_file) if detections_file else None
+        saved_paths = []
+        predicted = 0
+        total_photos = len(photos)
         with ThreadPoolExecutor(max_workers=workers) as executor:
-            predicted = 1
-            total_photos = len(photos)
-            while to_predict:
-                current_batch = [
-                    to_predict.pop()
-                    for _ in range(min(batch_size, len(to_predict)))
-                    if to_predict
-                ]
-                future_predictions = {
+            for batch_start in range(0, total_photos, batch_size):
+                current_batch = photos[batch_start : batch_start + batch_size]
+                image_names = [os.path.basename(image) for image in current_batch]
+                photos_data = list(
+                    executor.map(
+                        lambda image: self.load_photo(
+                            image, not tile_size, cache, model_key, draw, input_size
+                        ),
+                        current_batch,
+                    )
+                )
+                results = self.detect_photos(
+                    photos_data, image_names, tile_size, tile_overlap, max_tiles, cache
+                )
+                if sink:
+                    for (detections, _), image_name in zip(results, image_names):
+                        sink.write(detections, image_name)
+                if not draw:
+                    predicted += len(results)
+                    completed = f'{predicted}/{total_photos}'
+                    percent = (predicted / total_photos) * 100
+                    if results_queue is None:
+                        print(f'\rpredicted {completed}\t{percent}% completed', end='')
+                future_saves = {
                     executor.submit(
-                        self.predict_on_image,
-                        image,
+                        self.save_detections,
+                        adjusted,
+                        detections,
+                        image_name,
                         output_dir,
-                    ): image
-                    for image in current_batch
+                    ): image_name
+                    for (detections, adjusted), image_name in zip(
+                        results, image_names
+                    )
+                    if draw
                 }
-                for future_prediction in as_completed(future_predictions):
-                    saved_path = future_prediction.result()
-                    saved_paths.add(saved_path)
+                for future_save in as_completed(future_saves):
+                    saved_paths.append(future_save.result())
+                    predicted += 1
                     completed = f'{predicted}/{total_photos}'
-                    current_image = future_predictions[future_prediction]
                     percent = (predicted / total_photos) * 100
-                    print(
-                        f'\rpredicting {os.path.basename(current_image)} '
-                        f'{completed}\t{percent}% completed',
-                        end='',
+                    if results_queue is None:
+                        print(
+                            f'\rpredicting {future_saves[future_save]} '
+                            f'{completed}\t{percent}% completed',
+                            end='',
+                        )
+                if results_queue is not None:
+                    results_queue.put(
+                        [
+                            (detections, image_name)
+                            for (detections, _), image_name in zip(
+                                results, image_names
+                            )
+                        ]
                     )
-                    predicted += 1
-        print()
+        if results_queue is None:
+            print()
+        if cache:
+            cache.close()
+        if sink:
+            sink.close()
         for saved_path in saved_paths:
             LOGGER.info(f'Saved prediction: {saved_path}')
 
+    @staticmethod
+    def detect_shard(
+        settings,
+        photos,
+        trained_weights,
+        results_queue,
+        cpus=None,
+        intra_op_threads=None,
+        inter_op_threads=None,
+        **kwargs,
+    ):
+        """
+        Predict a shard of photos in a worker process.
+        Args:
+            settings: Detector keyword arguments.
+            photos: A list of image paths.
+            trained_weights: .weights or .tf file or exported SavedModel folder
+                or exported .tflite file.
+            results_queue: multiprocessing Queue to which (detections, image name)
+                pairs of every batch are added.
+            cpus: A list of CPU ids to which the worker is pinned.
+            intra_op_threads: Threads used within individual operations.
+            inter_op_threads: Threads used for independent operations.
+            **kwargs: predict_photos() keyword arguments.
+
+        Returns:
+            None
+        """
+        if cpus:
+            os.sched_setaffinity(0, cpus)
+        if intra_op_threads:
+            tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+        if inter_op_threads:
+            tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+        detector = Detector(**settings)
+        detector.predict_photos(
+            photos, trained_weights, results_queue=results_queue, **kwargs
+        )
+
+    @timer(LOGGER)
+    def predict_photos_parallel(
+        self,
+        photos,
+        trained_weights,
+        processes=4,
+        intra_op_threads=None,
+        inter_op_threads=None,
+        pin_cpus=False,
+        detections_file=None,
+        **kwargs,
+    ):
+        """
+        Predict a list of image paths using worker processes, each with its own
+        model and TensorFlow runtime, photos are sharded across workers.
+        Args:
+            photos: A list of image paths.
+            trained_weights: .weights or .tf file or exported SavedModel folder
+                or exported .tflite file.
+            processes: Number of worker processes.
+            intra_op_threads: Threads used within individual operations per
+                worker, defaults to CPUs per worker if pin_cpus.
+            inter_op_threads: Threads used for independent operations per worker.
+            pin_cpus: If True, every worker is pinned to an equal share
+                of available CPUs.
+            detections_file: .jsonl, .csv or .parquet file to which detections
+                are appended by the parent process.
+            **kwargs: predict_photos() keyword arguments.
+
+        Returns:
+            None
+        """
+        trained_weights = get_abs_path(trained_weights, verify=True)
+        settings = {
+            'input_shape': self.input_shape,
+            'model_configuration': self.model_configuration,
+            'classes_file': self.classes_file,
+            'anchors': self.anchors,
+            'masks': self.masks,
+            'max_boxes': self.max_boxes,
+            'iou_threshold': self.iou_threshold,
+            'score_threshold': self.score_threshold,
+            'tflite_threads': self.tflite_threads,
+            'xla_batch_sizes': self.xla_batch_sizes,
+            'converted_dtype': self.converted_dtype,
+            'fold_batch_norm': self.fold_batch_norm,
+            'dynamic_input': self.dynamic_input,
+            'nms_mode': self.nms_mode,
+            'pre_nms_top_k': self.pre_nms_top_k,
+            'precision': self.precision,
+        }
+        processes = max(1, min(processes, len(photos)))
+        cpu_shares = [None] * processes
+        if pin_cpus:
+            cpu_shares = np.array_split(sorted(os.sched_getaffinity(0)), processes)
+            cpu_shares = [share.tolist() for share in cpu_shares]
+        context = multiprocessing.get_context('spawn')
+        manager = context.Manager()
+        results_queue = manager.Queue()
+        sink = get_detection_sink(detections_file) if detections_file else None
+        predicted = 0
+        total_photos = len(photos)
+        with ProcessPoolExecutor(processes, mp_context=context) as executor:
+            workers = [
+                executor.submit(
+                    self.detect_shard,
+                    settings,
+                    photos[i::processes],
+                    trained_weights,
+                    results_queue,
+                    cpus,
+                    intra_op_threads or (len(cpus) if cpus else None),
+                    inter_op_threads,
+                    **kwargs,
+                )
+                for i, cpus in enumerate(cpu_shares)
+            ]
+            while not all(worker.done() for worker in workers) or (
+                not results_queue.empty()
+            ):
+                try:
+                    results = results_queue.get(timeout=0.1)
+                except Empty:
+                    continue
+                for detections, image_name in results:
+                    if sink:
+                        sink.write(detections, image_name)
+                predicted += len(results)
+                percent = (predicted / total_photos) * 100
+                print(
+                    f'\rpredicted {predicted}/{total_photos}\t{percent}% completed',
+                    end='',
+                )
+            print()
+            for worker in workers:
+                worker.result()
+        if sink:
+            sink.close()
+        manager.shutdown()
+
+    @staticmethod
+    def put_item(target_queue, item, stop):
+        """
+        Put an item in a bounded queue unless the pipeline is stopped.
+        Args:
+            target_queue: queue.Queue object.
+            item: Item to put.
+            stop: threading.Event, set when the pipeline is stopped.
+
+        Returns:
+            None
+        """
+        while not stop.is_set():
+            try:
+                target_queue.put(item, timeout=0.1)
+                return
+            except Full:
+                continue
+
+    @staticmethod
+    def get_item(source_queue, stop):
+        """
+        Get an item from a queue unless the pipeline is stopped.
+        Args:
+            source_queue: queue.Queue object.
+            stop: threading.Event, set when the pipeline is stopped.
+
+        Returns:
+            Queue item or None if the pipeline is stopped.
+        """
+        while not stop.is_set():
+            try:
+                return source_queue.get(timeout=0.1)
+            except Empty:
+                continue
+
+    def read_frames(self, vid, frames, stop):
+        """
+        Read video frames into a queue(reader stage).
+        Args:
+            vid: cv2.VideoCapture object.
+            frames: queue.Queue object to which RGB frames are added.
+            stop: threading.Event, set when the pipeline is stopped.
+
+        Returns:
+            None
+        """
+        try:
+            while not stop.is_set():
+                ret, frame = vid.read()
+                if not ret:
+                    break
+                self.put_item(frames, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), stop)
+        finally:
+            self.put_item(frames, None, stop)
+
+    def detect_frames(self, frames, detected, stop, batch_size):
+        """
+        Group frames into batches and detect(inference stage).
+        Args:
+            frames: queue.Queue object containing RGB frames.
+            detected: queue.Queue object to which (detections, BGR frame)
+                pairs are added in the original frame order.
+            stop: threading.Event, set when the pipeline is stopped.
+            batch_size: Number of frames per forward pass.
+
+        Returns:
+            None
+        """
+        try:
+            current = 1
+            exhausted = False
+            while not exhausted:
+                batch = []
+                while len(batch) < batch_size:
+                    frame = self.get_item(frames, stop)
+                    if frame is None:
+                        exhausted = True
+                        break
+                    batch.append(frame)
+                if not batch:
+                    break
+                frame_names = [
+                    f'frame_{i}' for i in range(current, current + len(batch))
+                ]
+                for result in self.detect_images(batch, frame_names):
+                    self.put_item(detected, result, stop)
+                current += len(batch)
+        finally:
+            self.put_item(detected, None, stop)
+
     @timer(LOGGER)
     def detect_video(
-        self, video, trained_weights, codec='mp4v', display=False, output_dir=None
+        self,
+        video,
+        trained_weights,
+        codec='mp4v',
+        display=False,
+        output_dir=None,
+        batch_size=8,
+        queue_size=64,
+        detections_file=None,
+        draw=True,
     ):
         """
         Perform detection on a video, stream(optional) and save results.
+        Frames are read, detected in batches and drawn / encoded in 3
+        overlapping stages that preserve the frame order.
         Args:
             video: Path to video file.
-            trained_weights: .tf or .weights file
+            trained_weights: .tf or .weights file or exported SavedModel folder
+                or exported .tflite file.
             codec: str ex: mp4v
             display: If True, detections will be displayed during
                 the detection operation.
             output_dir: Path to output dir, defaults to output/detections
+            batch_size: Number of frames per forward pass.
+            queue_size: Maximum frames buffered between stages.
+            detections_file: .jsonl, .csv or .parquet file, if specified,
+                detections of every frame are appended as they are completed.
+            draw: If False, detections are not drawn and no video is saved.
 
         Returns:
             None
         """
-        self.create_models(reverse_v4=True if trained_weights.endswith('tf') else False)
-        self.load_weights(trained_weights)
+        assert draw or detections_file, 'Expected draw=True or a detections file'
+        assert draw or not display, 'Display requires draw=True'
+        self.load_inference_model(trained_weights)
         vid = cv2.VideoCapture(video)
         length = int(vid.get(cv2.CAP_PROP_FRAME_COUNT))
         width = int(vid.get(cv2.CAP_PROP_FRAME_WIDTH))
@@ -222,24 +910,48 @@ class Detector(BaseModel):
                 'output', 'detections', 'predicted_vid.mp4', create_parents=True
             )
         )
-        writer = cv2.VideoWriter(out, codec, fps, (width, height))
-        while vid.isOpened():
-            _, frame = vid.read()
-            detections, adjusted = self.detect_image(frame, f'frame_{current}')
-            self.draw_on_image(adjusted, detections)
-            writer.write(adjusted)
-            completed = f'{(current / length) * 100}% completed'
-            print(
-                f'\rframe {current}/{length}\tdetections: '
-                f'{len(detections)}\tcompleted: {completed}',
-                end='',
-            )
-            if display:
-                cv2.destroyAllWindows()
-                cv2.imshow(f'frame {current}', adjusted)
-            current += 1
-            if cv2.waitKey(1) == ord('q'):
-                LOGGER.info(
-                    f'Video detection aborted {current}/{length} ' f'frames completed'
-                )
-                break
+        writer = cv2.VideoWriter(out, codec, fps, (width, height)) if draw else None
+        sink = get_detection_sink(detections_file) if detections_file else None
+        stop = Event()
+        frames, detected = Queue(queue_size), Queue(queue_size)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            stages = [
+                executor.submit(self.read_frames, vid, frames, stop),
+                executor.submit(
+                    self.detect_frames, frames, detected, stop, batch_size
+                ),
+            ]
+            try:
+                while (result := self.get_item(detected, stop)) is not None:
+                    detections, adjusted = result
+                    if sink:
+                        sink.write(detections, f'frame_{current}')
+                    if draw:
+                        self.draw_on_image(adjusted, detections)
+                        writer.write(adjusted)
+                    completed = f'{(current / max(length, 1)) * 100}% completed'
+                    print(
+                        f'\rframe {current}/{length}\tdetections: '
+                        f'{len(detections)}\tcompleted: {completed}',
+                        end='',
+                    )
+                    if display:
+                        cv2.destroyAllWindows()
+                        cv2.imshow(f'frame {current}', adjusted)
+                        if cv2.waitKey(1) == ord('q'):
+                            LOGGER.info(
+                                f'Video detection aborted {current}/{length} '
+                                f'frames completed'
+                            )
+                            break
+                    current += 1
+            finally:
+                stop.set()
+            for stage in stages:
+                stage.result()
+        print()
+        if writer:
+            writer.release()
+        if sink:
+            sink.close()
+        vid.release()
@@ -8,7 +8,8 @@ from cv2 import cv2
 from yolo_tf2.core.models import BaseModel
 from yolo_tf2.utils.common import (LOGGER, get_abs_path, get_detection_data,
                                    timer, transform_images)
-from yolo_tf2.utils.dataset_handlers import get_feature_map, read_tfr
+from yolo_tf2.utils.dataset_handlers import (get_feature_map,
+                                            get_tf_record_files, read_tfr)
 from yolo_tf2.utils.visual_tools import (visualize_evaluation_stats,
                                          visualize_pr)
 
@@ -26,6 +27,7 @@ class Evaluator(BaseModel):
         max_boxes=100,
         iou_threshold=0.5,
         score_threshold=0.5,
+        precision='float32',
     ):
         """
         Evaluate a trained model.
@@ -41,6 +43,8 @@ class Evaluator(BaseModel):
             iou_threshold: Minimum overlap value.
             score_threshold: Minimum confidence for detection to count
                 as true positive.
+            precision: float32, mixed_float16 or mixed_bfloat16 keras
+                precision policy of models created from cfg files.
         """
         self.classes_file = classes_file
         self.class_names = [item.strip() for item in open(classes_file)]
@@ -54,20 +58,23 @@ class Evaluator(BaseModel):
             iou_threshold,
             score_threshold,
         )
+        self.precision = precision
         self.train_tf_record = train_tf_record
         self.valid_tf_record = valid_tf_record
         self.train_dataset_size = sum(
-            1 for _ in tf.data.TFRecordDataset(train_tf_record)
+            1 for _ in tf.data.TFRecordDataset(get_tf_record_files(train_tf_record))
         )
         self.valid_dataset_size = sum(
-            1 for _ in tf.data.TFRecordDataset(valid_tf_record)
+            1 for _ in tf.data.TFRecordDataset(get_tf_record_files(valid_tf_record))
         )
         self.dataset_size = self.train_dataset_size + self.valid_dataset_size
         self.predicted = 1
 
     def predict_image(self, image_data, features):
         """
-        Make predictions on a single image from the TFRecord.
+        Make predictions on a single image from the TFRecord, boxes
+        are scaled to the original image size(img_width, img_height)
+        which may differ from image_data size if images are stored resized.
         Args:
             image_data: image as numpy array
             features: features of the TFRecord.
@@ -79,10 +86,13 @@ class Evaluator(BaseModel):
         image_name = os.path.basename(image_path)
         image = tf.expand_dims(image_data, 0)
         resized = transform_images(image, self.input_shape[0])
-        outs = self.inference_model(resized)
+        outs = self.predict_batch(resized)
         adjusted = cv2.cvtColor(image_data.numpy(), cv2.COLOR_RGB2BGR)
+        image_size = int(features['img_width']), int(features['img_height'])
         result = (
-            get_detection_data(adjusted, image_name, outs, self.class_names),
+            get_detection_data(
+                adjusted, image_name, outs, self.class_names, image_size
+            ),
             image_name,
         )
         return result
@@ -154,7 +164,8 @@ class Evaluator(BaseModel):
             and save results as csv in output folder.
         Args:
             trained_weights: Trained .tf weights or .weights file
-                (in case self.classes = 80).
+                (in case self.classes = 80) or exported SavedModel folder
+                or exported .tflite file.
             merge: If True a single file will be saved for training
                 and validation sets predictions combined.
             workers: Parallel predictions.
@@ -166,8 +177,7 @@ class Evaluator(BaseModel):
                 or 2 pandas DataFrame(s) for training and validation
                 data sets respectively.
         """
-        self.create_models(reverse_v4=True if trained_weights.endswith('tf') else False)
-        self.load_weights(trained_weights)
+        self.load_inference_model(trained_weights)
         features = get_feature_map()
         train_dataset = read_tfr(
             self.train_tf_record,
@@ -0,0 +1,285 @@
+import json
+from pathlib import Path
+
+import pandas as pd
+import tensorflow as tf
+from yolo_tf2.core.evaluator import Evaluator
+from yolo_tf2.core.models import BaseModel
+from yolo_tf2.utils.common import (LOGGER, get_abs_path, timer,
+                                   transform_images)
+from yolo_tf2.utils.dataset_handlers import get_feature_map, read_tfr
+
+
+class InferenceModule(tf.Module):
+    """
+    Self-contained inference graph: preprocessing and the inference model
+    (yolo outputs, YoloDecode and YoloNMS layers).
+    """
+
+    def __init__(self, model):
+        """
+        Wrap a model with loaded weights.
+        Args:
+            model: core.models.BaseModel object with created models
+                and loaded weights.
+        """
+        super(InferenceModule, self).__init__()
+        self.inference_model = model.inference_model
+        self.input_size = tf.Variable(model.input_shape[0], trainable=False)
+        input_size = model.input_shape[0]
+        channels = model.input_shape[-1]
+
+        @tf.function(
+            input_signature=[
+                tf.TensorSpec([None, input_size, input_size, channels], tf.float32)
+            ]
+        )
+        def detect(images):
+            return dict(
+                zip(
+                    ('boxes', 'scores', 'classes', 'valid_detections'),
+                    self.inference_model(images, training=False),
+                )
+            )
+
+        @tf.function(
+            input_signature=[tf.TensorSpec([None, None, None, channels], tf.uint8)]
+        )
+        def serve(images):
+            return detect(transform_images(tf.cast(images, tf.float32), input_size))
+
+        self.detect = detect
+        self.serve = serve
+
+
+class Exporter(BaseModel):
+    """
+    Tool for exporting trained models to deployment formats.
+    """
+
+    def __init__(
+        self,
+        input_shape,
+        model_configuration,
+        classes_file,
+        anchors=None,
+        masks=None,
+        max_boxes=100,
+        iou_threshold=0.5,
+        score_threshold=0.5,
+        fold_batch_norm=False,
+    ):
+        """
+        Initialize export settings.
+        Args:
+            input_shape: tuple, (n, n, c)
+            model_configuration: Path to DarkNet cfg file.
+            classes_file: File containing class names \n delimited.
+            anchors: numpy array of (w, h) pairs.
+            masks: numpy array of masks.
+            max_boxes: Maximum boxes per image, fixed in the exported model.
+            iou_threshold: float, fixed in the exported model.
+            score_threshold: float, fixed in the exported model.
+            fold_batch_norm: If True, batch normalization layers are folded
+                into preceding convolutions before export.
+        """
+        self.classes_file = get_abs_path(classes_file, verify=True)
+        self.class_names = [item.strip() for item in open(self.classes_file)]
+        super().__init__(
+            input_shape,
+            model_configuration,
+            len(self.class_names),
+            anchors,
+            masks,
+            max_boxes,
+            iou_threshold,
+            score_threshold,
+        )
+        self.fold_batch_norm = fold_batch_norm
+
+    def get_output_path(self, output_path, suffix):
+        """
+        Get export path, defaults to models/<cfg name><suffix>
+        Args:
+            output_path: Path to export to or None.
+            suffix: str, default file / folder suffix.
+
+        Returns:
+            Full output path.
+        """
+        if output_path:
+            return get_abs_path(output_path, create_parents=True)
+        return get_abs_path(
+            'models',
+            f'{Path(self.model_configuration).stem}{suffix}',
+            create_parents=True,
+        )
+
+    @timer(LOGGER)
+    def export_saved_model(self, trained_weights, output_path=None):
+        """
+        Export a SavedModel with 2 signatures:
+            - serving_default: raw uint8 images of any size -> detections.
+            - detect: resized images scaled to [0, 1] -> detections.
+        Args:
+            trained_weights: .tf or .weights file.
+            output_path: Path to SavedModel folder, defaults to
+                models/<cfg name>_saved_model
+
+        Returns:
+            Output path.
+        """
+        self.create_models(reverse_v4=True if trained_weights.endswith('tf') else False)
+        self.load_weights(trained_weights, self.converted_dtype)
+        if self.fold_batch_norm:
+            self.fold_batch_normalization()
+        output_path = self.get_output_path(output_path, '_saved_model')
+        module = InferenceModule(self)
+        tf.saved_model.save(
+            module,
+            output_path,
+            signatures={'serving_default': module.serve, 'detect': module.detect},
+        )
+        LOGGER.info(f'Saved model: {output_path}')
+        return output_path
+
+    def get_representative_dataset(self, tf_record, calibration_steps=100):
+        """
+        Create a representative dataset generator for post-training quantization.
+        Args:
+            tf_record: TFRecord file used for calibration.
+            calibration_steps: Number of calibration images.
+
+        Returns:
+            Generator function.
+        """
+        dataset = read_tfr(
+            tf_record,
+            self.classes_file,
+            get_feature_map(),
+            self.max_boxes,
+            new_size=self.input_shape[:2],
+        )
+
+        def representative_dataset():
+            for image, _ in dataset.take(calibration_steps):
+                yield [tf.expand_dims(image / 255, 0)]
+
+        return representative_dataset
+
+    @timer(LOGGER)
+    def export_tflite(
+        self,
+        trained_weights,
+        output_path=None,
+        representative_tf_record=None,
+        calibration_steps=100,
+    ):
+        """
+        Export yolo outputs(no box decoding / non-max suppression) to .tflite
+        and output metadata to .json file with the same name.
+        Args:
+            trained_weights: .tf or .weights file.
+            output_path: Path to .tflite file, defaults to models/<cfg name>.tflite
+            representative_tf_record: TFRecord file, if specified, full integer
+                post-training quantization is calibrated using its images.
+            calibration_steps: Number of calibration images.
+
+        Returns:
+            Output path.
+        """
+        self.create_models(reverse_v4=True if trained_weights.endswith('tf') else False)
+        self.load_weights(trained_weights, self.converted_dtype)
+        if self.fold_batch_norm:
+            self.fold_batch_normalization()
+        output_path = self.get_output_path(output_path, '.tflite')
+        converter = tf.lite.TFLiteConverter.from_keras_model(self.training_model)
+        if representative_tf_record:
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            converter.representative_dataset = self.get_representative_dataset(
+                representative_tf_record, calibration_steps
+            )
+            converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+            converter.inference_input_type = tf.int8
+        with open(output_path, 'wb') as tflite_file:
+            tflite_file.write(converter.convert())
+        metadata = {
+            'input_size': self.input_shape[0],
+            'classes': self.classes,
+            'grid_sizes': [int(output.shape[1]) for output in self.output_layers],
+            'anchors': [self.anchors[mask].tolist() for mask in self.masks],
+        }
+        with open(Path(output_path).with_suffix('.json'), 'w') as metadata_file:
+            json.dump(metadata, metadata_file, indent=4)
+        LOGGER.info(f'Saved TFLite model: {output_path}')
+        return output_path
+
+    @timer(LOGGER)
+    def compare_map(
+        self,
+        float_weights,
+        exported_model,
+        train_tf_record,
+        valid_tf_record,
+        actual_data=None,
+        min_overlaps=0.5,
+        workers=16,
+        tflite_threads=None,
+    ):
+        """
+        Compare mAP of an exported(ex: quantized .tflite) model against
+        the float model and save the report to output/evaluation.
+        Args:
+            float_weights: .tf or .weights file.
+            exported_model: .tflite file or SavedModel folder.
+            train_tf_record: Path to training TFRecord file.
+            valid_tf_record: Path to validation TFRecord file.
+            actual_data: csv file with actual data of both TFRecords,
+                defaults to data/tfrecords/full_data.csv
+            min_overlaps: a float value between 0 and 1, or a dictionary
+                containing each class in self.class_names mapped to its
+                minimum overlap
+            workers: Parallel predictions.
+            tflite_threads: Number of interpreter threads.
+
+        Returns:
+            pandas DataFrame with average precisions and mAP of both models.
+        """
+        actual_data = actual_data or get_abs_path(
+            'data', 'tfrecords', 'full_data.csv', verify=True
+        )
+        results = []
+        for label, weights in (('float', float_weights), ('exported', exported_model)):
+            evaluator = Evaluator(
+                self.input_shape,
+                self.model_configuration,
+                train_tf_record,
+                valid_tf_record,
+                self.classes_file,
+                self.anchors,
+                self.masks,
+                self.max_boxes,
+                self.iou_threshold,
+                self.score_threshold,
+            )
+            evaluator.tflite_threads = tflite_threads
+            predictions = evaluator.make_predictions(weights, True, workers)
+            stats, map_score = evaluator.calculate_map(
+                predictions,
+                pd.read_csv(actual_data),
+                min_overlaps,
+                save_figs=False,
+                plot_results=False,
+            )
+            stats = stats.set_index('Class Name')['Average Precision']
+            stats['mAP'] = map_score
+            results.append(stats.rename(f'{label} AP'))
+        report = pd.concat(results, axis=1)
+        report['difference'] = report['exported AP'] - report['float AP']
+        report_path = get_abs_path(
+            'output', 'evaluation', 'exported_map_comparison.csv', create_parents=True
+        )
+        report.to_csv(report_path)
+        LOGGER.info(f'mAP comparison:\n{report.to_markdown()}')
+        LOGGER.info(f'Saved mAP comparison: {report_path}')
+        return report
@@ -1,4 +1,5 @@
 import configparser
+import hashlib
 import io
 import os
 from collections import defaultdict
@@ -11,7 +12,11 @@ from tensorflow.keras.layers import (Add, BatchNormalization, Concatenate,
                                      Conv2D, Input, Lambda, LeakyReLU,
                                      MaxPooling2D, UpSampling2D, ZeroPadding2D)
 from tensorflow.keras.regularizers import l2
-from yolo_tf2.utils.common import LOGGER, Mish, get_abs_path, get_boxes, timer
+from yolo_tf2.utils import common
+from yolo_tf2.utils.common import (LOGGER, Mish, RouteGroup, YoloDecode,
+                                   YoloNMS, YoloOutput, get_abs_path, timer)
+from yolo_tf2.utils.model_backends import (SavedModelBackend, TFLiteBackend,
+                                          XLABackend)
 
 
 class BaseModel(dict):
@@ -31,15 +36,19 @@ class BaseModel(dict):
         Initialize yolo model.
         Args:
             input_shape: tuple(n, n, c)
-            model_configuration: Path to DarkNet cfg file containing configuration.
+            model_configuration: Path to DarkNet cfg file containing configuration,
+                can be None only if an exported SavedModel is loaded.
             classes: Number of classes(defaults to 80 for Coco objects)
-            anchors: numpy array of anchors (x, y) pairs
-            masks: numpy array of masks.
+            anchors: numpy array of anchors (x, y) pairs, defaults to anchors
+                of the cfg [yolo] sections.
+            masks: numpy array of masks, defaults to masks of the cfg [yolo]
+                sections.
             max_boxes: Maximum boxes in a single image.
             iou_threshold: Minimum overlap that counts as a valid detection.
             score_threshold: Minimum confidence that counts as a valid detection.
         """
         super(BaseModel, self).__init__(**kwargs)
+        model_configuration = model_configuration or ''
         assert any(
             (
                 '3' in model_configuration,
@@ -83,16 +92,26 @@ class BaseModel(dict):
         self.current_layer = 1
         self.input_shape = input_shape
         self.classes = classes
+        self.model_configuration = (
+            get_abs_path(model_configuration, verify=True)
+            if model_configuration
+            else None
+        )
+        cfg_anchors, cfg_masks = self.get_cfg_anchors()
         self.anchors = anchors
         if anchors is None:
+            self.anchors = cfg_anchors
+        if self.anchors is None:
             if '3' in model_configuration:
                 self.anchors = self.version_anchors['v3']
             if '4' in model_configuration:
                 self.anchors = self.version_anchors['v4']
-        if self.anchors[0][0] > 1:
+        if self.anchors is not None and self.anchors[0][0] > 1:
             self.anchors = self.anchors / input_shape[0]
         self.masks = masks
         if masks is None:
+            self.masks = cfg_masks
+        if self.masks is None:
             if '3' in model_configuration:
                 self.masks = self.version_masks['v3']
             if '4' in model_configuration:
@@ -109,6 +128,10 @@ class BaseModel(dict):
             Lambda,
             Mish,
             MaxPooling2D,
+            YoloOutput,
+            YoloDecode,
+            RouteGroup,
+            YoloNMS,
         )
         self.func_names = [
             'zero_padding',
@@ -122,6 +145,10 @@ class BaseModel(dict):
             'lambda',
             'mish',
             'maxpool2d',
+            'output',
+            'decode',
+            'route_group',
+            'nms',
         ]
         self.layer_names = {
             func.__name__: f'layer_CURRENT_LAYER_{name}'
@@ -136,8 +163,16 @@ class BaseModel(dict):
         self.max_boxes = max_boxes
         self.iou_threshold = iou_threshold
         self.score_threshold = score_threshold
-        self.model_configuration = get_abs_path(model_configuration, verify=True)
         self.model_layers = []
+        self.backend = None
+        self.tflite_threads = None
+        self.xla_batch_sizes = None
+        self.converted_dtype = None
+        self.fold_batch_norm = False
+        self.dynamic_input = False
+        self.nms_mode = 'combined'
+        self.pre_nms_top_k = None
+        self.precision = 'float32'
 
     def apply_func(self, func, x=None, *args, **kwargs):
         """
@@ -180,11 +215,66 @@ class BaseModel(dict):
         output_stream.seek(0)
         return output_stream
 
+    def get_cfg_anchors(self):
+        """
+        Read anchors and masks from [yolo] sections of the DarkNet cfg file.
+
+        Returns:
+            anchors, masks or None, None if the cfg file contains no anchors.
+        """
+        if not self.model_configuration:
+            return None, None
+        cfg_parser = configparser.ConfigParser()
+        cfg_parser.read_file(self.read_dark_net_cfg())
+        sections = [
+            cfg_parser[section]
+            for section in cfg_parser.sections()
+            if section.startswith('yolo')
+        ]
+        if not sections or not all(
+            'anchors' in section and 'mask' in section for section in sections
+        ):
+            return None, None
+        anchors = [float(item) for item in sections[0]['anchors'].split(',')]
+        masks = [[int(item) for item in section['mask'].split(',')] for section in sections]
+        return np.array(anchors, np.float32).reshape(-1, 2), np.array(masks)
+
+    def get_nms_settings(self):
+        """
+        Get non-max suppression settings used to create YoloNMS layers.
+
+        Returns:
+            A dictionary of YoloNMS kwargs.
+        """
+        return {
+            'max_boxes': self.max_boxes,
+            'iou_threshold': self.iou_threshold,
+            'score_threshold': self.score_threshold,
+            'nms_mode': self.nms_mode,
+            'pre_nms_top_k': self.pre_nms_top_k,
+        }
+
+    def suppress_candidates(self, bbox, confidence, class_probabilities):
+        """
+        Apply non-max suppression to flat candidates using current
+        settings, see YoloNMS.
+        Args:
+            bbox: Boxes of shape (n, boxes, 4)
+            confidence: Objectness of shape (n, boxes, 1)
+            class_probabilities: Class probabilities of shape (n, boxes, classes)
+
+        Returns:
+            boxes, scores, classes, valid_detections
+        """
+        nms = YoloNMS(**self.get_nms_settings())
+        return nms([bbox, confidence, class_probabilities])
+
     def get_nms(self, outputs):
         """
         Apply non-max suppression and get valid detections.
         Args:
-            outputs: yolo model outputs.
+            outputs: A list of (boxes, objectness, class probabilities) per
+                yolo output.
 
         Returns:
             boxes, scores, classes, valid_detections
@@ -212,21 +302,7 @@ class BaseModel(dict):
         bbox = tf.concat(boxes, axis=1)
         confidence = tf.concat(conf, axis=1)
         class_probabilities = tf.concat(type_, axis=1)
-        scores = confidence * class_probabilities
-        (
-            boxes,
-            scores,
-            classes,
-            valid_detections,
-        ) = tf.image.combined_non_max_suppression(
-            boxes=tf.reshape(bbox, (tf.shape(bbox)[0], -1, 1, 4)),
-            scores=tf.reshape(scores, (tf.shape(scores)[0], -1, tf.shape(scores)[-1])),
-            max_output_size_per_class=self.max_boxes,
-            max_total_size=self.max_boxes,
-            iou_threshold=self.iou_threshold,
-            score_threshold=self.score_threshold,
-        )
-        return boxes, scores, classes, valid_detections
+        return self.suppress_candidates(bbox, confidence, class_probabilities)
 
     def create_convolution(self, cfg_parser, section):
         """
@@ -246,7 +322,7 @@ class BaseModel(dict):
         batch_normalize = 'batch_normalize' in cfg_parser[section]
         padding = 'same' if pad == 1 and stride == 1 else 'valid'
         if filters == 255:
-            filters = 3 * (self.classes + 5)
+            filters = len(self.masks[len(self.output_indices)]) * (self.classes + 5)
         if stride > 1:
             self.previous_layer = self.apply_func(
                 ZeroPadding2D, self.previous_layer, ((1, 0), (1, 0))
@@ -286,15 +362,17 @@ class BaseModel(dict):
             None
         """
         ids = [int(i) for i in cfg_parser[section]['layers'].split(',')]
+        groups = int(cfg_parser[section].get('groups', 1))
+        group_id = int(cfg_parser[section].get('group_id', 0))
         layers = [self.model_layers[i] for i in ids]
         if len(layers) > 1:
-            concatenate_layer = self.apply_func(Concatenate, layers)
-            self.model_layers.append(concatenate_layer)
-            self.previous_layer = concatenate_layer
+            route_layer = self.apply_func(Concatenate, layers)
         else:
-            skip_layer = layers[0]
-            self.model_layers.append(skip_layer)
-            self.previous_layer = skip_layer
+            route_layer = layers[0]
+        if groups > 1:
+            route_layer = self.apply_func(RouteGroup, route_layer, groups, group_id)
+        self.model_layers.append(route_layer)
+        self.previous_layer = route_layer
 
     def create_max_pool(self, cfg_parser, section):
         """
@@ -361,18 +439,11 @@ class BaseModel(dict):
         self.output_indices.append(len(self.model_layers))
         x = self.model_layers[-1]
         x = self.apply_func(
-            Lambda,
+            YoloOutput,
             x,
-            lambda item: tf.reshape(
-                item,
-                (
-                    -1,
-                    tf.shape(item)[1],
-                    tf.shape(item)[2],
-                    3,
-                    self.classes + 5,
-                ),
-            ),
+            self.classes,
+            len(self.masks[len(self.output_indices) - 1]),
+            dtype='float32',
         )
         self.model_layers.append(x)
         self.previous_layer = self.model_layers[-1]
@@ -400,59 +471,274 @@ class BaseModel(dict):
         if section.startswith('yolo'):
             self.create_output_layer()
 
-    @timer(LOGGER)
-    def create_models(self, reverse_v4=False):
+    def create_training_model(self, reverse_v4=False):
         """
-        Create training and inference yolo models.
+        Create training model from DarkNet cfg file.
+        Args:
+            reverse_v4: If True, v4 outputs are reversed.
 
         Returns:
-            training, inference models
+            training model.
         """
-        input_initial = self.apply_func(Input, shape=self.input_shape)
+        input_shape = self.input_shape
+        if self.dynamic_input:
+            input_shape = (None, None, self.input_shape[-1])
+        input_initial = self.apply_func(Input, shape=input_shape)
         cfg_out = self.read_dark_net_cfg()
         cfg_parser = configparser.ConfigParser()
         cfg_parser.read_file(cfg_out)
+        self.model_layers = []
         self.output_indices = []
         self.previous_layer = input_initial
         for section in cfg_parser.sections():
             self.create_section(section, cfg_parser)
         if len(self.output_indices) == 0:
             self.output_indices.append(len(self.model_layers) - 1)
-        self.output_layers.extend([self.model_layers[i] for i in self.output_indices])
+        self.output_layers = [self.model_layers[i] for i in self.output_indices]
         if '4' in self.model_configuration and reverse_v4:
             self.output_layers.reverse()
         self.training_model = Model(inputs=input_initial, outputs=self.output_layers)
-        output_0, output_1, output_2 = self.output_layers
-        boxes_0 = self.apply_func(
-            Lambda,
-            output_0,
-            lambda item: get_boxes(item, self.anchors[self.masks[0]], self.classes),
-        )
-        boxes_1 = self.apply_func(
-            Lambda,
-            output_1,
-            lambda item: get_boxes(item, self.anchors[self.masks[1]], self.classes),
-        )
-        boxes_2 = self.apply_func(
-            Lambda,
-            output_2,
-            lambda item: get_boxes(item, self.anchors[self.masks[2]], self.classes),
+        return self.training_model
+
+    def create_inference_model(self):
+        """
+        Create inference model from training model outputs, all outputs are
+        decoded by a single YoloDecode layer and anchors are scaled according
+        to the runtime input size. Non-max suppression is applied by a YoloNMS
+        layer, so the inference model can be serialized and reloaded.
+
+        Returns:
+            inference model.
+        """
+        decoded = self.apply_func(
+            YoloDecode,
+            [*self.output_layers, self.training_model.input],
+            [self.anchors[mask] * self.input_shape[0] for mask in self.masks],
+            self.classes,
         )
-        outputs = self.apply_func(
-            Lambda,
-            (boxes_0[:3], boxes_1[:3], boxes_2[:3]),
-            lambda item: self.get_nms(item),
+        outputs = self.apply_func(YoloNMS, decoded, **self.get_nms_settings())
+        self.inference_model = Model(
+            self.training_model.input, outputs, name='inference_model'
         )
-        self.inference_model = Model(input_initial, outputs, name='inference_model')
+        return self.inference_model
+
+    @staticmethod
+    def clear_cache(cache_dir=None):
+        """
+        Delete converted DarkNet weights.
+        Args:
+            cache_dir: Converted weights folder, defaults to models/converted
+
+        Returns:
+            Number of deleted files.
+        """
+        folder = cache_dir or get_abs_path('models', 'converted')
+        deleted = 0
+        for item in Path(folder).glob('*'):
+            if item.suffix == '.npz':
+                item.unlink()
+                deleted += 1
+        LOGGER.info(f'Cleared {folder}')
+        return deleted
+
+    @timer(LOGGER)
+    def create_models(self, reverse_v4=False):
+        """
+        Create training and inference yolo models. Training model layers are
+        created using the precision policy, outputs, decoding and non-max
+        suppression are kept in float32.
+
+        Returns:
+            training, inference models
+        """
+        assert self.precision in (
+            'float32',
+            'mixed_float16',
+            'mixed_bfloat16',
+        ), f'Invalid precision {self.precision}'
+        global_policy = tf.keras.mixed_precision.global_policy()
+        tf.keras.mixed_precision.set_global_policy(self.precision)
+        try:
+            self.create_training_model(reverse_v4)
+        finally:
+            tf.keras.mixed_precision.set_global_policy(global_policy)
+        self.create_inference_model()
         LOGGER.info('Training and inference models created')
         return self.training_model, self.inference_model
 
+    def fold_batch_normalization(self, tolerance=1e-3):
+        """
+        Fold batch normalization layers into preceding convolution kernels and
+        biases, outputs are checked against the unfolded model and the
+        inference model is recreated.
+        Args:
+            tolerance: Maximum absolute / relative output difference, relaxed
+                to 0.1 for mixed precision models.
+
+        Returns:
+            training model without batch normalization layers.
+        """
+        if self.precision != 'float32':
+            tolerance = max(tolerance, 0.1)
+        config = self.training_model.get_config()
+        consumers = defaultdict(int)
+        for layer in config['layers']:
+            for node in layer['inbound_nodes']:
+                for inbound in node:
+                    consumers[inbound[0]] += 1
+        configs = {layer['name']: layer for layer in config['layers']}
+        folded = {}
+        for layer in config['layers']:
+            if layer['class_name'] != 'BatchNormalization':
+                continue
+            convolution = layer['inbound_nodes'][0][0][0]
+            if (
+                configs[convolution]['class_name'] != 'Conv2D'
+                or consumers[convolution] != 1
+                or layer['config']['axis'] not in (-1, 3, [3])
+            ):
+                continue
+            configs[convolution]['config']['use_bias'] = True
+            folded[layer['name']] = convolution
+        config['layers'] = [
+            layer for layer in config['layers'] if layer['name'] not in folded
+        ]
+        for layer in config['layers']:
+            for node in layer['inbound_nodes']:
+                for inbound in node:
+                    inbound[0] = folded.get(inbound[0], inbound[0])
+        for output in config['output_layers']:
+            output[0] = folded.get(output[0], output[0])
+        folded_model = Model.from_config(
+            config,
+            custom_objects={
+                'Mish': Mish,
+                'YoloOutput': YoloOutput,
+                'RouteGroup': RouteGroup,
+            },
+        )
+        batch_norms = {convolution: name for name, convolution in folded.items()}
+        for layer in folded_model.layers:
+            original = self.training_model.get_layer(layer.name)
+            if layer.name not in batch_norms:
+                layer.set_weights(original.get_weights())
+                continue
+            batch_norm = self.training_model.get_layer(batch_norms[layer.name])
+            kernel, *bias = original.get_weights()
+            gamma, beta, mean, variance = batch_norm.get_weights()
+            scale = gamma / np.sqrt(variance + batch_norm.epsilon)
+            bias = beta - mean * scale + (bias[0] * scale if bias else 0)
+            layer.set_weights([kernel * scale, bias])
+        images = np.random.uniform(size=(1, *self.input_shape)).astype(np.float32)
+        expected = self.training_model(images, training=False)
+        actual = folded_model(images, training=False)
+        if not isinstance(expected, (list, tuple)):
+            expected, actual = [expected], [actual]
+        difference = max(
+            float(np.max(np.abs(np.asarray(item) - np.asarray(folded_item))))
+            for item, folded_item in zip(expected, actual)
+        )
+        assert all(
+            np.allclose(item, folded_item, atol=tolerance, rtol=tolerance)
+            for item, folded_item in zip(expected, actual)
+        ), f'Folded model outputs differ by up to {difference}'
+        LOGGER.info(
+            f'Folded {len(folded)} batch normalization layers, '
+            f'maximum output difference: {difference}'
+        )
+        self.training_model = folded_model
+        self.output_layers = list(folded_model.outputs)
+        self.create_inference_model()
+        return folded_model
+
+    def get_converted_weights_path(self, weights_file, dtype='float32'):
+        """
+        Get path to converted DarkNet weights, keyed by the cfg hash, number of
+        classes, input channels, dtype and DarkNet weights size / modification time.
+        Args:
+            weights_file: .weights file path.
+            dtype: Converted weights dtype, float32 or float16.
+
+        Returns:
+            models/converted/<weights name>-<key>.npz
+        """
+        weights_stat = os.stat(weights_file)
+        key = hashlib.sha256(open(self.model_configuration, 'rb').read())
+        key.update(
+            f'{self.classes},{self.input_shape[-1]},{dtype},'
+            f'{weights_stat.st_size},{weights_stat.st_mtime_ns}'.encode('utf-8')
+        )
+        return get_abs_path(
+            'models',
+            'converted',
+            f'{Path(weights_file).stem}-{key.hexdigest()[:16]}.npz',
+            create_parents=True,
+        )
+
+    def load_dark_net_weights(self, weights_file):
+        """
+        Load DarkNet weights using a single memory map, convolution and
+        batch normalization parameters are assigned from zero-copy views.
+        Args:
+            weights_file: .weights file path.
+
+        Returns:
+            None
+        """
+        weights_data = np.memmap(weights_file, dtype=np.float32, mode='r', offset=20)
+        position = 0
+        layers = sorted(
+            self.training_model.layers, key=lambda layer: int(layer.name.split('_')[1])
+        )
+        for layer, next_layer in zip(layers, [*layers[1:], None]):
+            if position == weights_data.size:
+                break
+            if 'conv2d' not in layer.name:
+                continue
+            b_norm_layer = (
+                next_layer
+                if next_layer is not None and 'batch_normalization' in next_layer.name
+                else None
+            )
+            filters = layer.filters
+            kernel_size = layer.kernel_size[0]
+            input_dimension = layer.get_input_shape_at(-1)[-1]
+            convolution_bias = bn_weights = None
+            if b_norm_layer is None:
+                convolution_bias = weights_data[position : position + filters]
+                position += filters
+            else:
+                bn_weights = weights_data[position : position + 4 * filters].reshape(
+                    (4, filters)
+                )
+                position += 4 * filters
+            convolution_shape = (filters, input_dimension, kernel_size, kernel_size)
+            convolution_size = int(np.prod(convolution_shape))
+            convolution_weights = (
+                weights_data[position : position + convolution_size]
+                .reshape(convolution_shape)
+                .transpose([2, 3, 1, 0])
+            )
+            position += convolution_size
+            if b_norm_layer is None:
+                try:
+                    layer.set_weights([convolution_weights, convolution_bias])
+                except ValueError:
+                    pass
+            if b_norm_layer is not None:
+                layer.set_weights([convolution_weights])
+                b_norm_layer.set_weights([bn_weights[i] for i in (1, 0, 2, 3)])
+        assert position == weights_data.size, 'failed to read all data'
+        del weights_data
+
     @timer(LOGGER)
-    def load_weights(self, weights_file):
+    def load_weights(self, weights_file, converted_dtype=None):
         """
         Load DarkNet weights or checkpoint/pre-trained weights.
         Args:
-            weights_file: .weights or .tf file path.
+            weights_file: .weights, .tf or converted .npz file path.
+            converted_dtype: float32 or float16, if specified, converted
+                DarkNet weights are saved to / loaded from models/converted
 
         Returns:
             None
@@ -460,6 +746,7 @@ class BaseModel(dict):
         assert (suffix := Path(weights_file).suffix) in [
             '.tf',
             '.weights',
+            '.npz',
         ], 'Invalid weights file'
         assert (
             self.classes == 80 if suffix == '.weights' else 1
@@ -468,72 +755,88 @@ class BaseModel(dict):
             self.training_model.load_weights(get_abs_path(weights_file))
             LOGGER.info(f'Loaded weights: {weights_file} ... success')
             return
-        with open(get_abs_path(weights_file, verify=True), 'rb') as weights_data:
-            LOGGER.info(f'Loading pre-trained weights ...')
-            major, minor, revision, seen, _ = np.fromfile(
-                weights_data, dtype=np.int32, count=5
+        assert converted_dtype in (
+            None,
+            'float32',
+            'float16',
+        ), f'Invalid converted weights dtype {converted_dtype}'
+        weights_file = get_abs_path(weights_file, verify=True)
+        converted_file = None
+        if suffix == '.npz':
+            converted_file = weights_file
+        elif converted_dtype:
+            converted_file = self.get_converted_weights_path(
+                weights_file, converted_dtype
             )
-            self.model_layers = [
-                layer
-                for layer in self.training_model.layers
-                if id(layer) not in [id(item) for item in self.output_layers]
-            ]
-            self.model_layers.sort(key=lambda layer: int(layer.name.split('_')[1]))
-            self.model_layers.extend(self.output_layers)
-            for i, layer in enumerate(self.model_layers):
-                current_read = weights_data.tell()
-                total_size = os.fstat(weights_data.fileno()).st_size
-                if current_read == total_size:
-                    print()
-                    break
-                print(
-                    f'\r{round(100 * (current_read / total_size))}'
-                    f'%\t{current_read}/{total_size}',
-                    end='',
+        if converted_file and os.path.exists(converted_file):
+            with np.load(converted_file) as converted:
+                self.training_model.set_weights(
+                    [converted[f'arr_{i}'] for i in range(len(converted.files))]
                 )
-                if 'conv2d' not in layer.name:
-                    continue
-                next_layer = self.model_layers[i + 1]
-                b_norm_layer = (
-                    next_layer if 'batch_normalization' in next_layer.name else None
-                )
-                filters = layer.filters
-                kernel_size = layer.kernel_size[0]
-                input_dimension = layer.get_input_shape_at(-1)[-1]
-                convolution_bias = (
-                    np.fromfile(weights_data, dtype=np.float32, count=filters)
-                    if b_norm_layer is None
-                    else None
-                )
-                bn_weights = (
-                    np.fromfile(
-                        weights_data, dtype=np.float32, count=4 * filters
-                    ).reshape((4, filters))[[1, 0, 2, 3]]
-                    if (b_norm_layer is not None)
-                    else None
-                )
-                convolution_shape = (
-                    filters,
-                    input_dimension,
-                    kernel_size,
-                    kernel_size,
-                )
-                convolution_weights = (
-                    np.fromfile(
-                        weights_data,
-                        dtype=np.float32,
-                        count=np.product(convolution_shape),
-                    )
-                    .reshape(convolution_shape)
-                    .transpose([2, 3, 1, 0])
-                )
-                if b_norm_layer is None:
-                    try:
-                        layer.set_weights([convolution_weights, convolution_bias])
-                    except ValueError:
-                        pass
-                if b_norm_layer is not None:
-                    layer.set_weights([convolution_weights])
-                    b_norm_layer.set_weights(bn_weights)
-            assert len(weights_data.read()) == 0, 'failed to read all data'
-        LOGGER.info(f'\nLoaded weights: {weights_file} ... success')
+            LOGGER.info(f'Loaded converted weights: {converted_file} ... success')
+            return
+        LOGGER.info(f'Loading pre-trained weights ...')
+        self.load_dark_net_weights(weights_file)
+        LOGGER.info(f'Loaded weights: {weights_file} ... success')
+        if converted_file:
+            np.savez(
+                converted_file,
+                *[
+                    weights.astype(converted_dtype)
+                    if np.issubdtype(weights.dtype, np.floating)
+                    else weights
+                    for weights in self.training_model.get_weights()
+                ],
+            )
+            LOGGER.info(f'Saved converted weights: {converted_file}')
+
+    def load_inference_model(self, trained_weights):
+        """
+        Create models and load weights or load an exported model.
+        Args:
+            trained_weights: .tf, .weights or converted .npz file or exported
+                SavedModel folder or exported .tflite file.
+
+        Returns:
+            None
+        """
+        if os.path.isdir(trained_weights):
+            self.backend = SavedModelBackend(trained_weights)
+            self.input_shape = (
+                self.backend.input_size,
+                self.backend.input_size,
+                self.input_shape[-1],
+            )
+            LOGGER.info(f'Loaded SavedModel: {trained_weights} ... success')
+            return
+        if trained_weights.endswith('.tflite'):
+            self.backend = TFLiteBackend(
+                trained_weights, self.suppress_candidates, self.tflite_threads
+            )
+            self.input_shape = (
+                self.backend.input_size,
+                self.backend.input_size,
+                self.input_shape[-1],
+            )
+            LOGGER.info(f'Loaded TFLite model: {trained_weights} ... success')
+            return
+        assert self.model_configuration, 'DarkNet cfg file is required'
+        self.create_models(reverse_v4=True if trained_weights.endswith('tf') else False)
+        self.load_weights(trained_weights, self.converted_dtype)
+        if self.fold_batch_norm:
+            self.fold_batch_normalization()
+        if self.xla_batch_sizes:
+            self.backend = XLABackend(self, self.xla_batch_sizes)
+
+    def predict_batch(self, images):
+        """
+        Run inference on a batch of resized images.
+        Args:
+            images: Image tensor of shape (n, size, size, c) scaled to [0, 1]
+
+        Returns:
+            boxes, scores, classes, valid_detections
+        """
+        if self.backend is not None:
+            return self.backend(images)
+        return self.inference_model.predict_on_batch(images)
@@ -0,0 +1,217 @@
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+from tensorflow.keras.layers import Conv2D, MaxPooling2D
+from yolo_tf2.core.models import BaseModel
+from yolo_tf2.utils.common import LOGGER, get_abs_path, timer
+
+
+class ModelProfiler(BaseModel):
+    """
+    Per cfg section cost profiler of models created from DarkNet cfg files.
+    """
+
+    def __init__(
+        self,
+        input_shape,
+        model_configuration,
+        classes_file,
+        anchors=None,
+        masks=None,
+        max_boxes=100,
+        iou_threshold=0.5,
+        score_threshold=0.5,
+    ):
+        """
+        Initialize profiling settings.
+        Args:
+            input_shape: tuple, (n, n, c)
+            model_configuration: Path to DarkNet cfg file.
+            classes_file: File containing class names \n delimited.
+            anchors: numpy array of (w, h) pairs.
+            masks: numpy array of masks.
+            max_boxes: Maximum boxes of the tfrecords provided(if any) or
+                maximum boxes setting.
+            iou_threshold: float, values less than the threshold are ignored.
+            score_threshold: float, values less than the threshold are ignored.
+        """
+        self.classes_file = get_abs_path(classes_file, verify=True)
+        self.class_names = [item.strip() for item in open(self.classes_file)]
+        super().__init__(
+            input_shape,
+            model_configuration,
+            len(self.class_names),
+            anchors,
+            masks,
+            max_boxes,
+            iou_threshold,
+            score_threshold,
+        )
+        self.section_layers = {}
+        self.elementwise_flops = {
+            'BatchNormalization': 2,
+            'LeakyReLU': 1,
+            'Mish': 4,
+            'Add': 1,
+        }
+
+    def create_section(self, section, cfg_parser):
+        """
+        Create a section from the model configuration file and record
+        the numbers of the layers it creates.
+        Args:
+            cfg_parser: Model configuration cfg parser.
+            section: cfg section
+
+        Returns:
+            None
+        """
+        start = self.current_layer
+        super(ModelProfiler, self).create_section(section, cfg_parser)
+        self.section_layers[section] = range(start, self.current_layer)
+
+    def get_layer_flops(self, layer, batch_size):
+        """
+        Get analytic FLOPs of a layer.
+        Args:
+            layer: tf.keras.layers.Layer
+            batch_size: Number of images.
+
+        Returns:
+            FLOPs
+        """
+        output_elements = batch_size * np.prod(layer.output_shape[1:])
+        if isinstance(layer, Conv2D):
+            return (
+                2
+                * np.prod(layer.kernel_size)
+                * layer.input_shape[-1]
+                * output_elements
+            )
+        if isinstance(layer, MaxPooling2D):
+            return np.prod(layer.pool_size) * output_elements
+        return self.elementwise_flops.get(type(layer).__name__, 0) * output_elements
+
+    def get_layer_times(self, images, iterations):
+        """
+        Time eager forward calls of every layer on CPU, using the layer
+        inputs of a full forward pass.
+        Args:
+            images: Input tensor.
+            iterations: Timed forward passes.
+
+        Returns:
+            A dictionary of layer number -> mean time in milliseconds.
+        """
+        model = self.training_model
+        layers = [layer for layer in model.layers if layer.name.startswith('layer_')]
+        times = {}
+        with tf.device('/CPU:0'):
+            outputs = tf.keras.Model(
+                model.inputs, [layer.output for layer in layers]
+            )(images)
+            values = {id(model.inputs[0]): images}
+            values.update(
+                {id(layer.output): output for layer, output in zip(layers, outputs)}
+            )
+            for layer in layers:
+                inputs = tf.nest.map_structure(
+                    lambda tensor: values[id(tensor)], layer.input
+                )
+                layer(inputs)
+                start_time = perf_counter()
+                for _ in range(iterations):
+                    layer(inputs)
+                times[int(layer.name.split('_')[1])] = (
+                    (perf_counter() - start_time) * 1000 / iterations
+                )
+        return times
+
+    @timer(LOGGER)
+    def profile(
+        self,
+        batch_size=1,
+        iterations=10,
+        fold_batch_norm=False,
+        output_file=None,
+    ):
+        """
+        Create model and report parameters, analytic FLOPs, activation memory
+        and eager CPU forward time of every cfg section.
+        Args:
+            batch_size: Number of images per forward pass.
+            iterations: Timed forward passes.
+            fold_batch_norm: If True, batch normalization layers are folded
+                into preceding convolutions before profiling.
+            output_file: Path to output JSON file, defaults to
+                output/profiling/<cfg name>-profile.json
+
+        Returns:
+            pandas DataFrame with one row per cfg section sorted by time.
+        """
+        output_file = get_abs_path(
+            output_file
+            or f'output/profiling/{Path(self.model_configuration).stem}-profile.json',
+            create_parents=True,
+        )
+        self.create_models()
+        if fold_batch_norm:
+            self.fold_batch_normalization()
+        layers = {
+            int(layer.name.split('_')[1]): layer
+            for layer in self.training_model.layers
+            if layer.name.startswith('layer_')
+        }
+        images = tf.random.uniform((batch_size, *self.input_shape))
+        times = self.get_layer_times(images, iterations)
+        report = []
+        sections = [
+            (section, numbers)
+            for section, numbers in self.section_layers.items()
+            if not section.startswith('net')
+        ]
+        for i, (section, numbers) in enumerate(sections):
+            section_layers = [layers[number] for number in numbers if number in layers]
+            if not section_layers:
+                continue
+            report.append(
+                {
+                    'index': i,
+                    'section': section,
+                    'layers': ', '.join(
+                        type(layer).__name__ for layer in section_layers
+                    ),
+                    'output shape': str(section_layers[-1].output_shape[1:]),
+                    'parameters': sum(layer.count_params() for layer in section_layers),
+                    'MFLOPs': sum(
+                        self.get_layer_flops(layer, batch_size)
+                        for layer in section_layers
+                    )
+                    / 1e6,
+                    'activation MB': sum(
+                        batch_size
+                        * np.prod(layer.output_shape[1:])
+                        * tf.as_dtype(layer.dtype_policy.compute_dtype).size
+                        for layer in section_layers
+                    )
+                    / 1024 ** 2,
+                    'time ms': sum(times.get(number, 0) for number in numbers),
+                }
+            )
+        report = pd.DataFrame(report)
+        total_time = report['time ms'].sum()
+        report['time %'] = report['time ms'] / total_time * 100
+        report = report.sort_values('time ms', ascending=False).reset_index(drop=True)
+        report.to_json(output_file, orient='records', indent=2)
+        LOGGER.info(f'Model profile:\n{report.to_markdown(index=False)}')
+        LOGGER.info(
+            f'Total parameters: {report["parameters"].sum()}, '
+            f'GFLOPs: {report["MFLOPs"].sum() / 1000}, '
+            f'activation MB: {report["activation MB"].sum()}, '
+            f'time ms: {total_time}'
+        )
+        LOGGER.info(f'Saved model profile: {output_file}')
+        return report
@@ -0,0 +1,353 @@
+import configparser
+from pathlib import Path
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+from tensorflow.keras.layers import BatchNormalization, Conv2D
+from yolo_tf2.core.models import BaseModel
+from yolo_tf2.utils.common import LOGGER, get_abs_path, timer
+
+
+class Pruner(BaseModel):
+    """
+    Tool for pruning convolution channels based on batch normalization
+    scaling factors(gamma).
+    """
+
+    def __init__(
+        self,
+        input_shape,
+        model_configuration,
+        classes_file,
+        anchors=None,
+        masks=None,
+        max_boxes=100,
+        iou_threshold=0.5,
+        score_threshold=0.5,
+    ):
+        """
+        Initialize pruning settings.
+        Args:
+            input_shape: tuple, (n, n, c)
+            model_configuration: Path to DarkNet cfg file.
+            classes_file: File containing class names \n delimited.
+            anchors: numpy array of (w, h) pairs.
+            masks: numpy array of masks.
+            max_boxes: Maximum boxes of the tfrecords provided(if any) or
+                maximum boxes setting.
+            iou_threshold: float, values less than the threshold are ignored.
+            score_threshold: float, values less than the threshold are ignored.
+        """
+        self.classes_file = get_abs_path(classes_file, verify=True)
+        self.class_names = [item.strip() for item in open(self.classes_file)]
+        super().__init__(
+            input_shape,
+            model_configuration,
+            len(self.class_names),
+            anchors,
+            masks,
+            max_boxes,
+            iou_threshold,
+            score_threshold,
+        )
+
+    def get_sections(self):
+        """
+        Get cfg sections that create model layers, in model_layers order.
+
+        Returns:
+            A list of (section name, section) pairs.
+        """
+        cfg_parser = configparser.ConfigParser()
+        cfg_parser.read_file(self.read_dark_net_cfg())
+        prefixes = (
+            'convolutional',
+            'route',
+            'maxpool',
+            'shortcut',
+            'upsample',
+            'yolo',
+        )
+        return [
+            (section, cfg_parser[section])
+            for section in cfg_parser.sections()
+            if section.startswith(prefixes)
+        ]
+
+    @staticmethod
+    def get_section_inputs(i, section_name, section):
+        """
+        Get indices of sections used as inputs of a section.
+        Args:
+            i: Section index.
+            section_name: Section name.
+            section: cfg section.
+
+        Returns:
+            A list of section indices.
+        """
+        if section_name.startswith('route'):
+            ids = [int(item) for item in section['layers'].split(',')]
+            return [item if item >= 0 else i + item for item in ids]
+        if section_name.startswith('shortcut'):
+            index = int(section['from'])
+            return [i - 1, index if index >= 0 else i + index]
+        return [i - 1]
+
+    def get_fixed_sections(self, sections):
+        """
+        Get convolution sections whose channels cannot be pruned because
+        they are added to other layers by shortcuts or split by route groups
+        (directly or through route, max pool or up sample sections).
+        Args:
+            sections: Output of get_sections()
+
+        Returns:
+            A set of section indices.
+        """
+        fixed = set()
+
+        def fix(i):
+            if i < 0 or i in fixed:
+                return
+            fixed.add(i)
+            if not sections[i][0].startswith('convolutional'):
+                for item in self.get_section_inputs(i, *sections[i]):
+                    fix(item)
+
+        for i, (section_name, section) in enumerate(sections):
+            if section_name.startswith('shortcut') or (
+                section_name.startswith('route') and 'groups' in section
+            ):
+                for item in self.get_section_inputs(i, section_name, section):
+                    fix(item)
+        return fixed
+
+    @staticmethod
+    def get_convolutions(model):
+        """
+        Get convolution layers and their batch normalization layers
+        in creation order.
+        Args:
+            model: tf.keras.Model created by BaseModel.
+
+        Returns:
+            A list of (Conv2D, BatchNormalization or None) pairs.
+        """
+        layers = sorted(model.layers, key=lambda layer: int(layer.name.split('_')[1]))
+        return [
+            (layer, next_layer if isinstance(next_layer, BatchNormalization) else None)
+            for layer, next_layer in zip(layers, [*layers[1:], None])
+            if isinstance(layer, Conv2D)
+        ]
+
+    def get_kept_channels(self, sections, ratio, min_channels):
+        """
+        Select channels to keep using a global gamma threshold and propagate
+        kept channels through route, shortcut, max pool and up sample sections.
+        Args:
+            sections: Output of get_sections()
+            ratio: Fraction of prunable channels to remove.
+            min_channels: Minimum channels kept per convolution.
+
+        Returns:
+            A dictionary of section index -> kept output channel indices.
+        """
+        fixed = self.get_fixed_sections(sections)
+        convolution_sections = [
+            i
+            for i, (section_name, _) in enumerate(sections)
+            if section_name.startswith('convolutional')
+        ]
+        gammas = {
+            i: np.abs(b_norm_layer.get_weights()[0])
+            for i, (_, b_norm_layer) in zip(
+                convolution_sections, self.get_convolutions(self.training_model)
+            )
+            if b_norm_layer is not None and i not in fixed
+        }
+        threshold = np.quantile(np.concatenate(list(gammas.values())), ratio)
+        kept, channels = {}, {}
+        for i, (section_name, section) in enumerate(sections):
+            channels[i] = self.model_layers[i].shape[-1]
+            if section_name.startswith('convolutional'):
+                kept[i] = np.arange(channels[i])
+                if i in gammas:
+                    minimum = min(len(gammas[i]), min_channels)
+                    kept[i] = np.where(gammas[i] > threshold)[0]
+                    if len(kept[i]) < minimum:
+                        kept[i] = np.sort(np.argsort(gammas[i])[-minimum:])
+                continue
+            if section_name.startswith('route') and 'groups' in section:
+                kept[i] = np.arange(channels[i])
+                continue
+            if section_name.startswith('route'):
+                offset, parts = 0, []
+                for item in self.get_section_inputs(i, section_name, section):
+                    parts.append(kept[item] + offset)
+                    offset += channels[item]
+                kept[i] = np.concatenate(parts)
+                continue
+            kept[i] = kept[i - 1]
+        return kept
+
+    def write_cfg(self, kept, output_cfg):
+        """
+        Write a copy of the DarkNet cfg file with pruned convolution filters.
+        Args:
+            kept: Output of get_kept_channels()
+            output_cfg: Path to output cfg file.
+
+        Returns:
+            None
+        """
+        prefixes = (
+            '[convolutional',
+            '[route',
+            '[maxpool',
+            '[shortcut',
+            '[upsample',
+            '[yolo',
+        )
+        section_index = -1
+        section_name = ''
+        lines = []
+        with open(self.model_configuration) as cfg:
+            for line in cfg:
+                if line.startswith('['):
+                    section_name = line.strip()
+                    section_index += section_name.startswith(prefixes)
+                if (
+                    section_name.startswith('[convolutional')
+                    and line.strip().replace(' ', '').startswith('filters=')
+                    and line.split('=')[1].strip() != '255'
+                ):
+                    line = f'filters={len(kept[section_index])}\n'
+                lines.append(line)
+        with open(output_cfg, 'w') as cfg:
+            cfg.writelines(lines)
+
+    @staticmethod
+    def get_model_stats(model, input_shape, iterations=10):
+        """
+        Measure parameters, FLOPs and CPU latency of a model.
+        Args:
+            model: tf.keras.Model
+            input_shape: tuple, (n, n, c)
+            iterations: Measured forward passes.
+
+        Returns:
+            A dictionary of statistics.
+        """
+        flops = sum(
+            2
+            * np.prod(layer.kernel_size)
+            * layer.input_shape[-1]
+            * layer.filters
+            * np.prod(layer.output_shape[1:3])
+            for layer in model.layers
+            if isinstance(layer, Conv2D)
+        )
+        images = tf.random.uniform((1, *input_shape))
+        with tf.device('/CPU:0'):
+            model.predict_on_batch(images)
+            start = perf_counter()
+            for _ in range(iterations):
+                model.predict_on_batch(images)
+        return {
+            'parameters': model.count_params(),
+            'GFLOPs': flops / 1e9,
+            'latency ms': (perf_counter() - start) / iterations * 1000,
+        }
+
+    @timer(LOGGER)
+    def prune(
+        self,
+        trained_weights,
+        ratio=0.5,
+        min_channels=8,
+        output_cfg=None,
+        output_weights=None,
+        latency_iterations=10,
+    ):
+        """
+        Remove a fraction of convolution channels with the smallest batch
+        normalization gamma and save a pruned cfg file and .tf weights
+        that can be loaded / fine-tuned.
+        Args:
+            trained_weights: .tf or .weights file.
+            ratio: Fraction of prunable channels to remove.
+            min_channels: Minimum channels kept per convolution.
+            output_cfg: Path to pruned cfg file, defaults to
+                models/<cfg name>-pruned.cfg
+            output_weights: Path to pruned .tf weights, defaults to
+                models/<cfg name>-pruned.tf
+            latency_iterations: Forward passes used to measure CPU latency.
+
+        Returns:
+            pandas DataFrame with parameters, FLOPs and CPU latency before
+            and after pruning.
+        """
+        assert 0 < ratio < 1, f'Invalid pruning ratio {ratio}'
+        stem = f'{Path(self.model_configuration).stem}-pruned'
+        output_cfg = get_abs_path(output_cfg or f'models/{stem}.cfg', create_parents=True)
+        output_weights = get_abs_path(
+            output_weights or f'models/{stem}.tf', create_parents=True
+        )
+        self.create_models(reverse_v4=True if trained_weights.endswith('tf') else False)
+        self.load_weights(trained_weights)
+        sections = self.get_sections()
+        kept = self.get_kept_channels(sections, ratio, min_channels)
+        self.write_cfg(kept, output_cfg)
+        pruned = BaseModel(
+            self.input_shape,
+            output_cfg,
+            self.classes,
+            self.anchors,
+            self.masks,
+            self.max_boxes,
+            self.iou_threshold,
+            self.score_threshold,
+        )
+        pruned.create_models(reverse_v4=True)
+        convolution_sections = [
+            i
+            for i, (section_name, _) in enumerate(sections)
+            if section_name.startswith('convolutional')
+        ]
+        for i, (convolution, b_norm_layer), (
+            pruned_convolution,
+            pruned_b_norm_layer,
+        ) in zip(
+            convolution_sections,
+            self.get_convolutions(self.training_model),
+            self.get_convolutions(pruned.training_model),
+        ):
+            input_channels = kept.get(i - 1, np.arange(self.input_shape[-1]))
+            kernel, *bias = convolution.get_weights()
+            kernel = kernel[:, :, input_channels][..., kept[i]]
+            pruned_convolution.set_weights([kernel, *[item[kept[i]] for item in bias]])
+            if b_norm_layer is not None:
+                pruned_b_norm_layer.set_weights(
+                    [item[kept[i]] for item in b_norm_layer.get_weights()]
+                )
+        pruned.training_model.save_weights(output_weights)
+        report = pd.DataFrame(
+            [
+                self.get_model_stats(
+                    model.training_model, self.input_shape, latency_iterations
+                )
+                for model in (self, pruned)
+            ],
+            index=['original', 'pruned'],
+        )
+        report_path = get_abs_path(
+            'output', 'pruning', f'{stem}-report.csv', create_parents=True
+        )
+        report.to_csv(report_path)
+        LOGGER.info(f'Pruning report:\n{report.to_markdown()}')
+        LOGGER.info(f'Saved pruned cfg: {output_cfg}')
+        LOGGER.info(f'Saved pruned weights: {output_weights}')
+        return report
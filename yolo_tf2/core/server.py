@@ -0,0 +1,258 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlparse
+
+import tensorflow as tf
+from yolo_tf2.utils.common import LOGGER
+
+
+class DetectionServer:
+    """
+    Local HTTP detection server that merges concurrent requests into batches.
+
+    Endpoints:
+        POST /detect?name=<image name>&size=<input size>  body: encoded image bytes
+            -> detections in get_detection_data() columns
+            {"columns": [...], "data": [[...], ...]}
+        GET /health -> {"status": "ok"}
+    """
+
+    def __init__(
+        self,
+        detector,
+        trained_weights,
+        host='127.0.0.1',
+        port=8080,
+        max_batch=8,
+        max_wait_ms=10,
+        workers=4,
+    ):
+        """
+        Load model and initialize server settings.
+        Args:
+            detector: core.detector.Detector object.
+            trained_weights: .tf or .weights file or exported SavedModel
+                folder or exported .tflite file.
+            host: Host address, defaults to localhost.
+            port: int, port number, if 0, an ephemeral port is used and
+                port is set once the server is started.
+            max_batch: Maximum images per forward pass.
+            max_wait_ms: Maximum time a request waits for a batch to fill.
+            workers: Parallel image decoding.
+        """
+        self.detector = detector
+        self.detector.load_inference_model(trained_weights)
+        self.host = host
+        self.port = port
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.decode_executor = ThreadPoolExecutor(max_workers=workers)
+        self.inference_executor = ThreadPoolExecutor(max_workers=1)
+        self.requests = None
+
+    async def detect(self, image_bytes, image_name, input_size=None):
+        """
+        Decode an image and wait for its detections.
+        Args:
+            image_bytes: Encoded image bytes.
+            image_name: str, name to write in the image column.
+            input_size: int, size to which the image is resized, defaults
+                to detector input size.
+
+        Returns:
+            pandas DataFrame with detections.
+        """
+        loop = asyncio.get_running_loop()
+        image_data, resized = await loop.run_in_executor(
+            self.decode_executor,
+            self.detector.decode_image,
+            image_bytes,
+            True,
+            input_size,
+        )
+        result = loop.create_future()
+        await self.requests.put((image_data, resized, image_name, result))
+        return await result
+
+    def detect_batch(self, batch):
+        """
+        Detect a batch of decoded requests, requests of the same input size
+        are detected in a single forward pass.
+        Args:
+            batch: A list of (image, resized, image name, future) items.
+
+        Returns:
+            A list of pandas DataFrame(s) with detections.
+        """
+        groups = {}
+        for i, (_, resized, *_) in enumerate(batch):
+            groups.setdefault(resized.shape[0], []).append(i)
+        results = [None] * len(batch)
+        for indices in groups.values():
+            images, resized, image_names, _ = zip(*[batch[i] for i in indices])
+            detected = self.detector.detect_images(
+                images, image_names, tf.stack(resized)
+            )
+            for i, (detections, _) in zip(indices, detected):
+                results[i] = detections
+        return results
+
+    async def batch_requests(self):
+        """
+        Merge queued requests into batches of up to max_batch images or
+        max_wait_ms, whichever comes first.
+
+        Returns:
+            None
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.requests.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(
+                        await asyncio.wait_for(self.requests.get(), timeout)
+                    )
+                except asyncio.TimeoutError:
+                    break
+            try:
+                results = await loop.run_in_executor(
+                    self.inference_executor, self.detect_batch, batch
+                )
+            except Exception as e:
+                LOGGER.error(f'Batch detection failed\n{e}')
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (*_, future), detections in zip(batch, results):
+                if not future.done():
+                    future.set_result(detections)
+
+    @staticmethod
+    async def respond(writer, status, body):
+        """
+        Write a JSON HTTP response and close the connection.
+        Args:
+            writer: asyncio.StreamWriter object.
+            status: http.HTTPStatus
+            body: str, JSON body.
+
+        Returns:
+            None
+        """
+        body = body.encode('utf-8')
+        writer.write(
+            f'HTTP/1.1 {status.value} {status.phrase}\r\n'
+            f'Content-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            f'Connection: close\r\n\r\n'.encode('utf-8')
+            + body
+        )
+        await writer.drain()
+        writer.close()
+
+    async def handle_connection(self, reader, writer):
+        """
+        Handle a single HTTP request.
+        Args:
+            reader: asyncio.StreamReader object.
+            writer: asyncio.StreamWriter object.
+
+        Returns:
+            None
+        """
+        try:
+            method, target, _ = (await reader.readline()).decode('latin-1').split()
+            headers = {}
+            while (line := await reader.readline()) not in (b'\r\n', b'\n', b''):
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get('content-length', 0)))
+        except (ValueError, asyncio.IncompleteReadError):
+            await self.respond(
+                writer, HTTPStatus.BAD_REQUEST, json.dumps({'error': 'Bad request'})
+            )
+            return
+        url = urlparse(target)
+        if url.path == '/health' and method == 'GET':
+            await self.respond(writer, HTTPStatus.OK, json.dumps({'status': 'ok'}))
+            return
+        if url.path != '/detect':
+            await self.respond(
+                writer, HTTPStatus.NOT_FOUND, json.dumps({'error': 'Not found'})
+            )
+            return
+        if method != 'POST' or not body:
+            await self.respond(
+                writer,
+                HTTPStatus.BAD_REQUEST,
+                json.dumps({'error': 'Expected POST with image bytes'}),
+            )
+            return
+        query = parse_qs(url.query)
+        image_name = query.get('name', ['image'])[0]
+        try:
+            input_size = int(query['size'][0]) if 'size' in query else None
+            self.detector.get_input_size(input_size)
+        except (AssertionError, ValueError) as e:
+            await self.respond(
+                writer,
+                HTTPStatus.BAD_REQUEST,
+                json.dumps({'error': f'Invalid size: {e}'}),
+            )
+            return
+        try:
+            detections = await self.detect(body, image_name, input_size)
+        except tf.errors.InvalidArgumentError:
+            await self.respond(
+                writer, HTTPStatus.BAD_REQUEST, json.dumps({'error': 'Invalid image'})
+            )
+            return
+        except Exception as e:
+            await self.respond(
+                writer, HTTPStatus.INTERNAL_SERVER_ERROR, json.dumps({'error': str(e)})
+            )
+            return
+        await self.respond(
+            writer, HTTPStatus.OK, detections.to_json(orient='split', index=False)
+        )
+
+    async def serve(self):
+        """
+        Start batching and serve until cancelled.
+
+        Returns:
+            None
+        """
+        self.requests = asyncio.Queue()
+        batching = asyncio.create_task(self.batch_requests())
+        server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        self.port = server.sockets[0].getsockname()[1]
+        LOGGER.info(f'Serving detections on http://{self.host}:{self.port}/detect')
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batching.cancel()
+
+    def run(self):
+        """
+        Run server until interrupted.
+
+        Returns:
+            None
+        """
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            LOGGER.info('Server stopped')
+        finally:
+            self.decode_executor.shutdown()
+            self.inference_executor.shutdown()
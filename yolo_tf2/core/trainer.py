@@ -1,5 +1,6 @@
 import os
 import shutil
+from pathlib import Path
 
 import imagesize
 import numpy as np
@@ -18,7 +19,9 @@ from yolo_tf2.utils.annotation_parsers import (adjust_non_voc_csv,
 from yolo_tf2.utils.common import (LOGGER, activate_gpu, calculate_loss,
                                    get_abs_path, get_image_files, timer,
                                    transform_images, transform_targets)
-from yolo_tf2.utils.dataset_handlers import get_feature_map, read_tfr, save_tfr
+from yolo_tf2.utils.dataset_handlers import (get_feature_map,
+                                            get_tf_record_files, read_tfr,
+                                            save_tfr)
 
 
 class Trainer(BaseModel):
@@ -39,6 +42,7 @@ class Trainer(BaseModel):
         iou_threshold=0.5,
         score_threshold=0.5,
         image_folder=None,
+        precision='float32',
     ):
         """
         Initialize trainer.
@@ -46,8 +50,8 @@ class Trainer(BaseModel):
             input_shape: tuple, (n, n, c)
             model_configuration: Path to yolo DarkNet configuration .cfg file.
             classes_file: Path to file containing dataset classes.
-            train_tf_record: Path to training tfrecord.
-            valid_tf_record: Path to validation tfrecord.
+            train_tf_record: Path to training tfrecord or glob pattern of shards.
+            valid_tf_record: Path to validation tfrecord or glob pattern of shards.
             anchors: numpy array of (w, h) pairs.
             masks: numpy array of masks.
             max_boxes: Maximum boxes of the tfrecords provided(if any) or
@@ -55,6 +59,9 @@ class Trainer(BaseModel):
             iou_threshold: float, values less than the threshold are ignored.
             score_threshold: float, values less than the threshold are ignored.
             image_folder: Folder that contains images, defaults to data/photos.
+            precision: float32, mixed_float16 or mixed_bfloat16 keras
+                precision policy, convolutions are computed in 16 bits while
+                variables, outputs and loss are kept in float32.
         """
         if image_folder:
             self.image_folder = get_abs_path(image_folder, verify=True)
@@ -76,12 +83,15 @@ class Trainer(BaseModel):
             iou_threshold,
             score_threshold,
         )
+        self.precision = precision
         self.train_tf_record = train_tf_record
         self.valid_tf_record = valid_tf_record
         if train_tf_record:
-            self.train_tf_record = get_abs_path(train_tf_record, verify=True)
+            self.train_tf_record = get_abs_path(train_tf_record)
+            get_tf_record_files(self.train_tf_record)
         if valid_tf_record:
-            self.valid_tf_record = get_abs_path(valid_tf_record, verify=True)
+            self.valid_tf_record = get_abs_path(valid_tf_record)
+            get_tf_record_files(self.valid_tf_record)
 
     def get_adjusted_labels(self, configuration):
         """
@@ -177,30 +187,75 @@ class Trainer(BaseModel):
             labels_frame = self.augment_photos(new_dataset_conf)
         return labels_frame
 
-    def initialize_dataset(self, tf_record, batch_size, shuffle_buffer=512):
+    def initialize_dataset(
+        self, tf_record, batch_size, shuffle_buffer=512, pipeline_conf=None
+    ):
         """
         Initialize and prepare TFRecord dataset for training.
         Args:
             tf_record: TFRecord file.
             batch_size: int, training batch size
             shuffle_buffer: Buffer size for shuffling dataset.
+            pipeline_conf: A dictionary containing any of the following keys:
+                - parallel_reads: Number of TFRecord files read in parallel,
+                    defaults to AUTOTUNE.
+                - cache: 'memory' or a folder, if specified, decoded and resized
+                    examples are cached in memory or to disk.
+                - deterministic: If False(default), examples may be produced
+                    out of order.
+                - private_threadpool_size: Number of threads of a private
+                    dataset thread pool, defaults to the shared pool.
+                - max_intra_op_parallelism: Maximum parallelism of a single op.
 
         Returns:
             dataset.
         """
+        pipeline_conf = pipeline_conf or {}
+        autotune = tf.data.experimental.AUTOTUNE
+        deterministic = pipeline_conf.get('deterministic', False)
         dataset = read_tfr(
-            tf_record, self.classes_file, get_feature_map(), self.max_boxes
+            tf_record,
+            self.classes_file,
+            get_feature_map(),
+            self.max_boxes,
+            new_size=self.input_shape[:2],
+            parallel_reads=pipeline_conf.get('parallel_reads') or autotune,
+            parallel_calls=autotune,
+            deterministic=deterministic,
         )
-        dataset = dataset.shuffle(shuffle_buffer)
-        dataset = dataset.batch(batch_size)
+        grid_sizes = [output.shape[1] for output in self.training_model.outputs]
         dataset = dataset.map(
             lambda x, y: (
                 transform_images(x, self.input_shape[0]),
-                transform_targets(y, self.anchors, self.masks, self.input_shape[0]),
-            )
+                transform_targets(
+                    y, self.anchors, self.masks, self.input_shape[0], grid_sizes
+                ),
+            ),
+            num_parallel_calls=autotune,
+            deterministic=deterministic,
         )
-        dataset = dataset.prefetch(buffer_size=tf.data.experimental.AUTOTUNE)
-        return dataset
+        if cache := pipeline_conf.get('cache'):
+            if cache != 'memory':
+                cache = get_abs_path(
+                    cache, Path(tf_record).stem.replace('*', ''), create_parents=True
+                )
+            dataset = dataset.cache('' if cache == 'memory' else cache)
+        dataset = dataset.shuffle(shuffle_buffer)
+        dataset = dataset.batch(
+            batch_size, num_parallel_calls=autotune, deterministic=deterministic
+        )
+        dataset = dataset.prefetch(buffer_size=autotune)
+        options = tf.data.Options()
+        options.deterministic = deterministic
+        if pipeline_conf.get('private_threadpool_size'):
+            options.threading.private_threadpool_size = pipeline_conf[
+                'private_threadpool_size'
+            ]
+        if pipeline_conf.get('max_intra_op_parallelism'):
+            options.threading.max_intra_op_parallelism = pipeline_conf[
+                'max_intra_op_parallelism'
+            ]
+        return dataset.with_options(options)
 
     def augment_photos(self, new_dataset_conf):
         """
@@ -273,6 +328,7 @@ class Trainer(BaseModel):
             self.max_boxes,
             self.iou_threshold,
             self.score_threshold,
+            self.precision,
         )
         predictions = evaluator.make_predictions(
             weights_file, merge, workers, shuffle_buffer
@@ -353,6 +409,14 @@ class Trainer(BaseModel):
                 - sequences(required if augmentation is True)
                 - aug_workers(optional if augmentation is True) defaults to 32.
                 - aug_batch_size(optional if augmentation is True) defaults to 64.
+                - tfrecord_shards(optional) Number of training / test TFRecord
+                    files, defaults to 1.
+                - tfrecord_workers(optional) Number of processes writing
+                    TFRecord shards, defaults to 1.
+                - image_storage(optional) 'jpeg' or 'raw', if specified, images
+                    are stored resized to input shape instead of original files.
+                - jpeg_quality(optional) JPEG quality if image_storage is 'jpeg',
+                    defaults to 95.
                 And one of the following is required:
                     - relative_labels: Path to csv file with the following columns:
                     ['image', 'object_name', 'object_index', 'bx', 'by', 'bw', 'bh']
@@ -364,6 +428,7 @@ class Trainer(BaseModel):
         """
         LOGGER.info(f'Generating new dataset ...')
         test_size = new_dataset_conf.get('test_size')
+        image_storage = new_dataset_conf.get('image_storage')
         labels_frame = self.generate_new_frame(new_dataset_conf)
         save_tfr(
             labels_frame,
@@ -371,6 +436,11 @@ class Trainer(BaseModel):
             new_dataset_conf['dataset_name'],
             test_size,
             self,
+            new_dataset_conf.get('tfrecord_shards') or 1,
+            new_dataset_conf.get('tfrecord_workers') or 1,
+            self.input_shape[1::-1] if image_storage else None,
+            image_storage,
+            new_dataset_conf.get('jpeg_quality') or 95,
         )
 
     def check_tf_records(self):
@@ -430,6 +500,7 @@ class Trainer(BaseModel):
         save_figs=True,
         clear_outputs=False,
         n_epoch_eval=None,
+        pipeline_conf=None,
     ):
         """
         Train on the dataset.
@@ -456,6 +527,8 @@ class Trainer(BaseModel):
             save_figs: If True and plot_stats=True, figures will be saved
             clear_outputs: If True, old outputs will be cleared
             n_epoch_eval: Conduct evaluation every n epoch.
+            pipeline_conf: A dictionary containing input pipeline configuration,
+                see Trainer.initialize_dataset()
 
         Returns:
             history object, pandas DataFrame with statistics, mAP score.
@@ -470,19 +543,23 @@ class Trainer(BaseModel):
             self.generate_new_anchors(new_anchors_conf)
         self.create_models(reverse_v4=True)
         if weights:
-            self.load_weights(weights)
+            self.load_weights(weights, self.converted_dtype)
         if new_dataset_conf:
             self.create_new_dataset(new_dataset_conf)
         self.check_tf_records()
         training_dataset = self.initialize_dataset(
-            self.train_tf_record, batch_size, shuffle_buffer
+            self.train_tf_record, batch_size, shuffle_buffer, pipeline_conf
         )
         valid_dataset = self.initialize_dataset(
-            self.valid_tf_record, batch_size, shuffle_buffer
+            self.valid_tf_record, batch_size, shuffle_buffer, pipeline_conf
         )
         optimizer = tf.keras.optimizers.Adam(learning_rate)
+        if self.precision == 'mixed_float16':
+            optimizer = tf.keras.mixed_precision.LossScaleOptimizer(optimizer)
         loss = [
-            calculate_loss(self.anchors[mask], self.classes, self.iou_threshold)
+            calculate_loss(
+                self.anchors[mask], self.classes, self.iou_threshold, self.max_boxes
+            )
             for mask in self.masks
         ]
         self.training_model.compile(optimizer=optimizer, loss=loss)
@@ -512,6 +589,7 @@ class Trainer(BaseModel):
                 save_figs,
                 checkpoint_path,
                 self.image_folder,
+                self.precision,
             )
             callbacks.append(mid_train_eval)
         history = self.training_model.fit(
@@ -563,6 +641,7 @@ class MidTrainingEvaluator(Callback, Trainer):
         save_figs,
         weights_file,
         image_folder,
+        precision='float32',
     ):
         """
         Initialize mid-training evaluation settings.
@@ -591,6 +670,8 @@ class MidTrainingEvaluator(Callback, Trainer):
             save_figs: If True and display_stats, plots will be save to output folder
             weights_file: .tf file(most recent checkpoint)
             image_folder: Path to folder containing training images.
+            precision: float32, mixed_float16 or mixed_bfloat16 keras
+                precision policy.
         """
         Trainer.__init__(
             self,
@@ -605,6 +686,7 @@ class MidTrainingEvaluator(Callback, Trainer):
             iou_threshold,
             score_threshold,
             image_folder,
+            precision,
         )
         self.n_epochs = n_epochs
         self.evaluation_args = [
@@ -0,0 +1,204 @@
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+from yolo_tf2.utils.common import LOGGER, transform_images
+
+
+def get_synthetic_outputs(model, batch_size=1, input_size=None, seed=0):
+    """
+    Create decoded yolo outputs with random boxes and a realistic(mostly low)
+    objectness distribution.
+    Args:
+        model: core.models.BaseModel object.
+        batch_size: Number of images.
+        input_size: int, defaults to model input size.
+        seed: Random seed.
+
+    Returns:
+        A list of (boxes, objectness, class probabilities) per output.
+    """
+    input_size = input_size or model.input_shape[0]
+    generator = np.random.default_rng(seed)
+    outputs = []
+    for stride in (32, 16, 8)[: len(model.masks)]:
+        grid_size = input_size // stride
+        shape = (batch_size, grid_size, grid_size, len(model.masks[0]))
+        xy = generator.uniform(size=(*shape, 2))
+        wh = generator.uniform(0.01, 0.3, size=(*shape, 2))
+        boxes = np.concatenate([xy - wh / 2, xy + wh / 2], -1)
+        objectness = generator.uniform(size=(*shape, 1)) ** 8
+        class_probabilities = generator.uniform(size=(*shape, model.classes)) ** 4
+        outputs.append(
+            tuple(
+                tf.constant(item, tf.float32)
+                for item in (boxes, objectness, class_probabilities)
+            )
+        )
+    return outputs
+
+
+def benchmark_nms(
+    model,
+    modes=('combined', 'per_class', 'agnostic'),
+    pre_nms_top_k=(None, 1000),
+    batch_size=1,
+    input_size=None,
+    iterations=20,
+    warmup=3,
+):
+    """
+    Measure BaseModel.get_nms latency for every mode and pre-NMS top-k
+    combination using synthetic outputs.
+    Args:
+        model: core.models.BaseModel object.
+        modes: nms modes to measure.
+        pre_nms_top_k: pre-NMS top-k values to measure, None disables top-k.
+        batch_size: Number of images.
+        input_size: int, defaults to model input size.
+        iterations: Measured iterations per combination.
+        warmup: Unmeasured iterations per combination.
+
+    Returns:
+        pandas DataFrame with latencies in milliseconds.
+    """
+    outputs = get_synthetic_outputs(model, batch_size, input_size)
+    settings = model.nms_mode, model.pre_nms_top_k
+    results = []
+    try:
+        for mode in modes:
+            for top_k in pre_nms_top_k:
+                model.nms_mode, model.pre_nms_top_k = mode, top_k
+                get_nms = tf.function(model.get_nms)
+                for _ in range(warmup):
+                    get_nms(outputs)
+                durations = []
+                for _ in range(iterations):
+                    start = perf_counter()
+                    *_, valid_detections = get_nms(outputs)
+                    valid_detections.numpy()
+                    durations.append((perf_counter() - start) * 1000)
+                results.append(
+                    {
+                        'mode': mode,
+                        'pre_nms_top_k': top_k or '-',
+                        'mean ms': np.mean(durations),
+                        'median ms': np.median(durations),
+                        'detections': int(np.mean(valid_detections)),
+                    }
+                )
+    finally:
+        model.nms_mode, model.pre_nms_top_k = settings
+    results = pd.DataFrame(results)
+    LOGGER.info(f'NMS benchmark:\n{results.to_markdown(index=False)}')
+    return results
+
+
+def get_matched_detections(reference, detections, iou_threshold=0.5):
+    """
+    Count reference detections matched by detections of the same class.
+    Args:
+        reference: (boxes, scores, classes, valid detections) numpy arrays.
+        detections: (boxes, scores, classes, valid detections) numpy arrays.
+        iou_threshold: Minimum overlap of matched boxes.
+
+    Returns:
+        matched, total
+    """
+    matched = total = 0
+    for i in range(len(reference[3])):
+        reference_boxes = reference[0][i][: reference[3][i]]
+        reference_classes = reference[2][i][: reference[3][i]]
+        boxes = detections[0][i][: detections[3][i]]
+        classes = detections[2][i][: detections[3][i]]
+        total += len(reference_boxes)
+        if not len(reference_boxes) or not len(boxes):
+            continue
+        top_left = np.maximum(reference_boxes[:, None, :2], boxes[None, :, :2])
+        bottom_right = np.minimum(reference_boxes[:, None, 2:], boxes[None, :, 2:])
+        intersection = np.prod(np.clip(bottom_right - top_left, 0, None), -1)
+        areas = np.prod(boxes[:, 2:] - boxes[:, :2], -1)
+        reference_areas = np.prod(reference_boxes[:, 2:] - reference_boxes[:, :2], -1)
+        iou = intersection / (reference_areas[:, None] + areas[None] - intersection)
+        iou = np.where(reference_classes[:, None] == classes[None], iou, 0)
+        matched += int(np.sum(np.max(iou, -1) >= iou_threshold))
+    return matched, total
+
+
+def benchmark_precision(
+    model,
+    trained_weights,
+    precisions=('float32', 'mixed_bfloat16'),
+    image_files=None,
+    batch_size=8,
+    iterations=20,
+    warmup=3,
+):
+    """
+    Measure inference latency of every precision policy and agreement of its
+    detections with float32 detections.
+    Args:
+        model: core.models.BaseModel object.
+        trained_weights: .tf or .weights file.
+        precisions: Precision policies to measure, float32 is always measured
+            first and used as reference.
+        image_files: A list of image paths, defaults to random images,
+            detection agreement is only meaningful using real images.
+        batch_size: Number of images per forward pass.
+        iterations: Measured forward passes per precision.
+        warmup: Unmeasured forward passes per precision.
+
+    Returns:
+        pandas DataFrame with latencies in milliseconds and matched float32
+        detections.
+    """
+    size = model.input_shape[0]
+    if image_files:
+        images = tf.stack(
+            [
+                transform_images(
+                    tf.image.decode_image(
+                        tf.io.read_file(image_file),
+                        model.input_shape[-1],
+                        expand_animations=False,
+                    ),
+                    size,
+                )
+                for image_file in image_files[:batch_size]
+            ]
+        )
+    else:
+        images = tf.random.uniform((batch_size, size, size, model.input_shape[-1]))
+    precision = model.precision
+    results, reference = [], None
+    try:
+        for item in ['float32', *[item for item in precisions if item != 'float32']]:
+            model.precision = item
+            model.load_inference_model(trained_weights)
+            for _ in range(warmup):
+                model.predict_batch(images)
+            durations = []
+            for _ in range(iterations):
+                start = perf_counter()
+                detections = [
+                    np.asarray(output) for output in model.predict_batch(images)
+                ]
+                durations.append((perf_counter() - start) * 1000)
+            reference = reference or detections
+            matched, total = get_matched_detections(reference, detections)
+            results.append(
+                {
+                    'precision': item,
+                    'mean ms': np.mean(durations),
+                    'median ms': np.median(durations),
+                    'images/s': len(images) / np.mean(durations) * 1000,
+                    'detections': int(np.sum(detections[3])),
+                    'matched float32 %': matched / total * 100 if total else np.nan,
+                }
+            )
+    finally:
+        model.precision = precision
+    results = pd.DataFrame(results)
+    LOGGER.info(f'Precision benchmark:\n{results.to_markdown(index=False)}')
+    return results
@@ -1,10 +1,21 @@
+import os
+
 import pandas as pd
 import yolo_tf2
 from yolo_tf2.config.augmentation_options import AUGMENTATION_PRESETS
-from yolo_tf2.config.cli_args import DETECTION, EVALUATION, GENERAL, TRAINING
+from yolo_tf2.config.cli_args import (BENCHMARK_NMS, BENCHMARK_PRECISION,
+                                      CLEAR_CACHE, DETECTION, EVALUATION,
+                                      EXPORT, GENERAL, PROFILE_MODEL, PRUNE,
+                                      SERVE, TRAINING)
 from yolo_tf2.core.detector import Detector
 from yolo_tf2.core.evaluator import Evaluator
+from yolo_tf2.core.exporter import Exporter
+from yolo_tf2.core.models import BaseModel
+from yolo_tf2.core.profiler import ModelProfiler
+from yolo_tf2.core.pruner import Pruner
+from yolo_tf2.core.server import DetectionServer
 from yolo_tf2.core.trainer import Trainer
+from yolo_tf2.utils import benchmarks
 from yolo_tf2.utils.common import get_abs_path, get_image_files
 
 
@@ -12,12 +23,28 @@ def display_section(name):
     """
     Display a dictionary of command line options
     Args:
-        name: One of ['GENERAL', 'TRAINING', 'EVALUATION', 'DETECTION']
+        name: One of ['GENERAL', 'TRAINING', 'EVALUATION', 'DETECTION',
+            'EXPORT', 'SERVE', 'PRUNE', 'PROFILE_MODEL', 'BENCHMARK_NMS',
+            'BENCHMARK_PRECISION', 'CLEAR_CACHE']
 
     Returns:
         None
     """
-    assert all((GENERAL, TRAINING, DETECTION, EVALUATION))
+    assert all(
+        (
+            GENERAL,
+            TRAINING,
+            DETECTION,
+            EVALUATION,
+            EXPORT,
+            SERVE,
+            PRUNE,
+            PROFILE_MODEL,
+            BENCHMARK_NMS,
+            BENCHMARK_PRECISION,
+            CLEAR_CACHE,
+        )
+    )
     section_frame = pd.DataFrame(eval(name)).T.fillna('-')
     section_frame['flags'] = section_frame.index.values
     section_frame['flags'] = section_frame['flags'].apply(lambda c: f'--{c}')
@@ -46,6 +73,13 @@ def display_commands(display_all=False):
         'train': 'Create new or use existing dataset and train a model',
         'evaluate': 'Evaluate a trained model',
         'detect': 'Detect a folder of images or a video',
+        'export': 'Export a trained model to SavedModel or TFLite',
+        'serve': 'Serve detections over a local HTTP endpoint',
+        'prune': 'Prune convolution channels of a trained model',
+        'profile-model': 'Profile cost of every cfg section of a model',
+        'benchmark-nms': 'Measure latency of non-max suppression modes',
+        'benchmark-precision': 'Compare float32 and mixed precision inference',
+        'clear-cache': 'Clear converted DarkNet weights',
     }
     print(f'Yolo-tf2 {yolo_tf2.__version__}')
     print(f'\nUsage:')
@@ -57,7 +91,19 @@ def display_commands(display_all=False):
     print('Use yolotf2 <command> -h to see more info about a command', end='\n\n')
     print('Use yolotf2 -h to display all command line options')
     if display_all:
-        for name in ('GENERAL', 'TRAINING', 'EVALUATION', 'DETECTION'):
+        for name in (
+            'GENERAL',
+            'TRAINING',
+            'EVALUATION',
+            'DETECTION',
+            'EXPORT',
+            'SERVE',
+            'PRUNE',
+            'PROFILE_MODEL',
+            'BENCHMARK_NMS',
+            'BENCHMARK_PRECISION',
+            'CLEAR_CACHE',
+        ):
             display_section(name)
 
 
@@ -88,20 +134,25 @@ def add_args(process_args, parser):
     return parser
 
 
-def add_all_args(parser, process_args, *args):
+def add_all_args(
+    parser, process_args, *args, general_required=('model_cfg', 'classes')
+):
     """
     Add general and process specific args
     Args:
         parser: argparse.ArgumentParser
-        process_args: One of [GENERAL, TRAINING, EVALUATION, DETECTION]
+        process_args: One of [GENERAL, TRAINING, EVALUATION, DETECTION, EXPORT,
+            SERVE, PRUNE, PROFILE_MODEL, BENCHMARK_NMS, BENCHMARK_PRECISION,
+            CLEAR_CACHE]
         *args: Process required args
+        general_required: Required args from GENERAL.
 
     Returns:
         cli_args
     """
     parser = add_args(process_args, parser)
     cli_args = parser.parse_args()
-    for arg in ['model_cfg', 'classes', *args]:
+    for arg in [*general_required, *args]:
         assert eval(f'cli_args.{arg}'), f'{arg} is required'
     return cli_args
 
@@ -135,6 +186,7 @@ def train(parser):
         iou_threshold=cli_args.iou_threshold,
         score_threshold=cli_args.score_threshold,
         image_folder=cli_args.image_folder,
+        precision=cli_args.precision,
     )
 
     d_name = cli_args.dataset_name
@@ -153,6 +205,10 @@ def train(parser):
             'sequences': AUGMENTATION_PRESETS.get(preset),
             'aug_workers': cli_args.workers,
             'aug_batch_size': cli_args.process_batch_size,
+            'tfrecord_shards': cli_args.tfrecord_shards,
+            'tfrecord_workers': cli_args.tfrecord_workers,
+            'image_storage': cli_args.image_storage,
+            'jpeg_quality': cli_args.jpeg_quality,
         },
         dataset_name=d_name,
         weights=cli_args.weights,
@@ -166,6 +222,13 @@ def train(parser):
         save_figs=cli_args.save_figs,
         clear_outputs=cli_args.clear_output,
         n_epoch_eval=cli_args.n_eval,
+        pipeline_conf={
+            'parallel_reads': cli_args.parallel_reads,
+            'cache': cli_args.dataset_cache,
+            'deterministic': cli_args.deterministic,
+            'private_threadpool_size': cli_args.private_threadpool_size,
+            'max_intra_op_parallelism': cli_args.max_intra_op_parallelism,
+        },
     )
 
 
@@ -181,10 +244,12 @@ def evaluate(parser):
     required_args = (
         'train_tfrecord',
         'valid_tfrecord',
-        'predicted_data',
         'actual_data',
     )
     cli_args = add_all_args(parser, EVALUATION, *required_args)
+    assert (
+        cli_args.predicted_data or cli_args.weights
+    ), 'No predictions provided: specify --predicted-data or --weights'
     evaluator = Evaluator(
         input_shape=cli_args.input_shape,
         model_configuration=cli_args.model_cfg,
@@ -194,8 +259,12 @@ def evaluate(parser):
         max_boxes=cli_args.max_boxes,
         iou_threshold=cli_args.iou_threshold,
         score_threshold=cli_args.score_threshold,
+        precision=cli_args.precision,
     )
-    predicted = pd.read_csv(cli_args.predicted_data)
+    if cli_args.weights:
+        predicted = evaluator.make_predictions(cli_args.weights, merge=True)
+    else:
+        predicted = pd.read_csv(cli_args.predicted_data)
     actual = pd.read_csv(cli_args.actual_data)
     evaluator.calculate_map(
         prediction_data=predicted,
@@ -216,7 +285,9 @@ def detect(parser):
     Returns:
         None
     """
-    cli_args = add_all_args(parser, DETECTION)
+    cli_args = add_all_args(parser, DETECTION, general_required=('classes',))
+    if not os.path.isdir(cli_args.weights):
+        assert cli_args.model_cfg, 'model_cfg is required'
     detector = Detector(
         input_shape=cli_args.input_shape,
         model_configuration=cli_args.model_cfg,
@@ -224,6 +295,14 @@ def detect(parser):
         max_boxes=cli_args.max_boxes,
         iou_threshold=cli_args.iou_threshold,
         score_threshold=cli_args.score_threshold,
+        tflite_threads=cli_args.tflite_threads,
+        xla_batch_sizes=cli_args.xla_batch_sizes,
+        converted_dtype=cli_args.converted_dtype,
+        fold_batch_norm=cli_args.fold_batch_norm,
+        dynamic_input=cli_args.dynamic_input,
+        nms_mode=cli_args.nms_mode,
+        pre_nms_top_k=cli_args.pre_nms_top_k,
+        precision=cli_args.precision,
     )
     check_args = [
         item for item in [cli_args.image, cli_args.image_dir, cli_args.video] if item
@@ -240,13 +319,31 @@ def detect(parser):
             for image in get_image_files(cli_args.image_dir)
         )
     if cli_args.image or cli_args.image_dir:
-        detector.predict_photos(
+        photo_kwargs = dict(
             photos=target_photos,
             trained_weights=cli_args.weights,
             batch_size=cli_args.process_batch_size,
             workers=cli_args.workers,
             output_dir=cli_args.output_dir,
+            tile_size=cli_args.tile_size,
+            tile_overlap=cli_args.tile_overlap,
+            max_tiles=cli_args.max_tiles,
+            cache_file=cli_args.cache_file,
+            cache_size_mb=cli_args.cache_size,
+            detections_file=cli_args.detections_file,
+            draw=not cli_args.no_draw,
+            input_size=cli_args.input_size,
         )
+        if cli_args.processes > 1:
+            detector.predict_photos_parallel(
+                processes=cli_args.processes,
+                intra_op_threads=cli_args.intra_op_threads,
+                inter_op_threads=cli_args.inter_op_threads,
+                pin_cpus=cli_args.pin_cpus,
+                **photo_kwargs,
+            )
+        else:
+            detector.predict_photos(**photo_kwargs)
     if cli_args.video:
         detector.detect_video(
             video=get_abs_path(cli_args.video, verify=True),
@@ -254,4 +351,230 @@ def detect(parser):
             codec=cli_args.codec,
             display=cli_args.display_vid,
             output_dir=cli_args.output_dir,
+            batch_size=cli_args.process_batch_size,
+            detections_file=cli_args.detections_file,
+            draw=not cli_args.no_draw,
+        )
+
+
+def export(parser):
+    """
+    Export a trained model.
+    Args:
+        parser: argparse.ArgumentParser
+
+    Returns:
+        None
+    """
+    cli_args = add_all_args(parser, EXPORT)
+    assert cli_args.format in (
+        'saved_model',
+        'tflite',
+    ), f'Invalid export format {cli_args.format}'
+    exporter = Exporter(
+        input_shape=cli_args.input_shape,
+        model_configuration=cli_args.model_cfg,
+        classes_file=cli_args.classes,
+        max_boxes=cli_args.max_boxes,
+        iou_threshold=cli_args.iou_threshold,
+        score_threshold=cli_args.score_threshold,
+        fold_batch_norm=cli_args.fold_batch_norm,
+    )
+    if cli_args.format == 'saved_model':
+        exported = exporter.export_saved_model(cli_args.weights, cli_args.output_path)
+    else:
+        exported = exporter.export_tflite(
+            cli_args.weights,
+            cli_args.output_path,
+            cli_args.representative_tfrecord,
+            cli_args.calibration_steps,
+        )
+    if cli_args.train_tfrecord and cli_args.valid_tfrecord:
+        exporter.compare_map(
+            cli_args.weights,
+            exported,
+            cli_args.train_tfrecord,
+            cli_args.valid_tfrecord,
+            min_overlaps=cli_args.min_overlaps,
+            workers=cli_args.workers,
+            tflite_threads=cli_args.tflite_threads,
         )
+
+
+def serve(parser):
+    """
+    Load a model once and serve detections over HTTP.
+    Args:
+        parser: argparse.ArgumentParser
+
+    Returns:
+        None
+    """
+    cli_args = add_all_args(parser, SERVE, general_required=('classes',))
+    if not os.path.isdir(cli_args.weights):
+        assert cli_args.model_cfg, 'model_cfg is required'
+    detector = Detector(
+        input_shape=cli_args.input_shape,
+        model_configuration=cli_args.model_cfg,
+        classes_file=cli_args.classes,
+        max_boxes=cli_args.max_boxes,
+        iou_threshold=cli_args.iou_threshold,
+        score_threshold=cli_args.score_threshold,
+        tflite_threads=cli_args.tflite_threads,
+        xla_batch_sizes=cli_args.xla_batch_sizes,
+        fold_batch_norm=cli_args.fold_batch_norm,
+        dynamic_input=cli_args.dynamic_input,
+        nms_mode=cli_args.nms_mode,
+        pre_nms_top_k=cli_args.pre_nms_top_k,
+        precision=cli_args.precision,
+    )
+    server = DetectionServer(
+        detector,
+        get_abs_path(cli_args.weights),
+        cli_args.host,
+        cli_args.port,
+        cli_args.max_batch,
+        cli_args.max_wait_ms,
+        cli_args.workers,
+    )
+    server.run()
+
+
+def prune(parser):
+    """
+    Parse cli options, prune a trained model and save pruned cfg / weights.
+    Args:
+        parser: argparse.ArgumentParser
+
+    Returns:
+        None
+    """
+    cli_args = add_all_args(parser, PRUNE)
+    pruner = Pruner(
+        input_shape=cli_args.input_shape,
+        model_configuration=cli_args.model_cfg,
+        classes_file=cli_args.classes,
+        max_boxes=cli_args.max_boxes,
+        iou_threshold=cli_args.iou_threshold,
+        score_threshold=cli_args.score_threshold,
+    )
+    pruner.prune(
+        get_abs_path(cli_args.weights),
+        cli_args.ratio,
+        cli_args.min_channels,
+        cli_args.output_cfg,
+        cli_args.output_weights,
+        cli_args.latency_iterations,
+    )
+
+
+def profile_model(parser):
+    """
+    Parse cli options and profile every cfg section of a model.
+    Args:
+        parser: argparse.ArgumentParser
+
+    Returns:
+        None
+    """
+    cli_args = add_all_args(parser, PROFILE_MODEL)
+    profiler = ModelProfiler(
+        input_shape=cli_args.input_shape,
+        model_configuration=cli_args.model_cfg,
+        classes_file=cli_args.classes,
+        max_boxes=cli_args.max_boxes,
+        iou_threshold=cli_args.iou_threshold,
+        score_threshold=cli_args.score_threshold,
+    )
+    profiler.profile(
+        cli_args.batch_size,
+        cli_args.iterations,
+        cli_args.fold_batch_norm,
+        cli_args.output_file,
+    )
+
+
+def benchmark_nms(parser):
+    """
+    Parse cli options and measure latency of non-max suppression modes.
+    Args:
+        parser: argparse.ArgumentParser
+
+    Returns:
+        None
+    """
+    cli_args = add_all_args(parser, BENCHMARK_NMS)
+    detector = Detector(
+        input_shape=cli_args.input_shape,
+        model_configuration=cli_args.model_cfg,
+        classes_file=cli_args.classes,
+        max_boxes=cli_args.max_boxes,
+        iou_threshold=cli_args.iou_threshold,
+        score_threshold=cli_args.score_threshold,
+    )
+    output_file = get_abs_path(
+        cli_args.output_file or 'output/benchmarks/nms.csv', create_parents=True
+    )
+    results = benchmarks.benchmark_nms(
+        detector,
+        cli_args.modes,
+        cli_args.pre_nms_top_k,
+        cli_args.batch_size,
+        cli_args.input_size,
+        cli_args.iterations,
+        cli_args.warmup,
+    )
+    results.to_csv(output_file, index=False)
+    print(f'Saved NMS benchmark: {output_file}')
+
+
+def benchmark_precision(parser):
+    """
+    Parse cli options and compare inference latency and detections of
+    precision policies.
+    Args:
+        parser: argparse.ArgumentParser
+
+    Returns:
+        None
+    """
+    cli_args = add_all_args(parser, BENCHMARK_PRECISION)
+    detector = Detector(
+        input_shape=cli_args.input_shape,
+        model_configuration=cli_args.model_cfg,
+        classes_file=cli_args.classes,
+        max_boxes=cli_args.max_boxes,
+        iou_threshold=cli_args.iou_threshold,
+        score_threshold=cli_args.score_threshold,
+    )
+    output_file = get_abs_path(
+        cli_args.output_file or 'output/benchmarks/precision.csv',
+        create_parents=True,
+    )
+    image_files = get_image_files(cli_args.image_dir) if cli_args.image_dir else None
+    results = benchmarks.benchmark_precision(
+        detector,
+        get_abs_path(cli_args.weights),
+        cli_args.precisions,
+        image_files,
+        cli_args.batch_size,
+        cli_args.iterations,
+        cli_args.warmup,
+    )
+    results.to_csv(output_file, index=False)
+    print(f'Saved precision benchmark: {output_file}')
+
+
+def clear_cache(parser):
+    """
+    Parse cli options and clear converted DarkNet weights.
+    Args:
+        parser: argparse.ArgumentParser
+
+    Returns:
+        None
+    """
+    cli_args = add_all_args(parser, CLEAR_CACHE, general_required=())
+    cache_dir = get_abs_path(cli_args.cache_dir) if cli_args.cache_dir else None
+    deleted = BaseModel.clear_cache(cache_dir)
+    print(f'Deleted {deleted} cached files')
@@ -94,50 +94,85 @@ def ratios_to_coordinates(bx, by, bw, bh, width, height):
 
 def transform_images(x_train, size):
     """
-    Resize image tensor.
+    Resize image tensor(unless it is already resized) and scale it to [0, 1].
     Args:
-        x_train: Image tensor.
+        x_train: Image tensor or numpy array.
         size: new (width, height)
     """
-    x_train = tf.image.resize(x_train, (size, size))
-    return x_train / 255
+    x_train = tf.convert_to_tensor(x_train)
+    if x_train.shape.rank is None or tuple(x_train.shape[-3:-1]) != (size, size):
+        x_train = tf.image.resize(x_train, (size, size))
+    return tf.cast(x_train, tf.float32) / 255
 
 
-@tf.function
 def transform_targets_for_output(y_true, grid_size, anchor_idxs):
-    n = tf.shape(y_true)[0]
-    y_true_out = tf.zeros((n, grid_size, grid_size, tf.shape(anchor_idxs)[0], 6))
+    """
+    Scatter boxes assigned to the anchors of an output into its grid, if
+    several boxes of an image share a cell and anchor, the last box is kept.
+    Args:
+        y_true: Boxes of shape (boxes, 6) or (n, boxes, 6),
+            (x1, y1, x2, y2, label, anchor index)
+        grid_size: Output grid size.
+        anchor_idxs: Anchor indices(mask) of the output.
+
+    Returns:
+        Targets of shape ([n,] grid_size, grid_size, anchors, 6)
+    """
+    batched = len(y_true.shape) == 3
+    if not batched:
+        y_true = tf.expand_dims(y_true, 0)
+    shape = tf.shape(y_true)
     anchor_idxs = tf.cast(anchor_idxs, tf.int32)
-    indexes = tf.TensorArray(tf.int32, 1, dynamic_size=True)
-    updates = tf.TensorArray(tf.float32, 1, dynamic_size=True)
-    idx = 0
-    for i in tf.range(n):
-        for j in tf.range(tf.shape(y_true)[1]):
-            if tf.equal(y_true[i][j][2], 0):
-                continue
-            anchor_eq = tf.equal(anchor_idxs, tf.cast(y_true[i][j][5], tf.int32))
-            if tf.reduce_any(anchor_eq):
-                box = y_true[i][j][0:4]
-                box_xy = (y_true[i][j][0:2] + y_true[i][j][2:4]) / 2
-                anchor_idx = tf.cast(tf.where(anchor_eq), tf.int32)
-                grid_xy = tf.cast(box_xy // (1 / grid_size), tf.int32)
-                indexes = indexes.write(
-                    idx, [i, grid_xy[1], grid_xy[0], anchor_idx[0][0]]
-                )
-                updates = updates.write(
-                    idx, [box[0], box[1], box[2], box[3], 1, y_true[i][j][4]]
-                )
-                idx += 1
-    return tf.tensor_scatter_nd_update(y_true_out, indexes.stack(), updates.stack())
+    y_true_out = tf.zeros((shape[0], grid_size, grid_size, tf.shape(anchor_idxs)[0], 6))
+    anchor_eq = tf.equal(anchor_idxs, tf.cast(y_true[..., 5:6], tf.int32))
+    valid = tf.logical_and(
+        tf.not_equal(y_true[..., 2], 0), tf.reduce_any(anchor_eq, axis=-1)
+    )
+    anchor_idx = tf.argmax(tf.cast(anchor_eq, tf.int32), axis=-1, output_type=tf.int32)
+    box_xy = (y_true[..., 0:2] + y_true[..., 2:4]) / 2
+    grid_xy = tf.cast(box_xy // (1 / grid_size), tf.int32)
+    batch_idx = tf.broadcast_to(tf.range(shape[0])[:, tf.newaxis], shape[:2])
+    indexes = tf.stack([batch_idx, grid_xy[..., 1], grid_xy[..., 0], anchor_idx], -1)
+    same_index = tf.logical_and(
+        tf.reduce_all(indexes[:, :, tf.newaxis] == indexes[:, tf.newaxis], -1),
+        valid[:, tf.newaxis],
+    )
+    later = tf.linalg.band_part(tf.ones((shape[1], shape[1]), tf.bool), 0, -1)
+    later = tf.logical_and(later, tf.logical_not(tf.eye(shape[1], dtype=tf.bool)))
+    overwritten = tf.reduce_any(tf.logical_and(same_index, later), -1)
+    valid = tf.logical_and(valid, tf.logical_not(overwritten))
+    updates = tf.concat(
+        [y_true[..., 0:4], tf.ones_like(y_true[..., 4:5]), y_true[..., 4:5]], -1
+    )
+    y_true_out = tf.tensor_scatter_nd_update(
+        y_true_out, tf.boolean_mask(indexes, valid), tf.boolean_mask(updates, valid)
+    )
+    if not batched:
+        return y_true_out[0]
+    return y_true_out
 
 
-def transform_targets(y_train, anchors, anchor_masks, size):
+def transform_targets(y_train, anchors, anchor_masks, size, grid_sizes=None):
+    """
+    Assign boxes to their best matching anchors and create targets of every output.
+    Args:
+        y_train: Boxes of shape (boxes, 5) or (n, boxes, 5),
+            (x1, y1, x2, y2, label)
+        anchors: numpy array of (w, h) pairs normalized by input size.
+        anchor_masks: numpy array of masks, one per output.
+        size: Input size.
+        grid_sizes: Grid size of every output, defaults to size // 32
+            doubled for every next output.
+
+    Returns:
+        A tuple of targets, one per output.
+    """
     y_outs = []
-    grid_size = size // 32
+    if grid_sizes is None:
+        grid_sizes = [size // 32 * 2 ** i for i in range(len(anchor_masks))]
     anchors = tf.cast(anchors, tf.float32)
     anchor_area = anchors[..., 0] * anchors[..., 1]
-    box_wh = y_train[..., 2:4] - y_train[..., 0:2]
-    box_wh = tf.tile(tf.expand_dims(box_wh, -2), (1, 1, tf.shape(anchors)[0], 1))
+    box_wh = tf.expand_dims(y_train[..., 2:4] - y_train[..., 0:2], -2)
     box_area = box_wh[..., 0] * box_wh[..., 1]
     intersection = tf.minimum(box_wh[..., 0], anchors[..., 0]) * tf.minimum(
         box_wh[..., 1], anchors[..., 1]
@@ -146,9 +181,8 @@ def transform_targets(y_train, anchors, anchor_masks, size):
     anchor_idx = tf.cast(tf.argmax(iou, axis=-1), tf.float32)
     anchor_idx = tf.expand_dims(anchor_idx, axis=-1)
     y_train = tf.concat([y_train, anchor_idx], axis=-1)
-    for anchor_idxs in anchor_masks:
+    for anchor_idxs, grid_size in zip(anchor_masks, grid_sizes):
         y_outs.append(transform_targets_for_output(y_train, grid_size, anchor_idxs))
-        grid_size *= 2
     return tuple(y_outs)
 
 
@@ -174,7 +208,47 @@ def broadcast_iou(box_1, box_2):
     return int_area / (box_1_area + box_2_area - int_area)
 
 
+def batch_iou(box_1, box_2):
+    """
+    Calculate iou of every box of box_1 with every box of box_2 per image.
+    Args:
+        box_1: Boxes of shape (n, ..., 4)
+        box_2: Boxes of shape (n, k, 4)
+
+    Returns:
+        iou of shape (n, ..., k)
+    """
+    output_shape = tf.concat([tf.shape(box_1)[:-1], tf.shape(box_2)[1:2]], 0)
+    box_1 = tf.reshape(box_1, (tf.shape(box_1)[0], -1, 1, 4))
+    box_2 = tf.expand_dims(box_2, 1)
+    int_w = tf.maximum(
+        tf.minimum(box_1[..., 2], box_2[..., 2])
+        - tf.maximum(box_1[..., 0], box_2[..., 0]),
+        0,
+    )
+    int_h = tf.maximum(
+        tf.minimum(box_1[..., 3], box_2[..., 3])
+        - tf.maximum(box_1[..., 1], box_2[..., 1]),
+        0,
+    )
+    int_area = int_w * int_h
+    box_1_area = (box_1[..., 2] - box_1[..., 0]) * (box_1[..., 3] - box_1[..., 1])
+    box_2_area = (box_2[..., 2] - box_2[..., 0]) * (box_2[..., 3] - box_2[..., 1])
+    iou = int_area / (box_1_area + box_2_area - int_area)
+    return tf.reshape(iou, output_shape)
+
+
 def get_boxes(pred, anchors, classes):
+    """
+    Decode yolo output boxes.
+    Args:
+        pred: yolo output of shape (n, grid, grid, anchors, classes + 5)
+        anchors: anchors normalized by input size.
+        classes: Number of classes.
+
+    Returns:
+        bbox, object_probability, class_probabilities, pred_box
+    """
     grid_size = tf.shape(pred)[1]
     box_xy, box_wh, object_probability, class_probabilities = tf.split(
         pred, (2, 2, 1, classes), axis=-1
@@ -193,7 +267,7 @@ def get_boxes(pred, anchors, classes):
     return bbox, object_probability, class_probabilities, pred_box
 
 
-def calculate_loss(anchors, classes=80, ignore_thresh=0.5):
+def calculate_loss(anchors, classes=80, ignore_thresh=0.5, max_boxes=100):
     def yolo_loss(y_true, y_pred):
         pred_box, pred_obj, pred_class, pred_xywh = get_boxes(y_pred, anchors, classes)
         pred_xy = pred_xywh[..., 0:2]
@@ -209,14 +283,16 @@ def calculate_loss(anchors, classes=80, ignore_thresh=0.5):
         true_wh = tf.math.log(true_wh / anchors)
         true_wh = tf.where(tf.math.is_inf(true_wh), tf.zeros_like(true_wh), true_wh)
         obj_mask = tf.squeeze(true_obj, -1)
-        best_iou = tf.map_fn(
-            lambda x: tf.reduce_max(
-                broadcast_iou(x[0], tf.boolean_mask(x[1], tf.cast(x[2], tf.bool))),
-                axis=-1,
-            ),
-            (pred_box, true_box, obj_mask),
-            fn_output_signature=tf.float32,
+        batch_size = tf.shape(obj_mask)[0]
+        flat_mask = tf.reshape(obj_mask, (batch_size, -1))
+        k = tf.minimum(max_boxes, tf.shape(flat_mask)[1])
+        valid, indices = tf.math.top_k(flat_mask, k)
+        gt_boxes = tf.gather(
+            tf.reshape(true_box, (batch_size, -1, 4)), indices, batch_dims=1
         )
+        iou = batch_iou(pred_box, gt_boxes)
+        iou = tf.where(valid[:, tf.newaxis, tf.newaxis, tf.newaxis] > 0, iou, -1.0)
+        best_iou = tf.reduce_max(iou, axis=-1)
         ignore_mask = tf.cast(best_iou < ignore_thresh, tf.float32)
         xy_loss = (
             obj_mask
@@ -269,7 +345,7 @@ def add_xml_path(xml_file, path):
         output.write(pretty)
 
 
-def get_detection_data(image, image_name, outputs, class_names):
+def get_detection_data(image, image_name, outputs, class_names, image_size=None):
     """
     Organize predictions of a single image into a pandas DataFrame.
     Args:
@@ -277,6 +353,8 @@ def get_detection_data(image, image_name, outputs, class_names):
         image_name: str, name to write in the image column.
         outputs: Outputs from inference_model.predict()
         class_names: A list of object class names.
+        image_size: (width, height) to which relative boxes are scaled,
+            defaults to image size.
 
     Returns:
         data: pandas DataFrame with the detections.
@@ -287,7 +365,7 @@ def get_detection_data(image, image_name, outputs, class_names):
         boxes, scores, classes = [item[0][: int(nums)] for item in outputs[:-1]]
     if not isinstance(outputs[0], np.ndarray):
         boxes, scores, classes = [item[0][: int(nums)].numpy() for item in outputs[:-1]]
-    w, h = np.flip(image.shape[0:2])
+    w, h = image_size or np.flip(image.shape[0:2])
     data = pd.DataFrame(boxes, columns=['x1', 'y1', 'x2', 'y2'])
     data[['x1', 'x2']] = (data[['x1', 'x2']] * w).astype('int64')
     data[['y1', 'y2']] = (data[['y1', 'y2']] * h).astype('int64')
@@ -407,6 +485,289 @@ class Mish(Layer):
         return input_shape
 
 
+class YoloOutput(Layer):
+    """
+    Reshape convolution output to (batch, grid, grid, anchors, classes + 5)
+    """
+
+    def __init__(self, classes, anchors=3, **kwargs):
+        super().__init__(**kwargs)
+        self.classes = classes
+        self.anchors = anchors
+
+    def call(self, inputs, *args, **kwargs):
+        return tf.reshape(
+            inputs,
+            (
+                -1,
+                tf.shape(inputs)[1],
+                tf.shape(inputs)[2],
+                self.anchors,
+                self.classes + 5,
+            ),
+        )
+
+    def get_config(self):
+        config = super().get_config()
+        config.update({'classes': self.classes, 'anchors': self.anchors})
+        return config
+
+
+class RouteGroup(Layer):
+    """
+    Select a group of channels, equivalent of DarkNet route groups / group_id.
+    """
+
+    def __init__(self, groups, group_id, **kwargs):
+        super().__init__(**kwargs)
+        self.groups = groups
+        self.group_id = group_id
+
+    def call(self, inputs, *args, **kwargs):
+        return tf.split(inputs, self.groups, axis=-1)[self.group_id]
+
+    def get_config(self):
+        config = super().get_config()
+        config.update({'groups': self.groups, 'group_id': self.group_id})
+        return config
+
+
+class YoloDecode(Layer):
+    """
+    Decode all yolo outputs into flat candidates ready for non-max suppression,
+    grid offsets are cached as constants per output resolution.
+    """
+
+    def __init__(self, anchors, classes, **kwargs):
+        """
+        Initialize decoding settings.
+        Args:
+            anchors: A list of (w, h) anchors in pixels per output.
+            classes: Number of classes.
+            **kwargs: keras.layers.Layer kwargs.
+        """
+        super().__init__(**kwargs)
+        self.anchors = [np.array(item, np.float32).tolist() for item in anchors]
+        self.classes = classes
+        self.grids = {}
+
+    def get_grid(self, height, width):
+        """
+        Get grid offsets of shape (height, width, 1, 2), cached if the output
+        resolution is known.
+        Args:
+            height: Output grid height.
+            width: Output grid width.
+
+        Returns:
+            Grid offsets.
+        """
+        if isinstance(height, int) and isinstance(width, int):
+            if (height, width) not in self.grids:
+                grid = np.stack(np.meshgrid(np.arange(width), np.arange(height)), -1)
+                self.grids[height, width] = grid[:, :, np.newaxis].astype(np.float32)
+            return self.grids[height, width]
+        grid = tf.meshgrid(tf.range(width), tf.range(height))
+        return tf.cast(tf.expand_dims(tf.stack(grid, axis=-1), axis=2), tf.float32)
+
+    def call(self, inputs, *args, **kwargs):
+        *outputs, image = inputs
+        input_width = image.shape[2] or tf.shape(image)[2]
+        input_height = image.shape[1] or tf.shape(image)[1]
+        input_size = tf.cast(tf.stack([input_width, input_height]), tf.float32)
+        boxes, confidence, class_probabilities = [], [], []
+        for output, anchors in zip(outputs, self.anchors):
+            output = tf.cast(output, tf.float32)
+            batch_size = tf.shape(output)[0]
+            height = output.shape[1] or tf.shape(output)[1]
+            width = output.shape[2] or tf.shape(output)[2]
+            grid_size = tf.cast(tf.stack([width, height]), tf.float32)
+            grid = self.get_grid(height, width)
+            box_xy = (tf.sigmoid(output[..., :2]) + grid) / grid_size
+            box_wh = tf.exp(output[..., 2:4]) * (anchors / input_size)
+            scores = tf.sigmoid(output[..., 4:])
+            boxes.append(
+                tf.reshape(
+                    tf.concat([box_xy - box_wh / 2, box_xy + box_wh / 2], axis=-1),
+                    (batch_size, -1, 4),
+                )
+            )
+            confidence.append(tf.reshape(scores[..., :1], (batch_size, -1, 1)))
+            class_probabilities.append(
+                tf.reshape(scores[..., 1:], (batch_size, -1, self.classes))
+            )
+        return (
+            tf.concat(boxes, axis=1),
+            tf.concat(confidence, axis=1),
+            tf.concat(class_probabilities, axis=1),
+        )
+
+    def get_config(self):
+        config = super().get_config()
+        config.update({'anchors': self.anchors, 'classes': self.classes})
+        return config
+
+
+class YoloNMS(Layer):
+    """
+    Apply non-max suppression to flat candidates of YoloDecode and get valid
+    detections using nms_mode:
+        - combined: tf.image.combined_non_max_suppression over all classes.
+        - per_class: per-class suppression of objectness prefiltered
+            candidates using coordinate offsets.
+        - agnostic: class-agnostic suppression of objectness prefiltered
+            candidates, every box is assigned its best class.
+    In all modes, only pre_nms_top_k candidates(if specified) with the
+    highest objectness are suppressed.
+    """
+
+    def __init__(
+        self,
+        max_boxes=100,
+        iou_threshold=0.5,
+        score_threshold=0.5,
+        nms_mode='combined',
+        pre_nms_top_k=None,
+        **kwargs,
+    ):
+        """
+        Initialize non-max suppression settings.
+        Args:
+            max_boxes: Maximum boxes per image.
+            iou_threshold: float, values less than the threshold are ignored.
+            score_threshold: float, values less than the threshold are ignored.
+            nms_mode: combined, per_class or agnostic.
+            pre_nms_top_k: If specified, only top k candidates with the
+                highest objectness are suppressed.
+            **kwargs: keras.layers.Layer kwargs.
+        """
+        super().__init__(**kwargs)
+        assert nms_mode in (
+            'combined',
+            'per_class',
+            'agnostic',
+        ), f'Invalid nms mode {nms_mode}'
+        self.max_boxes = max_boxes
+        self.iou_threshold = iou_threshold
+        self.score_threshold = score_threshold
+        self.nms_mode = nms_mode
+        self.pre_nms_top_k = pre_nms_top_k
+
+    def select_top_k(self, bbox, confidence, class_probabilities):
+        """
+        Select pre_nms_top_k candidates with the highest objectness.
+        Args:
+            bbox: Boxes of shape (n, boxes, 4)
+            confidence: Objectness of shape (n, boxes, 1)
+            class_probabilities: Class probabilities of shape (n, boxes, classes)
+
+        Returns:
+            bbox, confidence, class_probabilities
+        """
+        k = tf.minimum(self.pre_nms_top_k, tf.shape(confidence)[1])
+        _, indices = tf.math.top_k(confidence[..., 0], k)
+        return [
+            tf.gather(item, indices, batch_dims=1)
+            for item in (bbox, confidence, class_probabilities)
+        ]
+
+    def suppress_image(self, item):
+        """
+        Apply class-agnostic or per-class non-max suppression to a single image,
+        candidates are prefiltered on objectness before class scores are
+        computed, and per-class suppression is done in a single pass by
+        offsetting boxes of every class.
+        Args:
+            item: (boxes, objectness, class probabilities) of a single image.
+
+        Returns:
+            boxes, scores, classes padded to max_boxes, valid_detections
+        """
+        bbox, confidence, class_probabilities = item
+        confidence = confidence[:, 0]
+        candidates = confidence >= self.score_threshold
+        bbox = tf.boolean_mask(bbox, candidates)
+        confidence = tf.boolean_mask(confidence, candidates)
+        class_probabilities = tf.boolean_mask(class_probabilities, candidates)
+        if self.pre_nms_top_k:
+            k = tf.minimum(self.pre_nms_top_k, tf.shape(confidence)[0])
+            confidence, indices = tf.math.top_k(confidence, k)
+            bbox = tf.gather(bbox, indices)
+            class_probabilities = tf.gather(class_probabilities, indices)
+        class_scores = confidence[:, tf.newaxis] * class_probabilities
+        if self.nms_mode == 'agnostic':
+            scores = tf.reduce_max(class_scores, -1)
+            classes = tf.argmax(class_scores, -1)
+            nms_boxes = bbox
+        else:
+            indices = tf.where(class_scores >= self.score_threshold)
+            bbox = tf.gather(bbox, indices[:, 0])
+            scores = tf.gather_nd(class_scores, indices)
+            classes = indices[:, 1]
+            span = 1 + tf.maximum(tf.reduce_max(tf.abs(bbox)), 0.0)
+            nms_boxes = bbox + (2 * span * tf.cast(classes, tf.float32))[:, tf.newaxis]
+        selected = tf.image.non_max_suppression(
+            nms_boxes, scores, self.max_boxes, self.iou_threshold, self.score_threshold
+        )
+        valid_detections = tf.shape(selected)[0]
+        padding = self.max_boxes - valid_detections
+        return (
+            tf.pad(
+                tf.clip_by_value(tf.gather(bbox, selected), 0, 1),
+                [[0, padding], [0, 0]],
+            ),
+            tf.pad(tf.gather(scores, selected), [[0, padding]]),
+            tf.pad(tf.cast(tf.gather(classes, selected), tf.float32), [[0, padding]]),
+            valid_detections,
+        )
+
+    def call(self, inputs, *args, **kwargs):
+        bbox, confidence, class_probabilities = inputs
+        if self.nms_mode != 'combined':
+            return tf.map_fn(
+                self.suppress_image,
+                (bbox, confidence, class_probabilities),
+                fn_output_signature=(
+                    tf.TensorSpec((self.max_boxes, 4), tf.float32),
+                    tf.TensorSpec((self.max_boxes,), tf.float32),
+                    tf.TensorSpec((self.max_boxes,), tf.float32),
+                    tf.TensorSpec((), tf.int32),
+                ),
+            )
+        if self.pre_nms_top_k:
+            bbox, confidence, class_probabilities = self.select_top_k(
+                bbox, confidence, class_probabilities
+            )
+        scores = confidence * class_probabilities
+        (
+            boxes,
+            scores,
+            classes,
+            valid_detections,
+        ) = tf.image.combined_non_max_suppression(
+            boxes=tf.reshape(bbox, (tf.shape(bbox)[0], -1, 1, 4)),
+            scores=tf.reshape(scores, (tf.shape(scores)[0], -1, tf.shape(scores)[-1])),
+            max_output_size_per_class=self.max_boxes,
+            max_total_size=self.max_boxes,
+            iou_threshold=self.iou_threshold,
+            score_threshold=self.score_threshold,
+        )
+        return boxes, scores, classes, valid_detections
+
+    def get_config(self):
+        config = super().get_config()
+        config.update(
+            {
+                'max_boxes': self.max_boxes,
+                'iou_threshold': self.iou_threshold,
+                'score_threshold': self.score_threshold,
+                'nms_mode': self.nms_mode,
+                'pre_nms_top_k': self.pre_nms_top_k,
+            }
+        )
+        return config
+
+
 def get_abs_path(
     *args, verify=False, verify_parents=False, create_parents=False, create=False
 ):
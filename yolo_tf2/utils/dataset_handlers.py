@@ -1,10 +1,13 @@
 import hashlib
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
 import tensorflow as tf
+from cv2 import cv2
 from yolo_tf2.utils.common import LOGGER, get_abs_path
 
 
@@ -23,6 +26,8 @@ def get_feature_map():
         'image_key': tf.io.FixedLenFeature([], tf.string),
         'image_data': tf.io.FixedLenFeature([], tf.string),
         'image_format': tf.io.FixedLenFeature([], tf.string),
+        'stored_width': tf.io.FixedLenFeature([], tf.int64, default_value=0),
+        'stored_height': tf.io.FixedLenFeature([], tf.int64, default_value=0),
         'x_min': tf.io.VarLenFeature(tf.float32),
         'y_min': tf.io.VarLenFeature(tf.float32),
         'x_max': tf.io.VarLenFeature(tf.float32),
@@ -33,13 +38,18 @@ def get_feature_map():
     return features
 
 
-def create_example(separate_data, key, image_data):
+def create_example(
+    separate_data, key, image_data, image_format=None, stored_size=(0, 0)
+):
     """
     Create tf.train.Example object.
     Args:
         separate_data: numpy tensor of 1 image data.
         key: output of hashlib.sha256()
         image_data: raw image data.
+        image_format: 'jpeg' or 'raw' if image_data is a pre-resized image,
+            defaults to image file extension.
+        stored_size: (width, height) of a pre-resized image.
 
     Returns:
         tf.train.Example object.
@@ -58,7 +68,7 @@ def create_example(separate_data, key, image_data):
         object_id,
     ] = separate_data
     image_file_name = os.path.split(image[0])[-1]
-    image_format = image_file_name.split('.')[-1]
+    image_format = image_format or image_file_name.split('.')[-1]
     features = {
         'img_height': tf.train.Feature(
             int64_list=tf.train.Int64List(value=[image_height[0]])
@@ -81,6 +91,12 @@ def create_example(separate_data, key, image_data):
         'image_format': tf.train.Feature(
             bytes_list=tf.train.BytesList(value=[image_format.encode('utf8')])
         ),
+        'stored_width': tf.train.Feature(
+            int64_list=tf.train.Int64List(value=[stored_size[0]])
+        ),
+        'stored_height': tf.train.Feature(
+            int64_list=tf.train.Int64List(value=[stored_size[1]])
+        ),
         'x_min': tf.train.Feature(float_list=tf.train.FloatList(value=x_min)),
         'y_min': tf.train.Feature(float_list=tf.train.FloatList(value=y_min)),
         'x_max': tf.train.Feature(float_list=tf.train.FloatList(value=x_max)),
@@ -93,6 +109,62 @@ def create_example(separate_data, key, image_data):
     return tf.train.Example(features=tf.train.Features(feature=features))
 
 
+def encode_image(image_path, image_size, image_format, jpeg_quality=95):
+    """
+    Resize an image to training size and encode it for storage in TFRecord.
+    Args:
+        image_path: Path to image file.
+        image_size: (width, height) to which the image is resized.
+        image_format: 'jpeg' or 'raw'(uint8 RGB bytes).
+        jpeg_quality: JPEG quality(0 - 100) if image_format is 'jpeg'.
+
+    Returns:
+        encoded image bytes.
+    """
+    assert image_format in (
+        'jpeg',
+        'raw',
+    ), f'Invalid image format {image_format}, expected jpeg or raw'
+    image = cv2.imread(image_path, cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION)
+    if image is None:
+        raise ValueError(f'Failed to read image {image_path}')
+    image = cv2.resize(image, tuple(image_size))
+    if image_format == 'raw':
+        return cv2.cvtColor(image, cv2.COLOR_BGR2RGB).tobytes()
+    return cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])[
+        1
+    ].tobytes()
+
+
+def decode_example_image(features):
+    """
+    Decode image of a parsed example according to its stored format.
+    Args:
+        features: Parsed example features.
+
+    Returns:
+        uint8 image tensor.
+    """
+    image_data = features['image_data']
+    image_format = features['image_format']
+    return tf.case(
+        [
+            (
+                tf.equal(image_format, 'raw'),
+                lambda: tf.reshape(
+                    tf.io.decode_raw(image_data, tf.uint8),
+                    [features['stored_height'], features['stored_width'], 3],
+                ),
+            ),
+            (
+                tf.equal(image_format, 'jpeg'),
+                lambda: tf.image.decode_jpeg(image_data, channels=3),
+            ),
+        ],
+        default=lambda: tf.image.decode_png(image_data, channels=3),
+    )
+
+
 def read_example(
     example,
     feature_map,
@@ -108,16 +180,23 @@ def read_example(
         feature_map: A dictionary of feature names mapped to tf.io objects.
         class_table: StaticHashTable object.
         max_boxes: Maximum number of boxes per image
-        new_size: w, h new image size
+        new_size: h, w new image size, images stored at this size
+            are not resized.
         get_features: If True, features will be returned.
 
     Returns:
         x_train, y_train
     """
     features = tf.io.parse_single_example(example, feature_map)
-    x_train = tf.image.decode_png(features['image_data'], channels=3)
+    x_train = decode_example_image(features)
     if new_size:
-        x_train = tf.image.resize(x_train, new_size)
+        stored_size = tf.stack([features['stored_height'], features['stored_width']])
+        x_train = tf.cond(
+            tf.reduce_all(tf.equal(stored_size, tf.cast(new_size, tf.int64))),
+            lambda: tf.cast(x_train, tf.float32),
+            lambda: tf.image.resize(x_train, new_size),
+        )
+        x_train.set_shape([*new_size, 3])
     object_name = tf.sparse.to_dense(features['object_name'])
     label = tf.cast(class_table.lookup(object_name), tf.float32)
     y_train = tf.stack(
@@ -135,33 +214,26 @@ def read_example(
     return x_train, y_train
 
 
-def write_tf_record(output_path, groups, data, trainer=None):
+def write_tf_record_shard(
+    output_path, groups, columns, image_size=None, image_format=None, jpeg_quality=95
+):
     """
-    Write data to TFRecord.
+    Write a single TFRecord file / shard.
     Args:
         output_path: Full path to save.
-        groups: pandas GroupBy object.
-        data: pandas DataFrame
-        trainer: core.Trainer object.
+        groups: A list of (image path, objects) pairs.
+        columns: Columns of the labels DataFrame.
+        image_size: (width, height), if specified, images are stored
+            resized to this size.
+        image_format: 'jpeg' or 'raw', format of resized images.
+        jpeg_quality: JPEG quality of resized images.
 
     Returns:
-        None
+        output_path, number of written examples.
     """
-    print(f'Processing {os.path.split(output_path)[-1]}')
-    if trainer:
-        if 'train' in output_path:
-            trainer.train_tf_record = output_path
-        if 'test' in output_path:
-            trainer.valid_tf_record = output_path
     with tf.io.TFRecordWriter(output_path) as r_writer:
-        for current_image, (image_path, objects) in enumerate(groups, 1):
-            print(
-                f'\rBuilding example: {current_image}/{len(groups)} ... '
-                f'{os.path.split(image_path)[-1]} '
-                f'{round(100 * (current_image / len(groups)))}% completed',
-                end='',
-            )
-            separate_data = pd.DataFrame(objects, columns=data.columns).T.to_numpy()
+        for image_path, objects in groups:
+            separate_data = pd.DataFrame(objects, columns=columns).T.to_numpy()
             (
                 image_width,
                 image_height,
@@ -176,12 +248,102 @@ def write_tf_record(output_path, groups, data, trainer=None):
             y_max /= image_height
             image_data = open(image_path, 'rb').read()
             key = hashlib.sha256(image_data).hexdigest()
-            training_example = create_example(separate_data, key, image_data)
+            stored_size = (0, 0)
+            if image_size:
+                image_data = encode_image(
+                    image_path, image_size, image_format, jpeg_quality
+                )
+                stored_size = image_size
+            training_example = create_example(
+                separate_data, key, image_data, image_format, stored_size
+            )
             r_writer.write(training_example.SerializeToString())
-    print()
+    return output_path, len(groups)
+
 
+def write_tf_record(
+    output_path,
+    groups,
+    data,
+    trainer=None,
+    shards=1,
+    workers=1,
+    image_size=None,
+    image_format=None,
+    jpeg_quality=95,
+):
+    """
+    Write data to TFRecord, if shards > 1, data is split into
+    <name>-00000-of-000NN.tfrecord shards written by a pool of processes.
+    Args:
+        output_path: Full path to save.
+        groups: pandas GroupBy object.
+        data: pandas DataFrame
+        trainer: core.Trainer object.
+        shards: Number of TFRecord files.
+        workers: Number of processes writing shards.
+        image_size: (width, height), if specified, images are stored
+            resized to this size.
+        image_format: 'jpeg' or 'raw', format of resized images.
+        jpeg_quality: JPEG quality of resized images.
 
-def save_tfr(data, output_folder, dataset_name, test_size, trainer=None):
+    Returns:
+        output_path or glob pattern of the written shards.
+    """
+    shards = max(1, min(shards, len(groups)))
+    output_paths = [output_path]
+    if shards > 1:
+        prefix = output_path.rsplit('.tfrecord', 1)[0]
+        output_paths = [
+            f'{prefix}-{i:05d}-of-{shards:05d}.tfrecord' for i in range(shards)
+        ]
+        output_path = f'{prefix}-*-of-{shards:05d}.tfrecord'
+    LOGGER.info(f'Processing {os.path.split(output_path)[-1]}')
+    if trainer:
+        if 'train' in output_path:
+            trainer.train_tf_record = output_path
+        if 'test' in output_path:
+            trainer.valid_tf_record = output_path
+    shard_groups = [
+        [tuple(item) for item in shard] for shard in np.array_split(groups, shards)
+    ]
+    image_options = image_size, image_format, jpeg_quality
+    if workers <= 1 or shards == 1:
+        for shard_path, shard in zip(output_paths, shard_groups):
+            _, examples = write_tf_record_shard(
+                shard_path, shard, data.columns, *image_options
+            )
+            LOGGER.info(f'Wrote {examples} examples: {shard_path}')
+        return output_path
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(min(workers, shards), mp_context=context) as executor:
+        future_shards = [
+            executor.submit(
+                write_tf_record_shard, shard_path, shard, data.columns, *image_options
+            )
+            for shard_path, shard in zip(output_paths, shard_groups)
+        ]
+        for completed, future in enumerate(as_completed(future_shards), 1):
+            shard_path, examples = future.result()
+            LOGGER.info(
+                f'Wrote {examples} examples: {shard_path} '
+                f'({completed}/{shards} shards)'
+            )
+    return output_path
+
+
+def save_tfr(
+    data,
+    output_folder,
+    dataset_name,
+    test_size,
+    trainer=None,
+    shards=1,
+    workers=1,
+    image_size=None,
+    image_format=None,
+    jpeg_quality=95,
+):
     """
     Transform and save dataset into TFRecord format.
     Args:
@@ -190,6 +352,12 @@ def save_tfr(data, output_folder, dataset_name, test_size, trainer=None):
         dataset_name: str name of the dataset.
         test_size: relative test subset size.
         trainer: core.Trainer object
+        shards: Number of training / test TFRecord files.
+        workers: Number of processes writing shards.
+        image_size: (width, height), if specified, images are stored
+            resized to this size instead of original image files.
+        image_format: 'jpeg' or 'raw', format of resized images.
+        jpeg_quality: JPEG quality of resized images.
 
     Returns:
         None
@@ -223,12 +391,33 @@ def save_tfr(data, output_folder, dataset_name, test_size, trainer=None):
     )
     training_path = get_abs_path(output_folder, f'{dataset_name}_train.tfrecord')
     test_path = get_abs_path(output_folder, f'{dataset_name}_test.tfrecord')
-    write_tf_record(training_path, training_set, data, trainer)
+    image_options = image_size, image_format, jpeg_quality
+    training_path = write_tf_record(
+        training_path, training_set, data, trainer, shards, workers, *image_options
+    )
     LOGGER.info(f'Saved training TFRecord: {training_path}')
-    write_tf_record(test_path, test_set, data, trainer)
+    test_path = write_tf_record(
+        test_path, test_set, data, trainer, shards, workers, *image_options
+    )
     LOGGER.info(f'Saved validation TFRecord: {test_path}')
 
 
+def get_tf_record_files(tf_record_file):
+    """
+    Get TFRecord files matching a path or a glob pattern of shards.
+    Args:
+        tf_record_file: Path to TFRecord file or glob pattern of shards.
+
+    Returns:
+        A sorted list of TFRecord files.
+    """
+    files = sorted(
+        tf.io.gfile.glob(str(Path(tf_record_file).absolute().resolve().as_posix()))
+    )
+    assert files, f'No TFRecord files found: {tf_record_file}'
+    return files
+
+
 def read_tfr(
     tf_record_file,
     classes_file,
@@ -237,17 +426,24 @@ def read_tfr(
     classes_delimiter='\n',
     new_size=None,
     get_features=False,
+    parallel_reads=None,
+    parallel_calls=None,
+    deterministic=None,
 ):
     """
     Read and load dataset from TFRecord file.
     Args:
-        tf_record_file: Path to TFRecord file.
+        tf_record_file: Path to TFRecord file or glob pattern of shards.
         classes_file: file containing classes.
         feature_map: A dictionary of feature names mapped to tf.io objects.
         max_boxes: Maximum number of boxes per image.
         classes_delimiter: delimiter in classes_file.
-        new_size: w, h new image size
+        new_size: h, w new image size
         get_features: If True, features will be returned.
+        parallel_reads: If specified, files are interleaved reading this
+            number of files in parallel, otherwise files are read sequentially.
+        parallel_calls: Parallel examples decoding.
+        deterministic: If False, elements may be produced out of order.
 
     Returns:
         MapDataset object.
@@ -258,10 +454,20 @@ def read_tfr(
     )
     class_table = tf.lookup.StaticHashTable(text_init, -1)
     files = tf.data.Dataset.list_files(tf_record_file)
-    dataset = files.flat_map(tf.data.TFRecordDataset)
+    if parallel_reads:
+        dataset = files.interleave(
+            tf.data.TFRecordDataset,
+            cycle_length=parallel_reads,
+            num_parallel_calls=tf.data.experimental.AUTOTUNE,
+            deterministic=deterministic,
+        )
+    else:
+        dataset = files.flat_map(tf.data.TFRecordDataset)
     LOGGER.info(f'Read TFRecord: {tf_record_file}')
     return dataset.map(
         lambda x: read_example(
             x, feature_map, class_table, max_boxes, new_size, get_features
-        )
+        ),
+        num_parallel_calls=parallel_calls,
+        deterministic=deterministic,
     )
@@ -0,0 +1,200 @@
+import hashlib
+import sqlite3
+from io import StringIO
+from pathlib import Path
+from threading import Lock
+from time import time
+
+import pandas as pd
+from yolo_tf2.utils.common import LOGGER, get_abs_path
+
+
+class DetectionCache:
+    """
+    On-disk SQLite cache of detections keyed by image content and model identity.
+    """
+
+    def __init__(self, cache_file, max_size_mb=512):
+        """
+        Open / create the cache.
+        Args:
+            cache_file: Path to SQLite database file.
+            max_size_mb: Maximum size of cached detections in megabytes, least
+                recently used entries are evicted down to 90% of it once exceeded.
+        """
+        self.cache_file = get_abs_path(cache_file, create_parents=True)
+        self.max_size = max_size_mb * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        self.lock = Lock()
+        self.connection = sqlite3.connect(
+            self.cache_file, timeout=30, check_same_thread=False
+        )
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS detections ('
+            'key TEXT PRIMARY KEY, detections TEXT, size INTEGER, last_access REAL)'
+        )
+        self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS last_access_index '
+            'ON detections (last_access)'
+        )
+        self.connection.commit()
+        self.total_size = self.get_total_size()
+
+    def get_total_size(self):
+        """
+        Get size of all cached detections.
+
+        Returns:
+            Total size in bytes.
+        """
+        return self.connection.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM detections'
+        ).fetchone()[0]
+
+    @staticmethod
+    def hash_weights(trained_weights):
+        """
+        Hash the content of trained weights(all checkpoint files of a .tf
+        prefix, all files of a SavedModel folder).
+        Args:
+            trained_weights: .tf or .weights file or exported SavedModel
+                folder or exported .tflite file.
+
+        Returns:
+            sha256 hex digest.
+        """
+        weights = Path(trained_weights)
+        if weights.is_dir():
+            files = [item for item in weights.rglob('*') if item.is_file()]
+        else:
+            files = [
+                item for item in weights.parent.glob(f'{weights.name}*') if item.is_file()
+            ]
+        assert files, f'No weights found at {trained_weights}'
+        weights_hash = hashlib.sha256()
+        for file in sorted(files):
+            weights_hash.update(str(file.relative_to(weights.parent)).encode('utf-8'))
+            with open(file, 'rb') as weights_file:
+                for chunk in iter(lambda: weights_file.read(1 << 20), b''):
+                    weights_hash.update(chunk)
+        return weights_hash.hexdigest()
+
+    @staticmethod
+    def get_model_key(trained_weights, model_configuration=None, **settings):
+        """
+        Get model identity from weights content, cfg content and detection settings.
+        Args:
+            trained_weights: .tf or .weights file or exported SavedModel
+                folder or exported .tflite file.
+            model_configuration: Path to DarkNet cfg file or None for
+                exported models.
+            **settings: Settings affecting detections ex: input_shape,
+                iou_threshold, score_threshold, max_boxes, anchors, masks.
+
+        Returns:
+            Model key.
+        """
+        cfg_hash = None
+        if model_configuration:
+            cfg_hash = hashlib.sha256(Path(model_configuration).read_bytes()).hexdigest()
+        settings = ','.join(f'{key}={settings[key]}' for key in sorted(settings))
+        return f'{DetectionCache.hash_weights(trained_weights)}|{cfg_hash}|{settings}'
+
+    @staticmethod
+    def get_key(image_bytes, model_key):
+        """
+        Get cache key of an image.
+        Args:
+            image_bytes: Encoded image bytes.
+            model_key: Output of get_model_key()
+
+        Returns:
+            Cache key.
+        """
+        return f'{hashlib.sha256(image_bytes).hexdigest()}|{model_key}'
+
+    def get(self, key):
+        """
+        Get cached detections.
+        Args:
+            key: Output of get_key()
+
+        Returns:
+            pandas DataFrame with detections or None if not cached.
+        """
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT detections FROM detections WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return
+            self.hits += 1
+            self.connection.execute(
+                'UPDATE detections SET last_access = ? WHERE key = ?', (time(), key)
+            )
+            self.connection.commit()
+        return pd.read_json(
+            StringIO(row[0]), orient='split', dtype=False, convert_dates=False
+        )
+
+    def put(self, key, detections):
+        """
+        Cache detections and evict least recently used entries if the cache
+        exceeds its maximum size.
+        Args:
+            key: Output of get_key()
+            detections: pandas DataFrame with detections.
+
+        Returns:
+            None
+        """
+        data = detections.to_json(orient='split', index=False)
+        with self.lock:
+            previous = self.connection.execute(
+                'SELECT size FROM detections WHERE key = ?', (key,)
+            ).fetchone()
+            self.connection.execute(
+                'INSERT OR REPLACE INTO detections VALUES (?, ?, ?, ?)',
+                (key, data, len(data), time()),
+            )
+            self.total_size += len(data) - (previous[0] if previous else 0)
+            if self.total_size > self.max_size:
+                self.evict()
+            self.connection.commit()
+
+    def evict(self):
+        """
+        Delete least recently used entries until the cache fits 90% of max
+        size, so eviction runs once per 10% of max size written rather than on
+        every insert. The running total is recounted first, as other processes
+        may share the cache file.
+
+        Returns:
+            None
+        """
+        self.total_size = self.get_total_size()
+        target_size = 0.9 * self.max_size
+        if self.total_size <= self.max_size:
+            return
+        evicted = []
+        for key, size in self.connection.execute(
+            'SELECT key, size FROM detections ORDER BY last_access'
+        ):
+            if self.total_size <= target_size:
+                break
+            evicted.append((key,))
+            self.total_size -= size
+        self.connection.executemany('DELETE FROM detections WHERE key = ?', evicted)
+        LOGGER.info(f'Evicted {len(evicted)} cached detections')
+
+    def close(self):
+        """
+        Log hit / miss counts and close the database.
+
+        Returns:
+            None
+        """
+        LOGGER.info(f'Detection cache hits: {self.hits}, misses: {self.misses}')
+        self.connection.close()
@@ -0,0 +1,210 @@
+import abc
+from pathlib import Path
+
+import pandas as pd
+from yolo_tf2.utils.common import LOGGER, get_abs_path
+
+
+class DetectionSink(abc.ABC):
+    """
+    Append-only detections file, detections are written as they are
+    completed, nothing is accumulated in memory. Images without detections
+    are written as a single row with empty box fields, so processed images
+    can be told apart from images that were not processed.
+    """
+
+    def __init__(self, output_file):
+        """
+        Initialize sink.
+        Args:
+            output_file: Path to output file.
+        """
+        self.output_file = get_abs_path(output_file, create_parents=True)
+        self.rows = 0
+        self.images = 0
+
+    @abc.abstractmethod
+    def write_rows(self, detections):
+        """
+        Write detections to output file.
+        Args:
+            detections: pandas DataFrame with detections.
+
+        Returns:
+            None
+        """
+
+    @staticmethod
+    def get_empty_row(detections, image_name):
+        """
+        Create a row marking an image without detections.
+        Args:
+            detections: Empty pandas DataFrame with detection columns.
+            image_name: Name of the image / frame.
+
+        Returns:
+            pandas DataFrame with a single row, image_name in the image column
+            and nulls elsewhere.
+        """
+        row = {}
+        for column, dtype in detections.dtypes.items():
+            if pd.api.types.is_integer_dtype(dtype):
+                dtype = 'Int64'
+            elif pd.api.types.is_float_dtype(dtype):
+                dtype = 'Float64'
+            else:
+                dtype = 'string'
+            row[column] = pd.array([None], dtype=dtype)
+        row['image'] = pd.array([image_name], dtype='string')
+        return pd.DataFrame(row)
+
+    def write(self, detections, image_name):
+        """
+        Write detections of a single image / frame.
+        Args:
+            detections: pandas DataFrame with detections.
+            image_name: Name of the image / frame.
+
+        Returns:
+            None
+        """
+        self.images += 1
+        if detections.empty:
+            self.write_rows(self.get_empty_row(detections, image_name))
+            return
+        self.write_rows(detections)
+        self.rows += len(detections)
+
+    def close(self):
+        """
+        Close output file.
+
+        Returns:
+            None
+        """
+        LOGGER.info(
+            f'Saved {self.rows} detections of {self.images} images: '
+            f'{self.output_file}'
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class JSONLSink(DetectionSink):
+    """
+    Detections written as one JSON object per line.
+    """
+
+    def __init__(self, output_file):
+        super(JSONLSink, self).__init__(output_file)
+        self.file = open(self.output_file, 'a')
+
+    def write_rows(self, detections):
+        self.file.write(detections.to_json(orient='records', lines=True).rstrip('\n'))
+        self.file.write('\n')
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+        super(JSONLSink, self).close()
+
+
+class CSVSink(DetectionSink):
+    """
+    Detections written as csv rows, header is written once.
+    """
+
+    def __init__(self, output_file):
+        super(CSVSink, self).__init__(output_file)
+        output_file = Path(self.output_file)
+        self.header = not output_file.exists() or not output_file.stat().st_size
+        self.file = open(self.output_file, 'a', newline='')
+
+    def write_rows(self, detections):
+        detections.to_csv(self.file, header=self.header, index=False)
+        self.header = False
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+        super(CSVSink, self).close()
+
+
+class ParquetSink(DetectionSink):
+    """
+    Detections written as parquet row groups(requires pyarrow), detections
+    are buffered up to row_group_size rows. Parquet files cannot be appended
+    to, an existing file is replaced.
+    """
+
+    def __init__(self, output_file, row_group_size=10000):
+        super(ParquetSink, self).__init__(output_file)
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError('pyarrow is required for parquet output')
+        self.pa = pa
+        self.pq = pq
+        if Path(self.output_file).exists():
+            LOGGER.warning(f'Replacing existing detections: {self.output_file}')
+        self.row_group_size = row_group_size
+        self.buffer = []
+        self.buffered = 0
+        self.schema = None
+        self.writer = None
+
+    def flush(self):
+        """
+        Write buffered detections as a row group.
+
+        Returns:
+            None
+        """
+        if not self.buffer:
+            return
+        table = self.pa.concat_tables(self.buffer)
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(self.output_file, self.schema)
+        self.writer.write_table(table)
+        self.buffer = []
+        self.buffered = 0
+
+    def write_rows(self, detections):
+        table = self.pa.Table.from_pandas(detections, preserve_index=False)
+        if self.schema is None:
+            self.schema = table.schema
+        table = table.cast(self.schema)
+        self.buffer.append(table)
+        self.buffered += len(detections)
+        if self.buffered >= self.row_group_size:
+            self.flush()
+
+    def close(self):
+        self.flush()
+        if self.writer:
+            self.writer.close()
+        super(ParquetSink, self).close()
+
+
+def get_detection_sink(output_file):
+    """
+    Create a detection sink based on output file extension.
+    Args:
+        output_file: Path to .jsonl, .csv or .parquet file.
+
+    Returns:
+        DetectionSink object.
+    """
+    sinks = {'.jsonl': JSONLSink, '.csv': CSVSink, '.parquet': ParquetSink}
+    suffix = Path(output_file).suffix.lower()
+    if suffix not in sinks:
+        raise ValueError(
+            f'Unsupported detections file {output_file}, '
+            f'expected one of {list(sinks)}'
+        )
+    return sinks[suffix](output_file)
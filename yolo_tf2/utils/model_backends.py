@@ -0,0 +1,227 @@
+import json
+from pathlib import Path
+from threading import Lock
+from time import perf_counter
+
+import numpy as np
+import tensorflow as tf
+from yolo_tf2.utils.common import LOGGER, YoloDecode
+
+
+class SavedModelBackend:
+    """
+    Inference using a SavedModel exported by core.exporter.Exporter
+    """
+
+    def __init__(self, saved_model_dir):
+        """
+        Load exported model.
+        Args:
+            saved_model_dir: Path to SavedModel folder.
+        """
+        self.model = tf.saved_model.load(saved_model_dir)
+        self.detect = self.model.signatures['detect']
+        self.input_size = int(self.model.input_size.numpy())
+
+    def __call__(self, images):
+        """
+        Detect a batch of resized images.
+        Args:
+            images: Image tensor of shape (n, size, size, c) scaled to [0, 1]
+
+        Returns:
+            boxes, scores, classes, valid_detections
+        """
+        outputs = self.detect(images=tf.cast(images, tf.float32))
+        return [
+            outputs[key].numpy()
+            for key in ('boxes', 'scores', 'classes', 'valid_detections')
+        ]
+
+
+class TFLiteBackend:
+    """
+    Inference using a .tflite file exported by core.exporter.Exporter
+    """
+
+    def __init__(self, tflite_file, suppress_candidates, threads=None):
+        """
+        Load interpreter and output metadata.
+        Args:
+            tflite_file: Path to .tflite file, a .json file with the same
+                name containing output metadata is expected next to it.
+            suppress_candidates: core.models.BaseModel.suppress_candidates
+            threads: Number of interpreter threads.
+        """
+        with open(Path(tflite_file).with_suffix('.json')) as metadata_file:
+            metadata = json.load(metadata_file)
+        self.input_size = metadata['input_size']
+        self.classes = metadata['classes']
+        self.grid_sizes = metadata['grid_sizes']
+        self.decode_layer = YoloDecode(
+            [
+                np.array(item, np.float32) * self.input_size
+                for item in metadata['anchors']
+            ],
+            self.classes,
+        )
+        self.get_nms = suppress_candidates
+        self.interpreter = tf.lite.Interpreter(
+            model_path=tflite_file, num_threads=threads
+        )
+        self.interpreter.allocate_tensors()
+        self.lock = Lock()
+        self.input_details = None
+        self.output_details = None
+        self.update_details()
+
+    def update_details(self):
+        """
+        Read input details and order output details to match output metadata.
+
+        Returns:
+            None
+        """
+        self.input_details = self.interpreter.get_input_details()[0]
+        output_details = {
+            int(details['shape'][1]): details
+            for details in self.interpreter.get_output_details()
+        }
+        self.output_details = [output_details[size] for size in self.grid_sizes]
+
+    @staticmethod
+    def quantize(data, details):
+        """
+        Quantize float data according to tensor quantization parameters.
+        Args:
+            data: numpy array.
+            details: Interpreter tensor details.
+
+        Returns:
+            numpy array of the tensor dtype.
+        """
+        scale, zero_point = details['quantization']
+        if not scale:
+            return data.astype(details['dtype'])
+        limits = np.iinfo(details['dtype'])
+        data = np.round(data / scale + zero_point)
+        return np.clip(data, limits.min, limits.max).astype(details['dtype'])
+
+    @staticmethod
+    def dequantize(data, details):
+        """
+        Convert quantized data to float32.
+        Args:
+            data: numpy array.
+            details: Interpreter tensor details.
+
+        Returns:
+            numpy array of float32.
+        """
+        scale, zero_point = details['quantization']
+        if not scale:
+            return data.astype(np.float32)
+        return (data.astype(np.float32) - zero_point) * scale
+
+    def __call__(self, images):
+        """
+        Detect a batch of resized images.
+        Args:
+            images: Image tensor of shape (n, size, size, c) scaled to [0, 1]
+
+        Returns:
+            boxes, scores, classes, valid_detections
+        """
+        images = np.asarray(images, np.float32)
+        with self.lock:
+            if tuple(self.input_details['shape']) != images.shape:
+                self.interpreter.resize_tensor_input(
+                    self.input_details['index'], images.shape
+                )
+                self.interpreter.allocate_tensors()
+                self.update_details()
+            self.interpreter.set_tensor(
+                self.input_details['index'], self.quantize(images, self.input_details)
+            )
+            self.interpreter.invoke()
+            outputs = [
+                self.dequantize(self.interpreter.get_tensor(details['index']), details)
+                for details in self.output_details
+            ]
+        candidates = self.decode_layer([*outputs, tf.constant(images)])
+        return [item.numpy() for item in self.get_nms(*candidates)]
+
+
+class XLABackend:
+    """
+    Inference using XLA compiled functions for a fixed set of batch sizes.
+    """
+
+    def __init__(self, model, batch_sizes):
+        """
+        Compile and warm up inference for every batch size.
+        Args:
+            model: core.models.BaseModel object with created models
+                and loaded weights.
+            batch_sizes: int or a list of batch sizes to compile.
+        """
+        self.training_model = model.training_model
+        self.decode_layer = YoloDecode(
+            [model.anchors[mask] * model.input_shape[0] for mask in model.masks],
+            model.classes,
+        )
+        self.input_shape = tuple(model.input_shape)
+        self.batch_sizes = sorted({int(size) for size in np.atleast_1d(batch_sizes)})
+        self.get_outputs = tf.function(self.decode, jit_compile=True)
+        self.get_nms = tf.function(model.suppress_candidates)
+        self.warm_up()
+
+    def decode(self, images):
+        """
+        Get yolo outputs and decode boxes.
+        Args:
+            images: Image tensor of shape (n, size, size, c) scaled to [0, 1]
+
+        Returns:
+            Flat boxes, objectness, class probabilities of all outputs.
+        """
+        outputs = self.training_model(images, training=False)
+        return self.decode_layer([*outputs, images])
+
+    def warm_up(self):
+        """
+        Trace and compile inference for every batch size.
+
+        Returns:
+            None
+        """
+        total_start = perf_counter()
+        for batch_size in self.batch_sizes:
+            start = perf_counter()
+            self.get_nms(*self.get_outputs(tf.zeros((batch_size, *self.input_shape))))
+            LOGGER.info(
+                f'Compiled batch size {batch_size} in {perf_counter() - start} seconds'
+            )
+        LOGGER.info(f'XLA warm up time: {perf_counter() - total_start} seconds')
+
+    def __call__(self, images):
+        """
+        Detect a batch of resized images, every chunk is padded to the
+        nearest compiled batch size, other image sizes than the warmed up
+        input shape are compiled on first use.
+        Args:
+            images: Image tensor of shape (n, size, size, c) scaled to [0, 1]
+
+        Returns:
+            boxes, scores, classes, valid_detections
+        """
+        images = tf.cast(images, tf.float32)
+        results = []
+        for start in range(0, images.shape[0], self.batch_sizes[-1]):
+            chunk = images[start : start + self.batch_sizes[-1]]
+            size = chunk.shape[0]
+            batch_size = next(item for item in self.batch_sizes if item >= size)
+            chunk = tf.pad(chunk, [[0, batch_size - size], [0, 0], [0, 0], [0, 0]])
+            outputs = self.get_nms(*self.get_outputs(chunk))
+            results.append([item[:size].numpy() for item in outputs])
+        return [np.concatenate(items) for items in zip(*results)]